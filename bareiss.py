@@ -0,0 +1,213 @@
+import math
+import numbers
+from fractions import Fraction
+from utils import *
+
+"""
+Fraction-free (Bareiss) elimination over Python integers. Every
+intermediate entry is a minor of the original matrix, so coefficient
+growth stays polynomial and all divisions are exact
+"""
+
+def is_rational(x: Any) -> bool:
+    """ Whether or not x is an exact rational number (int, Fraction, sympy Rational...) """
+    return isinstance(x, numbers.Rational)
+
+def to_fraction(x: Number) -> Fraction:
+    if isinstance(x, (int, Fraction)):
+        return Fraction(x)
+    if is_rational(x):
+        return Fraction(int(x.numerator), int(x.denominator))
+    # floats (and anything float-like) convert exactly to their binary value
+    return Fraction(float(x))
+
+def integer_rows(rows: Iterable[Iterable[Number]]) -> tuple[list[list[int]], list[int]]:
+    """ Scale every row by the lcm of its denominators so that all entries become
+        integers. Returns the integer rows and the scale factor used for each row """
+    int_rows, scales = [], []
+    for row in rows:
+        row = [to_fraction(x) for x in row]
+        scale = 1
+        for x in row:
+            scale = scale * x.denominator // math.gcd(scale, x.denominator)
+        int_rows.append([x.numerator * (scale // x.denominator) for x in row])
+        scales.append(scale)
+    return int_rows, scales
+
+def eliminate(rows: list[list[int]], steps: Optional[list[tuple[int, list[int]]]] = None) -> tuple[list[int], int, int]:
+    """ In-place fraction-free row echelon form of an integer matrix.
+        Returns the pivot columns, the final pivot (the determinant of the
+        pivot submatrix, up to sign) and the sign of the row permutation.
+        If given, steps receives (pivot row swapped in, multipliers of the
+        rows below) for every pivot, enough to replay the elimination """
+    m = len(rows)
+    n = len(rows[0]) if m else 0
+    pivots = []
+    prev, sign, r = 1, 1, 0
+    for c in range(n):
+        if r == m:
+            break
+        p = next((i for i in range(r, m) if rows[i][c]), None)
+        if p is None:
+            continue
+        if p != r:
+            rows[r], rows[p] = rows[p], rows[r]
+            sign = -sign
+        pivot_row = rows[r]
+        pivot = pivot_row[c]
+        if steps is not None:
+            steps.append((p, [rows[i][c] for i in range(r + 1, m)]))
+        for i in range(r + 1, m):
+            row = rows[i]
+            f = row[c]
+            if f:
+                for j in range(c + 1, n):
+                    row[j] = (pivot * row[j] - f * pivot_row[j]) // prev
+            elif pivot != prev:
+                for j in range(c + 1, n):
+                    row[j] = pivot * row[j] // prev
+            row[c] = 0
+        prev = pivot
+        pivots.append(c)
+        r += 1
+    return pivots, prev, sign
+
+def det(rows: Iterable[Iterable[Number]]) -> Number:
+    rows, scales = integer_rows(rows)
+    if len(rows) != len(rows[0]):
+        raise TypeError(
+            "not a square matrix"
+        )
+    pivots, last, sign = eliminate(rows)
+    if len(pivots) < len(rows):
+        return 0
+    d = Fraction(sign * last, math.prod(scales))
+    return d.numerator if d.denominator == 1 else d
+
+def rank(rows: Iterable[Iterable[Number]]) -> int:
+    rows, _ = integer_rows(rows)
+    return len(eliminate(rows)[0])
+
+def _reduced(rows: list[list[int]]) -> tuple[list[int], int, list[list[int]]]:
+    # Fraction-free back substitution: returns the pivot columns, the common
+    # denominator d and integer rows X such that rref = X / d
+    pivots, d, _ = eliminate(rows)
+    n = len(rows[0])
+    r = len(pivots)
+    if not r:
+        return pivots, 1, []
+    x = [[0] * n for _ in range(r)]
+    for i, p in enumerate(pivots):
+        x[i][p] = d
+    for k in range(n):
+        if k in pivots:
+            continue
+        for i in range(r - 1, -1, -1):
+            total = d * rows[i][k]
+            for j in range(i + 1, r):
+                total -= rows[i][pivots[j]] * x[j][k]
+            x[i][k] = total // rows[i][pivots[i]]
+    if d < 0:
+        d = -d
+        x = [[-elem for elem in row] for row in x]
+    return pivots, d, x
+
+def rref(rows: Iterable[Iterable[Number]]) -> list[list[Fraction]]:
+    rows, _ = integer_rows(rows)
+    m, n = len(rows), len(rows[0])
+    pivots, d, x = _reduced(rows)
+    reduced = [[Fraction(elem, d) for elem in row] for row in x]
+    return reduced + [[Fraction(0)] * n for _ in range(m - len(pivots))]
+
+def solve(rows: Iterable[Iterable[Number]], rhs: Iterable[Iterable[Number]]) -> list[list[Fraction]]:
+    """ Exact solution X of AX = B for a square nonsingular A, where rhs holds
+        the rows of B """
+    return FractionFreeLU(rows).solve(rhs)
+
+def nullspace(rows: Iterable[Iterable[Number]]) -> list[list[int]]:
+    """ Integer basis vectors for the kernel {v : Av = 0}, one per free column """
+    rows, _ = integer_rows(rows)
+    n = len(rows[0])
+    pivots, d, x = _reduced(rows)
+    basis = []
+    for f in range(n):
+        if f in pivots:
+            continue
+        v = [0] * n
+        v[f] = d
+        for i, p in enumerate(pivots):
+            v[p] = -x[i][f]
+        g = math.gcd(*v)
+        basis.append([elem // g for elem in v])
+    return basis
+
+
+class FractionFreeLU:
+    """ Bareiss elimination of a rational matrix, kept for reuse: det and rank
+        are read off directly, and every further right-hand side costs O(n^2)
+        integer operations - the recorded row swaps and multipliers replay the
+        elimination on it, then fraction-free back substitution solves U X = d b """
+
+    def __init__(self, rows: Iterable[Iterable[Number]]) -> None:
+        self.rows, self.scales = integer_rows(rows)
+        self.m, self.n = len(self.rows), len(self.rows[0])
+        self.steps = []
+        self.pivots, self.last, self.sign = eliminate(self.rows, self.steps)
+
+    def rank(self) -> int:
+        return len(self.pivots)
+
+    def _check_square(self) -> None:
+        if self.m != self.n:
+            raise TypeError(
+                "not a square matrix"
+            )
+
+    def det(self) -> Number:
+        self._check_square()
+        if len(self.pivots) < self.n:
+            return 0
+        d = Fraction(self.sign * self.last, math.prod(self.scales))
+        return d.numerator if d.denominator == 1 else d
+
+    def solve(self, rhs: Iterable[Iterable[Number]]) -> list[list[Fraction]]:
+        """ Exact solution X of AX = B, where rhs holds the rows of B """
+        self._check_square()
+        n, u = self.n, self.rows
+        if len(self.pivots) < n:
+            raise ValueError(
+                "matrix is singular"
+            )
+        # scale B's rows like A's, then clear the denominators of all of B at once
+        rhs = list(rhs)
+        if len(rhs) != n:
+            raise TypeError(
+                f"right-hand side must have exactly {n} rows"
+            )
+        b = [[to_fraction(x) * s for x in row] for row, s in zip(rhs, self.scales)]
+        scale = 1
+        for row in b:
+            for x in row:
+                scale = scale * x.denominator // math.gcd(scale, x.denominator)
+        b = [[x.numerator * (scale // x.denominator) for x in row] for row in b]
+        prev = 1
+        for r, (p, factors) in enumerate(self.steps):
+            if p != r:
+                b[r], b[p] = b[p], b[r]
+            pivot, pivot_row = u[r][r], b[r]
+            for i, f in enumerate(factors, r + 1):
+                if f:
+                    b[i] = [(pivot * x - f * y) // prev for x, y in zip(b[i], pivot_row)]
+                elif pivot != prev:
+                    b[i] = [pivot * x // prev for x in b[i]]
+            prev = pivot
+        # U X = d b' has an integer solution X = d x (Cramer), so every division is exact
+        d = self.last
+        x = [None] * n
+        for i in range(n - 1, -1, -1):
+            total = [d * elem for elem in b[i]]
+            for j in range(i + 1, n):
+                if u[i][j]:
+                    total = [t - u[i][j] * elem for t, elem in zip(total, x[j])]
+            x[i] = [t // u[i][i] for t in total]
+        return [[Fraction(elem, d * scale) for elem in row] for row in x]
@@ -0,0 +1,132 @@
+from matrices import Matrix, np
+from utils import *
+
+
+class MatrixBatch:
+    """ A stack of N matrices with the same shape held in one (N, rows, cols)
+        array. Arithmetic, det, inverse and solve run as single vectorized
+        numpy calls over the whole stack instead of one Matrix per element """
+
+    _matrix_rmul = True
+
+    def __init__(self, data: Any, dtype: Optional[Any] = None) -> None:
+        self.array = np.asarray(data, dtype=dtype)
+        if self.array.ndim == 2:
+            self.array = self.array[np.newaxis]
+        if self.array.ndim != 3 or not self.array.size:
+            raise TypeError(
+                "a matrix batch must have shape (N, rows, cols)"
+            )
+
+    @classmethod
+    def from_matrices(cls, matrices: Iterable[Matrix], dtype: Optional[Any] = None) -> 'MatrixBatch':
+        return cls(np.stack([m.to_numpy(dtype) for m in matrices]))
+
+    @property
+    def shape(self) -> tuple[int, int, int]:
+        return self.array.shape
+
+    @property
+    def rows(self) -> int:
+        return self.array.shape[1]
+
+    @property
+    def cols(self) -> int:
+        return self.array.shape[2]
+
+    @property
+    def dtype(self) -> 'np.dtype':
+        return self.array.dtype
+
+    def is_square(self) -> bool:
+        return self.rows == self.cols
+
+    def __len__(self) -> int:
+        return self.array.shape[0]
+
+    def __getitem__(self, i: Union[int, slice, Any]) -> Union[Matrix, 'MatrixBatch']:
+        # A single index gives a Matrix view onto the batch buffer; slices give
+        # a sub-batch that is still a view, fancy indexing gives a copy
+        if isinstance(i, (int, np.integer)):
+            return Matrix.from_numpy(self.array[i])
+        return MatrixBatch(self.array[i])
+
+    def __setitem__(self, i: Union[int, slice, Any], value: Union[Matrix, 'MatrixBatch', Any]) -> None:
+        if isinstance(value, (Matrix, MatrixBatch)):
+            value = value.to_numpy()
+        self.array[i] = value
+
+    def __iter__(self) -> Iterable[Matrix]:
+        return (self[i] for i in range(len(self)))
+
+    def __repr__(self) -> str:
+        return f"MatrixBatch({len(self)}x{self.rows}x{self.cols}, dtype={self.dtype})"
+
+    def to_numpy(self) -> 'np.ndarray':
+        return self.array
+
+    def to_matrices(self) -> list[Matrix]:
+        return list(self)
+
+    def transpose(self) -> 'MatrixBatch':
+        return MatrixBatch(self.array.swapaxes(1, 2))
+
+    def _operand(self, other: Union[Matrix, 'MatrixBatch']) -> 'np.ndarray':
+        return other.array if isinstance(other, MatrixBatch) else other.to_numpy()
+
+    def __mul__(self, other: Union[Matrix, 'MatrixBatch', Number]) -> 'MatrixBatch':
+        if isinstance(other, (Matrix, MatrixBatch)):
+            other = self._operand(other)
+            if self.cols != other.shape[-2]:
+                raise TypeError(
+                    f"cannot multiply matrices of sizes {self.rows}x{self.cols} and {other.shape[-2]}x{other.shape[-1]}"
+                )
+            return MatrixBatch(np.matmul(self.array, other))
+        return MatrixBatch(self.array * other)
+
+    def __rmul__(self, other: Union[Matrix, Number]) -> 'MatrixBatch':
+        if isinstance(other, Matrix):
+            if other.cols != self.rows:
+                raise TypeError(
+                    f"cannot multiply matrices of sizes {other.rows}x{other.cols} and {self.rows}x{self.cols}"
+                )
+            return MatrixBatch(np.matmul(other.to_numpy(), self.array))
+        return MatrixBatch(other * self.array)
+
+    def __add__(self, other: Union[Matrix, 'MatrixBatch', Number]) -> 'MatrixBatch':
+        if isinstance(other, (Matrix, MatrixBatch)):
+            other = self._operand(other)
+        return MatrixBatch(self.array + other)
+
+    __radd__ = __add__
+
+    def _check_square(self) -> None:
+        if not self.is_square():
+            raise TypeError(
+                "not a square matrix"
+            )
+
+    def det(self) -> 'np.ndarray':
+        """ Determinant of every matrix in the batch, shape (N,) """
+        self._check_square()
+        return np.linalg.det(self.array)
+
+    def inverse(self) -> 'MatrixBatch':
+        self._check_square()
+        return MatrixBatch(np.linalg.inv(self.array))
+
+    def solve(self, b: Any) -> 'np.ndarray':
+        """ Solve A[i] x[i] = b[i] for every matrix in the batch. b may be one
+            vector shared by all systems, a (N, rows) stack of vectors or a
+            (N, rows, k) stack of right-hand side matrices """
+        self._check_square()
+        if isinstance(b, MatrixBatch):
+            b = b.array
+        elif isinstance(b, Matrix):
+            b = b.to_numpy()
+        b = np.asarray(b)
+        if b.ndim == 1:
+            b = np.broadcast_to(b, (len(self), self.rows))
+        if b.ndim == 2 and b.shape == (len(self), self.rows):
+            return np.linalg.solve(self.array, b[..., np.newaxis])[..., 0]
+        return np.linalg.solve(self.array, b)
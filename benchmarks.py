@@ -0,0 +1,309 @@
+import argparse
+import json
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from fractions import Fraction
+from typing import Callable, Any, Iterator, NamedTuple, Optional
+
+"""
+Reproducible benchmark suite. Every workload is generated from a fixed
+seed, timed over several repeats (the minimum is the headline number) and
+run once more under tracemalloc for its peak memory (by default only
+when it is fast enough for tracing to be affordable, see --memory).
+Results can be saved as a JSON baseline and later runs compared against it:
+
+    python benchmarks.py --save baseline.json
+    python benchmarks.py --compare baseline.json --threshold 0.15
+
+Suites: "quick" (seconds), "default" and "full" (adds the 10^8 - 10^9 sieves
+and 10^7-point clouds, which need several GB of memory and minutes).
+With --compare the exit status is 1 if any workload slowed down by more
+than the threshold
+"""
+
+SEED = 20240101
+SUITES = ("quick", "default", "full")
+# tracemalloc makes allocation-heavy pure Python code 20-30x slower, so by
+# default only workloads faster than this (in seconds) get a peak memory run
+MEMORY_TRACE_LIMIT = 0.25
+
+
+class Workload(NamedTuple):
+    name: str
+    # builds the inputs (not timed); run(inputs) is the timed part
+    setup: Callable[[], Any]
+    run: Callable[[Any], Any]
+    # units of work per run, for the throughput column
+    items: int
+    unit: str
+    # smallest suite the workload belongs to
+    suite: str
+
+
+def _in_suite(workload: Workload, suite: str) -> bool:
+    return SUITES.index(workload.suite) <= SUITES.index(suite)
+
+
+"""
+Workloads
+"""
+
+def _random_rows(n: int, kind: str, rng: random.Random) -> list[list[Any]]:
+    if kind == "fraction":
+        return [[Fraction(rng.randint(-9, 9), rng.randint(1, 9)) for _ in range(n)] for _ in range(n)]
+    if kind == "int":
+        return [[rng.randint(-99, 99) for _ in range(n)] for _ in range(n)]
+    return [[rng.uniform(-1, 1) for _ in range(n)] for _ in range(n)]
+
+
+def _matrix(rows: list[list[Any]], kind: str) -> Any:
+    from matrices import Matrix
+    if kind == "numpy":
+        import numpy as np
+        return Matrix(rows, dtype=np.float64)
+    return Matrix(rows)
+
+
+def matrix_workloads() -> Iterator[Workload]:
+    from matrices import Matrix
+    grid = {
+        "multiply_matrix": [("int", 32, "quick"), ("int", 96, "default"), ("fraction", 24, "default"),
+                            ("float", 64, "quick"), ("numpy", 256, "quick"), ("numpy", 1024, "default")],
+        "rref": [("int", 16, "quick"), ("int", 40, "default"), ("fraction", 16, "default"),
+                 ("float", 48, "quick"), ("numpy", 128, "quick"), ("numpy", 384, "default")],
+        "inverse": [("int", 16, "quick"), ("int", 40, "default"), ("fraction", 16, "default"),
+                    ("float", 64, "quick"), ("numpy", 128, "quick"), ("numpy", 512, "default")]
+    }
+    for operation, cases in grid.items():
+        for kind, n, suite in cases:
+            # the operands are built outside the timed region, so construction
+            # and conversion costs cannot hide changes in the operation itself
+            def setup(kind=kind, n=n, seed=len(operation) * 1000 + n) -> tuple[Matrix, Matrix]:
+                rng = random.Random(SEED + seed)
+                return _matrix(_random_rows(n, kind, rng), kind), _matrix(_random_rows(n, kind, rng), kind)
+            if operation == "multiply_matrix":
+                def run(inputs: tuple[Matrix, Matrix]) -> Matrix:
+                    m1, m2 = inputs
+                    return m1.multiply_matrix(m1, m2)
+            elif operation == "rref":
+                def run(inputs: tuple[Matrix, Matrix]) -> Matrix:
+                    return inputs[0].rref()
+            else:
+                def run(inputs: tuple[Matrix, Matrix]) -> Matrix:
+                    m = inputs[0]
+                    # drop the cached factorization so that every run inverts from scratch
+                    m._lu = None
+                    return m.inverse()
+            yield Workload(f"matrices.{operation}[{kind},n={n}]", setup, run, n ** 3, "flop", suite)
+
+
+def sieve_workloads() -> Iterator[Workload]:
+    import number_theory
+    for n, suite in [(10 ** 6, "quick"), (10 ** 7, "default"), (10 ** 8, "full")]:
+        yield Workload(f"number_theory.sieve[n=1e{len(str(n)) - 1}]", lambda n=n: n, number_theory.sieve, n, "int", suite)
+    for n, suite in [(10 ** 6, "quick"), (10 ** 7, "default"), (10 ** 8, "full")]:
+        yield Workload(
+            f"number_theory.segmented_sieve[n=1e{len(str(n)) - 1}]",
+            lambda n=n: n, number_theory.segmented_sieve, n, "int", suite
+        )
+    # 10^9 would be a 50 million element list, so the streaming API counts the
+    # primes chunk by chunk instead of materializing them
+    for n, suite in [(10 ** 8, "default"), (10 ** 9, "full")]:
+        yield Workload(
+            f"number_theory.segmented_primes[n=1e{len(str(n)) - 1},streaming]",
+            lambda n=n: n,
+            lambda n: sum(len(chunk) for chunk in number_theory.segmented_primes(0, n, chunks=True)),
+            n, "int", suite
+        )
+
+
+def _semiprimes(bits: int, count: int, rng: random.Random) -> list[int]:
+    import number_theory
+    half = bits // 2
+    numbers = []
+    while len(numbers) < count:
+        p, q = (rng.randrange(1 << (half - 1), 1 << half) | 1 for _ in range(2))
+        if number_theory.is_prime(p) and number_theory.is_prime(q):
+            numbers.append(p * q)
+    return numbers
+
+
+def factoring_workloads() -> Iterator[Workload]:
+    import number_theory
+    for fn in (number_theory.factors, number_theory.prime_factors):
+        for bits, count, suite in [(32, 2000, "quick"), (64, 20, "quick"), (64, 200, "default")]:
+            def setup(bits=bits, count=count) -> list[int]:
+                return _semiprimes(bits, count, random.Random(SEED + bits))
+            def run(numbers: list[int], fn=fn) -> list[Any]:
+                # Pollard-Brent draws random parameters; reseed so reruns do the same work
+                random.seed(SEED)
+                return [fn(n) for n in numbers]
+            yield Workload(f"number_theory.{fn.__name__}[{bits}-bit semiprimes,count={count}]", setup, run, count, "number", suite)
+
+
+def crt_workloads() -> Iterator[Workload]:
+    import number_theory
+    moduli = [1000003, 1000033, 1000037, 1000039, 1000081, 1000099, 1000117, 1000121]
+    for count, suite in [(10 ** 4, "quick"), (10 ** 5, "default")]:
+        def setup(count=count) -> list[list[int]]:
+            rng = random.Random(SEED + count)
+            return [[rng.randrange(m) for m in moduli] for _ in range(count)]
+        yield Workload(
+            f"number_theory.chinese_remainder[8 moduli,count={count}]", setup,
+            lambda systems: [number_theory.chinese_remainder(r, moduli) for r in systems],
+            count, "system", suite
+        )
+        yield Workload(
+            f"number_theory.CRTBasis.solve_many[8 moduli,count={count}]", setup,
+            lambda systems: number_theory.CRTBasis(moduli).solve_many(systems),
+            count, "system", suite
+        )
+
+
+def rotation_workloads() -> Iterator[Workload]:
+    import quaternions
+    for n, suite in [(10 ** 3, "quick"), (10 ** 4, "default")]:
+        def setup(n=n) -> list[list[float]]:
+            rng = random.Random(SEED + n)
+            return [[rng.uniform(-1, 1) for _ in range(3)] for _ in range(n)]
+        yield Workload(
+            f"quaternions.transform[points={n}]", setup,
+            lambda points: [quaternions.transform(p, 120, (1, 1, 1)) for p in points],
+            n, "point", suite
+        )
+    for n, suite in [(10 ** 5, "quick"), (10 ** 6, "default"), (10 ** 7, "full")]:
+        def setup(n=n) -> Any:
+            import numpy as np
+            rng = np.random.default_rng(SEED + n)
+            return rng.standard_normal((n, 3)), quaternions.axis_angle_array([[1, 1, 1]], [2.0])[0]
+        yield Workload(
+            f"quaternions.rotate_points[points={n}]", setup,
+            lambda inputs: quaternions.rotate_points(*inputs),
+            n, "point", suite
+        )
+
+
+WORKLOADS = [matrix_workloads, sieve_workloads, factoring_workloads, crt_workloads, rotation_workloads]
+
+
+"""
+Measurement, baselines and comparison
+"""
+
+def measure(workload: Workload, repeat: int, memory: str) -> dict[str, Any]:
+    inputs = workload.setup()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        workload.run(inputs)
+        times.append(time.perf_counter() - start)
+    best = min(times)
+    result = {
+        "time": best,
+        "median": statistics.median(times),
+        "repeat": repeat,
+        "throughput": workload.items / best if best else float("inf"),
+        "unit": f"{workload.unit}/s",
+        "peak_memory": None
+    }
+    if memory == "always" or memory == "auto" and best < MEMORY_TRACE_LIMIT:
+        # a separate run, since tracing slows allocation-heavy code down
+        tracemalloc.start()
+        workload.run(inputs)
+        result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+
+def environment() -> dict[str, Any]:
+    import number_theory
+    env = {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "native_extension": number_theory._native is not None
+    }
+    try:
+        import numpy
+        env["numpy"] = numpy.__version__
+    except ImportError:
+        env["numpy"] = None
+    return env
+
+
+def run(suite: Optional[str] = "default", pattern: Optional[str] = None, repeat: Optional[int] = 3, memory: Optional[str] = "auto") -> dict[str, Any]:
+    results = {}
+    for family in WORKLOADS:
+        for workload in family():
+            if not _in_suite(workload, suite) or pattern and pattern not in workload.name:
+                continue
+            results[workload.name] = measure(workload, repeat, memory)
+            print(_format_row(workload.name, results[workload.name]), flush=True)
+    return {"seed": SEED, "suite": suite, "environment": environment(), "results": results}
+
+
+def _format_row(name: str, result: dict[str, Any], baseline: Optional[dict[str, Any]] = None, threshold: float = 0.0) -> str:
+    memory = "-" if result["peak_memory"] is None else f"{result['peak_memory'] / 2 ** 20:.1f} MiB"
+    row = f"{name:<64}{result['time']:>11.4f} s{result['throughput']:>14.4g} {result['unit']:<12}{memory:>12}"
+    if baseline is not None:
+        ratio = result["time"] / baseline["time"] if baseline["time"] else float("inf")
+        flag = "  SLOWER" if ratio > 1 + threshold else "  faster" if ratio < 1 - threshold else ""
+        row += f"{ratio:>8.2f}x{flag}"
+    return row
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float) -> list[str]:
+    """ Names of the workloads whose time grew by more than threshold (0.1 = 10%) """
+    print(f"\ncompared with the baseline (time ratio, threshold {threshold:.0%}):")
+    if baseline.get("environment") != current["environment"]:
+        print("warning: the baseline was recorded in a different environment")
+    regressions = []
+    for name, result in current["results"].items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<64} (not in the baseline)")
+            continue
+        print(_format_row(name, result, before, threshold))
+        if result["time"] > before["time"] * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the maths modules")
+    parser.add_argument("--suite", choices=SUITES, default="default")
+    parser.add_argument("-k", "--filter", help="only run workloads whose name contains this")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per workload (the minimum is reported)")
+    parser.add_argument(
+        "--memory", choices=("auto", "always", "never"), default="auto",
+        help=f"tracemalloc peak-memory run: always, never, or for workloads under {MEMORY_TRACE_LIMIT} s (auto)"
+    )
+    parser.add_argument("--save", metavar="JSON", help="write the results to a baseline file")
+    parser.add_argument("--compare", metavar="JSON", help="compare against a baseline file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown before a workload is flagged")
+    parser.add_argument("--list", action="store_true", help="list the workloads of the suite and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for family in WORKLOADS:
+            for workload in family():
+                if _in_suite(workload, args.suite):
+                    print(workload.name)
+        sys.exit(0)
+    print(f"{'workload':<64}{'time':>13}{'throughput':>14} {'':<12}{'peak memory':>12}")
+    current = run(args.suite, args.filter, args.repeat, args.memory)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(current, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} workload(s) slower than the baseline by more than {args.threshold:.0%}")
+            sys.exit(1)
@@ -1,2 +1,9 @@
-def det(mat):
-    pass
\ No newline at end of file
+from matrices import Matrix
+from utils import *
+
+def det(mat: Union[Matrix, Iterable[Iterable[Number]]]) -> Number:
+    """ Determinant of a square matrix in O(n^3), by fraction-free Bareiss
+        elimination for exact matrices and from the PLU factorization otherwise """
+    if not isinstance(mat, Matrix):
+        mat = Matrix(mat)
+    return mat.det()
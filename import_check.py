@@ -0,0 +1,83 @@
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Optional
+
+"""
+Import-time regression check. Every module is imported in a fresh
+interpreter (python -X importtime) and must
+
+    - print nothing (no demo code running at import),
+    - leave the heavy optional dependencies (numpy, sympy) unimported,
+    - finish within the time budget (median of several runs).
+
+    python import_check.py [--budget MS] [--runs N] [module ...]
+
+Exits with status 1 if any module fails
+"""
+
+MODULES = [
+    "utils", "matrices", "determinant", "lu", "bareiss", "sparse", "lazy", "batch",
+    "number_theory", "prime_table", "planes", "quaternions", "symbols"
+]
+# Modules that may only be imported once the code that needs them runs
+HEAVY = ["numpy", "sympy"]
+# Cumulative import time allowed per module, in milliseconds
+BUDGET_MS = 150.0
+
+_PROBE = (
+    "import {module}\n"
+    "import sys\n"
+    "sys.stderr.write('loaded:' + ','.join(m for m in {heavy!r} if m in sys.modules) + '\\n')\n"
+)
+
+
+def _import_once(module: str) -> tuple[float, str, list[str]]:
+    # (cumulative import time in ms, anything printed, heavy modules loaded)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(
+            f"importing {module} failed:\n{result.stderr}"
+        )
+    elapsed, loaded = None, []
+    for line in result.stderr.splitlines():
+        if line.startswith("loaded:"):
+            loaded = [m for m in line[len("loaded:"):].split(",") if m]
+        elif line.startswith("import time:"):
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if name.strip() == module and not name.startswith("  "):
+                elapsed = int(cumulative) / 1000
+    return elapsed or 0.0, result.stdout, loaded
+
+
+def check(modules: Optional[list[str]] = None, budget: Optional[float] = BUDGET_MS, runs: Optional[int] = 5) -> bool:
+    ok = True
+    for module in modules or MODULES:
+        times, output, loaded = [], "", []
+        for _ in range(runs):
+            elapsed, output, loaded = _import_once(module)
+            times.append(elapsed)
+        median = statistics.median(times)
+        problems = []
+        if output:
+            problems.append(f"prints on import: {output.strip()[:60]!r}")
+        if loaded:
+            problems.append(f"imports {', '.join(loaded)}")
+        if median > budget:
+            problems.append(f"over the {budget:.0f} ms budget")
+        ok &= not problems
+        print(f"{module:<16}{median:8.1f} ms  {'ok' if not problems else 'FAIL: ' + '; '.join(problems)}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that the maths modules import quickly and without side effects")
+    parser.add_argument("modules", nargs="*", help="modules to check (default: all)")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="allowed import time per module in ms")
+    parser.add_argument("--runs", type=int, default=5, help="imports per module; the median is compared")
+    args = parser.parse_args()
+    sys.exit(0 if check(args.modules, args.budget, args.runs) else 1)
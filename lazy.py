@@ -0,0 +1,181 @@
+import operator
+from abc import ABC, abstractmethod
+from matrices import Matrix, _is_numpy, _is_numpy_scalar, np
+from utils import *
+
+"""
+Deferred matrix expressions. Operators on LazyMatrix objects only build a
+tree; evaluate() then multiplies every product chain in the cheapest order
+and folds all scaling and addition into a single pass over the output
+"""
+
+class LazyMatrix(ABC):
+
+    _matrix_rmul = True
+
+    rows: int
+    cols: int
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.rows, self.cols
+
+    def __mul__(self, other: Union['LazyMatrix', Matrix, Number]) -> 'LazyMatrix':
+        if isinstance(other, (LazyMatrix, Matrix)):
+            return MatMul([self, _wrap(other)])
+        return Scale(self, other)
+
+    def __rmul__(self, other: Union[Matrix, Number]) -> 'LazyMatrix':
+        if isinstance(other, Matrix):
+            return MatMul([Leaf(other), self])
+        return Scale(self, other)
+
+    def __add__(self, other: Union['LazyMatrix', Matrix]) -> 'LazyMatrix':
+        return Add([self, _wrap(other)])
+
+    def __radd__(self, other: Matrix) -> 'LazyMatrix':
+        return Add([_wrap(other), self])
+
+    def __sub__(self, other: Union['LazyMatrix', Matrix]) -> 'LazyMatrix':
+        return Add([self, Scale(_wrap(other), -1)])
+
+    def __rsub__(self, other: Matrix) -> 'LazyMatrix':
+        return Add([_wrap(other), Scale(self, -1)])
+
+    def __neg__(self) -> 'LazyMatrix':
+        return Scale(self, -1)
+
+    @abstractmethod
+    def terms(self) -> list[tuple[Number, Matrix]]:
+        """ The expression as a linear combination [(coefficient, matrix), ...]
+            with every product chain already evaluated """
+
+    def evaluate(self) -> Matrix:
+        return _combine(self.terms(), self.rows, self.cols)
+
+
+class Leaf(LazyMatrix):
+
+    def __init__(self, matrix: Matrix) -> None:
+        self.matrix = matrix
+        self.rows, self.cols = matrix.rows, matrix.cols
+
+    def terms(self) -> list[tuple[Number, Matrix]]:
+        return [(1, self.matrix)]
+
+    def __repr__(self) -> str:
+        return f"Matrix({self.rows}x{self.cols})"
+
+
+class Scale(LazyMatrix):
+
+    def __init__(self, operand: LazyMatrix, k: Number) -> None:
+        self.operand, self.k = operand, k
+        self.rows, self.cols = operand.rows, operand.cols
+
+    def terms(self) -> list[tuple[Number, Matrix]]:
+        return [(self.k * c, m) for c, m in self.operand.terms()]
+
+    def __repr__(self) -> str:
+        return f"({self.operand!r} * {self.k})"
+
+
+class Add(LazyMatrix):
+
+    def __init__(self, operands: list[LazyMatrix]) -> None:
+        # flatten nested sums so the whole sum is fused into one pass
+        self.operands = []
+        for operand in operands:
+            if operand.shape != operands[0].shape:
+                raise TypeError(
+                    f"cannot add matrices of sizes {operands[0].rows}x{operands[0].cols} and {operand.rows}x{operand.cols}"
+                )
+            self.operands.extend(operand.operands if isinstance(operand, Add) else [operand])
+        self.rows, self.cols = operands[0].rows, operands[0].cols
+
+    def terms(self) -> list[tuple[Number, Matrix]]:
+        return [term for operand in self.operands for term in operand.terms()]
+
+    def __repr__(self) -> str:
+        return "(" + " + ".join(map(repr, self.operands)) + ")"
+
+
+class MatMul(LazyMatrix):
+
+    def __init__(self, factors: list[LazyMatrix]) -> None:
+        # flatten nested products into one chain so its order can be chosen freely
+        self.factors = []
+        for factor in factors:
+            self.factors.extend(factor.factors if isinstance(factor, MatMul) else [factor])
+        for a, b in zip(self.factors, self.factors[1:]):
+            if a.cols != b.rows:
+                raise TypeError(
+                    f"cannot multiply matrices of sizes {a.rows}x{a.cols} and {b.rows}x{b.cols}"
+                )
+        self.rows, self.cols = self.factors[0].rows, self.factors[-1].cols
+
+    def order(self) -> tuple[int, list[list[int]]]:
+        """ Matrix-chain dynamic programme: the minimum number of scalar
+            multiplications and the split table of the optimal parenthesization """
+        dims = [self.factors[0].rows] + [f.cols for f in self.factors]
+        n = len(self.factors)
+        cost = [[0] * n for _ in range(n)]
+        split = [[0] * n for _ in range(n)]
+        for length in range(2, n + 1):
+            for i in range(n - length + 1):
+                j = i + length - 1
+                cost[i][j] = None
+                for k in range(i, j):
+                    c = cost[i][k] + cost[k + 1][j] + dims[i] * dims[k + 1] * dims[j + 1]
+                    if cost[i][j] is None or c < cost[i][j]:
+                        cost[i][j], split[i][j] = c, k
+        return cost[0][n - 1], split
+
+    def terms(self) -> list[tuple[Number, Matrix]]:
+        # scalars are pulled out of the chain; only sums inside it are evaluated early
+        coefficient, operands = 1, []
+        for factor in self.factors:
+            factor_terms = factor.terms()
+            if len(factor_terms) == 1:
+                c, m = factor_terms[0]
+                coefficient *= c
+            else:
+                m = _combine(factor_terms, factor.rows, factor.cols)
+            operands.append(m)
+        _, split = self.order()
+
+        def multiply(i: int, j: int) -> Matrix:
+            if i == j:
+                return operands[i]
+            k = split[i][j]
+            return operands[i].multiply_matrix(multiply(i, k), multiply(k + 1, j))
+
+        return [(coefficient, multiply(0, len(operands) - 1))]
+
+    def __repr__(self) -> str:
+        return "(" + " @ ".join(map(repr, self.factors)) + ")"
+
+
+def _wrap(m: Union[LazyMatrix, Matrix]) -> LazyMatrix:
+    return m if isinstance(m, LazyMatrix) else Leaf(m)
+
+
+def _combine(terms: list[tuple[Number, Matrix]], rows: int, cols: int) -> Matrix:
+    # Fused element-wise pass: sum(c_i * M_i) without intermediate matrices
+    if len(terms) == 1 and terms[0][0] == 1:
+        # may be an operand of the expression itself; a copy-on-write copy is O(1)
+        return terms[0][1].copy()
+    if all(_is_numpy(m._buf) and (isinstance(c, (int, float, complex)) or _is_numpy_scalar(c)) for c, m in terms):
+        arrays = [m.to_numpy() for _, m in terms]
+        out = np.zeros((rows, cols), dtype=np.result_type(*arrays, *(c for c, _ in terms)))
+        for (c, _), arr in zip(terms, arrays):
+            out += arr if c == 1 else arr * c
+        return Matrix.from_numpy(out)
+    coefficients = [c for c, _ in terms]
+    mul = operator.mul
+    if all(c == 1 for c in coefficients):
+        combine = lambda *xs: sum(xs)
+    else:
+        combine = lambda *xs: sum(map(mul, coefficients, xs))
+    buf = list(map(combine, *(m._elements() for _, m in terms)))
+    return Matrix._from_buffer(buf, rows, cols)
@@ -0,0 +1,191 @@
+import numbers
+from matrices import Matrix, np, _real
+from utils import *
+
+
+def _unit(x: Number) -> Number:
+    # sign(x), or x / |x| for complex x (1 at 0), as in Higham's complex estimator
+    if isinstance(x, numbers.Complex) and not isinstance(x, numbers.Real):
+        r = abs(x)
+        return x / r if r else 1.0
+    return 1.0 if x >= 0 else -1.0
+
+
+class LUDecomposition:
+    """ PA = LU factorization with partial pivoting. L (unit lower triangular)
+        and U (upper triangular) are packed into a single n x n workspace and
+        perm[i] is the row of A that ended up in row i of PA """
+
+    def __init__(self, matrix: Matrix) -> None:
+        if not matrix.is_square():
+            raise TypeError(
+                "not a square matrix"
+            )
+        self.n = matrix.rows
+        self.perm = list(range(self.n))
+        self.sign = 1
+        self.singular = False
+        self._numpy = matrix.backend == "numpy"
+        # 1-norm of A, kept for the condition estimate
+        self.norm = max(sum(abs(elem) for elem in matrix.col(j)) for j in range(self.n))
+        if self._numpy:
+            self._factorize_numpy(matrix)
+        else:
+            self._factorize(matrix)
+
+    def _factorize(self, matrix: Matrix) -> None:
+        n = self.n
+        lu = [matrix.row(i).tolist() for i in range(n)]
+        for k in range(n):
+            p = max(range(k, n), key=lambda r: abs(lu[r][k]))
+            if lu[p][k] == 0:
+                self.singular = True
+                continue
+            self._swap(lu, k, p)
+            pivot_row = lu[k]
+            pivot = pivot_row[k]
+            for r in range(k + 1, n):
+                row = lu[r]
+                if row[k] == 0:
+                    continue
+                f = row[k] = exact_div(row[k], pivot)
+                for c in range(k + 1, n):
+                    row[c] -= f * pivot_row[c]
+        self.lu = lu
+
+    def _factorize_numpy(self, matrix: Matrix) -> None:
+        n = self.n
+        lu = matrix.to_numpy().astype(np.result_type(matrix.dtype, np.float64))
+        for k in range(n):
+            p = k + int(np.argmax(np.abs(lu[k:, k])))
+            if lu[p, k] == 0:
+                self.singular = True
+                continue
+            if p != k:
+                lu[[k, p]] = lu[[p, k]]
+                self.perm[k], self.perm[p] = self.perm[p], self.perm[k]
+                self.sign = -self.sign
+            lu[k + 1:, k] /= lu[k, k]
+            lu[k + 1:, k + 1:] -= np.outer(lu[k + 1:, k], lu[k, k + 1:])
+        self.lu = lu
+
+    def _swap(self, lu: list[list[Number]], k: int, p: int) -> None:
+        if p != k:
+            lu[k], lu[p] = lu[p], lu[k]
+            self.perm[k], self.perm[p] = self.perm[p], self.perm[k]
+            self.sign = -self.sign
+
+    def det(self) -> Number:
+        if self.singular:
+            return 0
+        d = self.sign
+        for i in range(self.n):
+            d *= self.lu[i][i]
+        return normalize_fraction(d)
+
+    def _check_singular(self) -> None:
+        if self.singular:
+            raise ValueError(
+                "matrix is singular"
+            )
+
+    def _substitute(self, b: list[list[Number]], transpose: Optional[bool] = False) -> list[list[Number]]:
+        # Forward and back substitution for every right-hand side at once;
+        # each element of b is one row of the n x k right-hand side
+        n, lu = self.n, self.lu
+        if not transpose:
+            # LUx = Pb
+            y = [list(b[self.perm[i]]) for i in range(n)]
+            for i in range(n):
+                for j in range(i):
+                    if lu[i][j] != 0:
+                        y[i] = [a - lu[i][j] * c for a, c in zip(y[i], y[j])]
+            for i in range(n - 1, -1, -1):
+                for j in range(i + 1, n):
+                    if lu[i][j] != 0:
+                        y[i] = [a - lu[i][j] * c for a, c in zip(y[i], y[j])]
+                y[i] = [normalize_fraction(exact_div(a, lu[i][i])) for a in y[i]]
+            return y
+        # A^T x = b  <=>  U^T L^T P x = b
+        w = [list(row) for row in b]
+        for i in range(n):
+            for j in range(i):
+                if lu[j][i] != 0:
+                    w[i] = [a - lu[j][i] * c for a, c in zip(w[i], w[j])]
+            w[i] = [exact_div(a, lu[i][i]) for a in w[i]]
+        for i in range(n - 1, -1, -1):
+            for j in range(i + 1, n):
+                if lu[j][i] != 0:
+                    w[i] = [a - lu[j][i] * c for a, c in zip(w[i], w[j])]
+        x = [None] * n
+        for i in range(n):
+            x[self.perm[i]] = [normalize_fraction(a) for a in w[i]]
+        return x
+
+    def _substitute_numpy(self, b: 'np.ndarray', transpose: Optional[bool] = False) -> 'np.ndarray':
+        n, lu = self.n, self.lu
+        if not transpose:
+            y = b[self.perm].astype(np.result_type(b, lu))
+            for i in range(1, n):
+                y[i] -= lu[i, :i] @ y[:i]
+            for i in range(n - 1, -1, -1):
+                y[i] = (y[i] - lu[i, i + 1:] @ y[i + 1:]) / lu[i, i]
+            return y
+        w = b.astype(np.result_type(b, lu))
+        for i in range(n):
+            w[i] = (w[i] - lu[:i, i] @ w[:i]) / lu[i, i]
+        for i in range(n - 1, -1, -1):
+            w[i] -= lu[i + 1:, i] @ w[i + 1:]
+        x = np.empty_like(w)
+        x[self.perm] = w
+        return x
+
+    def solve(
+        self,
+        b: Union[Matrix, Iterable[Number]],
+        transpose: Optional[bool] = False
+    ) -> Union[Matrix, list[Number]]:
+        """ Solve Ax = b (or A^T x = b) in O(n^2) per right-hand side. b may be a
+            Matrix with one column per right-hand side or a single vector """
+        self._check_singular()
+        is_matrix = isinstance(b, Matrix)
+        if is_matrix and b.rows != self.n or not is_matrix and len(b) != self.n:
+            raise TypeError(
+                f"right-hand side must have exactly {self.n} rows"
+            )
+        if self._numpy:
+            rhs = b.to_numpy() if is_matrix else np.asarray(list(b)).reshape(-1, 1)
+            x = self._substitute_numpy(rhs, transpose)
+            return Matrix.from_numpy(x) if is_matrix else x[:, 0]
+        rhs = [b.row(i) for i in range(self.n)] if is_matrix else [[elem] for elem in b]
+        x = self._substitute(rhs, transpose)
+        return Matrix(x) if is_matrix else [row[0] for row in x]
+
+    def inverse(self) -> Matrix:
+        self._check_singular()
+        if self._numpy:
+            return Matrix.from_numpy(self._substitute_numpy(np.eye(self.n, dtype=self.lu.dtype)))
+        return Matrix(self._substitute([[int(i == j) for j in range(self.n)] for i in range(self.n)]))
+
+    def cond(self, max_iterations: Optional[int] = 5) -> float:
+        """ Estimate of the 1-norm condition number ||A|| * ||A^-1|| using Hager's
+            method, which needs only a few O(n^2) solves instead of the inverse.
+            Complex matrices use x / |x| in place of sign(x) and solve with A^H """
+        if self.singular:
+            return float("inf")
+        n = self.n
+        x = [1 / n] * n
+        estimate = 0.0
+        for iteration in range(max_iterations):
+            y = self.solve(x)
+            estimate = sum(abs(elem) for elem in y)
+            xi = [_unit(elem) for elem in y]
+            # A^H z = xi  <=>  A^T conj(z) = conj(xi)
+            z = [elem.conjugate() for elem in self.solve([elem.conjugate() for elem in xi], transpose=True)]
+            j = max(range(n), key=lambda i: abs(z[i]))
+            if iteration and abs(z[j]) <= _real(sum(a.conjugate() * b for a, b in zip(z, x))):
+                break
+            x = [0.0] * n
+            x[j] = 1.0
+        return float(self.norm) * float(estimate)
+
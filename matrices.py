@@ -1,51 +1,356 @@
+import math
+import operator
+import sys
 from io import StringIO
 from utils import *
 
+# numpy is only imported once the numpy backend is actually used
+np = lazy_module("numpy")
+
+
+# Exact products with at least this many multiply-adds are split across
+# processes, when the caller asks for more than one
+PARALLEL_THRESHOLD = 250000
+# Side length of the square output tiles handed to each worker
+TILE_SIZE = 64
+# Inexact elimination treats entries below this many times max(m, n) * eps * ||A||
+# as zero; Gauss-Jordan residue runs about 10x past the bound that suffices for
+# an SVD based rank (numpy.linalg.matrix_rank)
+ZERO_TOLERANCE = 100
+
+# Packed (transposed) right operand, shipped once to each worker process
+_packed_cols = None
+
+
+def _init_tile_worker(packed_cols: list[list[Number]]) -> None:
+    global _packed_cols
+    _packed_cols = packed_cols
+
+
+def _multiply_tile(
+    rows: list[list[Number]], 
+    j0: int, 
+    j1: int, 
+    packed_cols: Optional[list[list[Number]]] = None
+) -> list[list[Number]]:
+    """ Compute the output block for a band of left-hand rows and columns j0..j1-1 """
+    cols = (_packed_cols if packed_cols is None else packed_cols)[j0:j1]
+    mul = operator.mul
+    return [[sum(map(mul, row, col)) for col in cols] for row in rows]
+
+
+def _can_start_workers() -> bool:
+    # Daemonic processes (multiprocessing.Pool workers) may not have children,
+    # and a spawned child still importing its __main__ must not start a pool
+    import multiprocessing
+    process = multiprocessing.current_process()
+    return not process.daemon and not getattr(process, "_inheriting", False)
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "the numpy backend requires numpy to be installed"
+        )
+
+
+def _is_numpy(obj: Any) -> bool:
+    # nothing can be an ndarray before numpy has been imported by someone
+    return "numpy" in sys.modules and isinstance(obj, np.ndarray)
+
+
+def _real(x: Number) -> Number:
+    # complex elements are ordered by their real part when aligning columns
+    return x.real if isinstance(x, complex) or _is_numpy_scalar(x) else x
+
+
+def _is_numpy_scalar(x: Any) -> bool:
+    return "numpy" in sys.modules and isinstance(x, np.generic)
+
+
+def _as_array(v: Any) -> Any:
+    if isinstance(v, VectorView):
+        return v.to_numpy()
+    return np.asarray(v)
+
+class VectorView:
+    """ Strided, zero-copy view onto a row or column of a matrix buffer """
+
+    __slots__ = ("_matrix", "_offset", "_stride", "_length")
+
+    def __init__(self, matrix: 'Matrix', offset: int, stride: int, length: int) -> None:
+        self._matrix = matrix
+        self._offset = offset
+        self._stride = stride
+        self._length = length
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += self._length
+        if not 0 <= i < self._length:
+            raise IndexError(
+                "view index out of range"
+            )
+        return self._offset + i * self._stride
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[Number, 'VectorView']:
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self._length)
+            return VectorView(
+                self._matrix, self._offset + start * self._stride, 
+                self._stride * step, len(range(start, stop, step))
+            )
+        return self._matrix._buf[self._index(i)]
+
+    def __setitem__(self, i: int, value: Number) -> None:
+        self._matrix._before_write()
+        self._matrix._buf[self._index(i)] = value
+
+    def __iter__(self) -> Iterable[Number]:
+        stop = self._offset + self._length * self._stride
+        return map(self._matrix._buf.__getitem__, range(self._offset, stop, self._stride))
+
+    def __eq__(self, other: Iterable[Number]) -> bool:
+        try:
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        except TypeError:
+            return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"VectorView({self.tolist()})"
+
+    def tolist(self) -> list[Number]:
+        if self.is_numpy():
+            return self.to_numpy().tolist()
+        return list(self)
+
+    def is_numpy(self) -> bool:
+        return _is_numpy(self._matrix._buf)
+
+    def to_numpy(self, copy: Optional[bool] = False) -> 'np.ndarray':
+        """ Zero-copy, read-only ndarray view for numpy-backed matrices, a new
+            array otherwise. copy=True always gives a new, writable array """
+        if not self.is_numpy():
+            _require_numpy()
+            return np.array(list(self))
+        stop = self._offset + self._length * self._stride
+        if stop < 0:
+            stop = None
+        view = self._matrix._buf[self._offset:stop:self._stride]
+        if copy:
+            return view.copy()
+        view.flags.writeable = False
+        return view
+
+
 class Matrix:
     
-    def __init__(self, data: Iterable[Number]) -> None:
-        self.data = list(data)
-        if not self.data:
+    def __init__(self, data: Iterable[Number], dtype: Optional[Any] = None) -> None:
+        data = list(data)
+        if not data:
             raise TypeError(
                 "matrix cannot be 0x0"
             )
-        self.rows = len(self.data)
-        if not isinstance(self.data[0], list):
-            self.rows = 1
-            self.cols = len(self.data)
+        if not isinstance(data[0], (list, tuple, VectorView)):
+            buf, rows, cols = data, 1, len(data)
         else:
-            self.cols = len(self.data[0])
-            for row in self.data:
-                if len(row) != self.cols:
+            rows, cols = len(data), len(data[0])
+            buf = []
+            for row in data:
+                if len(row) != cols:
                     raise TypeError(
                         "invalid matrix shape"
                     )
+                buf.extend(row)
+        if dtype is not None:
+            _require_numpy()
+            buf = np.asarray(buf, dtype=dtype)
+        self._init_buffer(buf, rows, cols)
+
+    def _init_buffer(
+        self, 
+        buf: list[Number], 
+        rows: int, 
+        cols: int, 
+        offset: Optional[int] = 0, 
+        strides: Optional[tuple[int, int]] = None
+    ) -> None:
+        # All elements live in one flat buffer; element (i, j) is found at
+        # offset + i * strides[0] + j * strides[1]
+        self._buf = buf
+        self.rows = rows
+        self.cols = cols
+        self._offset = offset
+        self._strides = (cols, 1) if strides is None else strides
+        # Cached PLU and fraction-free factorizations and exactness flag,
+        # dropped whenever an element is written
+        self._lu = None
+        self._fraction_free = None
+        self._exact = None
+        # Set while the buffer may be referenced by another matrix (copy-on-write)
+        self._shared = False
+
+    def _before_write(self) -> None:
+        # Every mutation goes through here: take a private copy of a shared
+        # buffer first, then drop anything cached about the old contents. The
+        # copy keeps offset and strides, so row and column views taken before
+        # the write still address the same elements
+        if self._shared:
+            self._buf = self._buf.copy() if _is_numpy(self._buf) else list(self._buf)
+            self._shared = False
+        self._lu = self._fraction_free = self._exact = None
+
+    @classmethod
+    def _from_buffer(
+        cls, 
+        buf: list[Number], 
+        rows: int, 
+        cols: int, 
+        offset: Optional[int] = 0, 
+        strides: Optional[tuple[int, int]] = None
+    ) -> 'Matrix':
+        m = cls.__new__(cls)
+        m._init_buffer(buf, rows, cols, offset, strides)
+        return m
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def strides(self) -> tuple[int, int]:
+        return self._strides
+
+    @property
+    def data(self) -> list[list[Number]]:
+        return [self.row(i).tolist() for i in range(self.rows)]
+
+    @property
+    def backend(self) -> str:
+        return "numpy" if _is_numpy(self._buf) else "exact"
+
+    @property
+    def dtype(self) -> Optional['np.dtype']:
+        return self._buf.dtype if _is_numpy(self._buf) else None
+
+    @classmethod
+    def from_numpy(cls, arr: 'np.ndarray') -> 'Matrix':
+        """ Wrap a 1D or 2D ndarray without copying it whenever its layout allows """
+        _require_numpy()
+        arr = np.asarray(arr)
+        if arr.ndim == 1:
+            arr = arr.reshape(1, -1)
+        if arr.ndim != 2 or not arr.size:
+            raise TypeError(
+                "only non-empty 1D or 2D arrays can be converted to a matrix"
+            )
+        rows, cols = arr.shape
+        if arr.flags.f_contiguous and not arr.flags.c_contiguous:
+            m = cls._from_buffer(arr.T.reshape(-1), rows, cols, 0, (1, rows))
+        else:
+            m = cls._from_buffer(np.ascontiguousarray(arr).reshape(-1), rows, cols)
+        # a read-only array (e.g. a view of a shared buffer) is copied on first write
+        m._shared = not m._buf.flags.writeable
+        return m
+
+    def to_numpy(self, dtype: Optional[Any] = None, copy: Optional[bool] = False) -> 'np.ndarray':
+        """ 2D ndarray of the matrix - a read-only view onto the buffer for the
+            numpy backend, so that writes can neither leak into a copy-on-write
+            copy nor get past the cached factorization. Writes go through
+            set_elem and the other mutators; copy=True gives a new, writable array """
+        _require_numpy()
+        if not _is_numpy(self._buf):
+            return np.array(self.data, dtype=dtype)
+        itemsize = self._buf.itemsize
+        arr = np.lib.stride_tricks.as_strided(
+            self._buf[self._offset:], 
+            shape=(self.rows, self.cols), 
+            strides=(self._strides[0] * itemsize, self._strides[1] * itemsize),
+            writeable=False
+        )
+        if copy:
+            return arr.astype(self._buf.dtype if dtype is None else dtype)
+        return arr if dtype is None else arr.astype(dtype, copy=False)
+
+    def astype(self, dtype: Optional[Any]) -> 'Matrix':
+        """ Convert between backends: a numpy dtype selects the numpy backend, 
+            None selects the exact backend of plain Python / sympy numbers """
+        if dtype is None:
+            if not _is_numpy(self._buf):
+                return self
+            return Matrix._from_buffer(self.to_numpy().reshape(-1).tolist(), self.rows, self.cols)
+        if _is_numpy(self._buf) and np.dtype(dtype) == self._buf.dtype:
+            # same dtype: to_numpy would hand back a view of this buffer
+            return self.copy()
+        return Matrix.from_numpy(self.to_numpy(dtype))
+
+    def is_contiguous(self) -> bool:
+        return self._strides == (self.cols, 1)
+
+    def _elements(self) -> Iterable[Number]:
+        # Row-major iteration over every element without building nested lists
+        if self.is_contiguous():
+            return iter(self._buf[self._offset:self._offset + self.rows * self.cols])
+        return (elem for i in range(self.rows) for elem in self.row(i))
+
+    def _index(self, i: int, j: int) -> int:
+        return self._offset + i * self._strides[0] + j * self._strides[1]
 
     def elem(self, i: int, j: int) -> Number:
-        if self.rows == 1:
-            return self.data[j]
-        return self.data[i][j]        
+        return self._buf[self._offset + i * self._strides[0] + j * self._strides[1]]
+
+    def set_elem(self, i: int, j: int, value: Number) -> None:
+        self._before_write()
+        self._buf[self._offset + i * self._strides[0] + j * self._strides[1]] = value
 
-    def row(self, i: int) -> list[Number]:
-        return self.data[i]
+    def row(self, i: int) -> VectorView:
+        return VectorView(self, self._offset + i * self._strides[0], self._strides[1], self.cols)
 
-    def col(self, i: int) -> list[Number]:
-        return [self.data[j][i] for j in range(self.rows)]
+    def col(self, i: int) -> VectorView:
+        return VectorView(self, self._offset + i * self._strides[1], self._strides[0], self.rows)
 
-    def set_row(self, i: int, row: list[Number]) -> None:
+    def set_row(self, i: int, row: Iterable[Number]) -> None:
         if len(row) != self.cols:
             raise TypeError(
                 f"row must contain exactly {self.cols} elements"
             )
-        self.data[i] = row
+        self._before_write()
+        start, step = self._index(i, 0), self._strides[1]
+        for k, elem in enumerate(row):
+            self._buf[start + k * step] = elem
 
-    def set_col(self, i: int, col: list[Number]) -> None:
+    def set_col(self, i: int, col: Iterable[Number]) -> None:
         if len(col) != self.rows:
             raise TypeError(
                 f"column must contain exactly {self.rows} elements"
             )
-        for r in range(self.rows):
-            self.data[r][i] = col[r]
+        self._before_write()
+        start, step = self._index(0, i), self._strides[0]
+        for k, elem in enumerate(col):
+            self._buf[start + k * step] = elem
+
+    def swap_rows(self, i: int, j: int) -> None:
+        if i == j:
+            return
+        self._before_write()
+        a, b, step = self._index(i, 0), self._index(j, 0), self._strides[1]
+        buf = self._buf
+        for k in range(self.cols):
+            buf[a], buf[b] = buf[b], buf[a]
+            a += step
+            b += step
+
+    def transpose(self) -> 'Matrix':
+        return self._share(self.cols, self.rows, self._offset, (self._strides[1], self._strides[0]))
+
+    def _share(self, rows: int, cols: int, offset: int, strides: tuple[int, int]) -> 'Matrix':
+        # New matrix over the same buffer; whichever side writes first copies
+        m = Matrix._from_buffer(self._buf, rows, cols, offset, strides)
+        m._shared = self._shared = True
+        return m
 
     def is_row(self) -> bool:
         return self.rows == 1
@@ -59,13 +364,13 @@ class Matrix:
     def __repr__(self) -> str:
         s = StringIO()
         col_lengths = [max([len(str(elem)) for elem in self.col(i)]) for i in range(self.cols)]
-        negatives = [any(map(lambda x: x < 0, self.col(i))) for i in range(self.cols)]
+        negatives = [any(map(lambda x: _real(x) < 0, self.col(i))) for i in range(self.cols)]
         for i in range(self.rows):
             print("|", end="", file=s)
             for j in range(self.cols):
                 str_len = len(str(self.elem(i, j)))
                 left_pad = (col_lengths[j] - str_len) // 2
-                if self.elem(i, j) >= 0 and negatives[j]:
+                if _real(self.elem(i, j)) >= 0 and negatives[j]:
                     left_pad += 1
                 right_pad = col_lengths[j] - str_len - left_pad
                 print(" " * left_pad + str(self.elem(i, j)) + " " * right_pad, end=" " if j + 1 != self.cols else "", file=s)
@@ -73,25 +378,100 @@ class Matrix:
         return s.getvalue()[:-1]
 
     def __mul__(self, other: Union['Matrix', Number]) -> 'Matrix':
-        if isinstance(other, Number):
+        """ Matrix or scalar product. Operand types that set the class attribute
+            _matrix_rmul = True (sparse, batched and lazy matrices) implement
+            Matrix * other themselves in __rmul__, so the product is left to them """
+        if getattr(other, "_matrix_rmul", False):
+            return NotImplemented
+        if not isinstance(other, Matrix):
             return self.multiply_scalar(other)
         return self.multiply_matrix(self, other)
     
-    def __pow__(self, exponent: int) -> 'Matrix':
+    def __pow__(self, exponent: int, modulus: Optional[int] = None) -> 'Matrix':
         if not self.is_square():
             raise TypeError(
                 "not a square matrix"
             )
+        base = self if modulus is None else self.reduce_mod(modulus)
+        if exponent < 0:
+            base = base.inverse() if modulus is None else base.inverse_mod(modulus)
+            exponent = -exponent
         if exponent == 0:
-            return Matrix(self.identity().data)
-        elif exponent < 0:
-            return self._ref() ** (-exponent)
-        m = Matrix([[1, 0], [0, 1]])
-        for _ in range(exponent):
-            m *= self
-        return m
+            return base.identity() if modulus is None else base.identity().reduce_mod(modulus)
+        # Binary exponentiation: square the base once per bit of the exponent
+        result = None
+        while True:
+            if exponent & 1:
+                result = base.copy() if result is None else self._multiply_mod(result, base, modulus)
+            exponent >>= 1
+            if not exponent:
+                return result
+            base = self._multiply_mod(base, base, modulus)
+
+    def _multiply_mod(self, m1: 'Matrix', m2: 'Matrix', modulus: Optional[int]) -> 'Matrix':
+        product = self.multiply_matrix(m1, m2)
+        return product if modulus is None else product.reduce_mod(modulus)
+
+    def reduce_mod(self, modulus: int) -> 'Matrix':
+        """ Copy of an integer matrix with every element reduced to [0, modulus) """
+        return Matrix._from_buffer(
+            [operator.index(elem) % modulus for elem in self._elements()], self.rows, self.cols
+        )
+
+    def inverse_mod(self, modulus: int) -> 'Matrix':
+        """ Inverse of an integer matrix modulo m by Gauss-Jordan elimination. Each
+            pivot is built from its column with extended Euclid row combinations,
+            so composite moduli work whenever det is invertible modulo m """
+        if not self.is_square():
+            raise TypeError(
+                "not a square matrix"
+            )
+        from number_theory import extended_gcd
+        n = self.rows
+        work = [
+            [operator.index(elem) % modulus for elem in self.row(i)] + [int(i == j) for j in range(n)] 
+            for i in range(n)
+        ]
+        for c in range(n):
+            for r in range(c + 1, n):
+                a, b = work[c][c], work[r][c]
+                if not b:
+                    continue
+                # Unimodular 2x2 step: row c gets gcd(a, b) in column c and row r gets 0
+                g, x, y = extended_gcd(a, b)
+                p, q = a // g, b // g
+                work[c], work[r] = (
+                    [(x * u + y * v) % modulus for u, v in zip(work[c], work[r])],
+                    [(q * u - p * v) % modulus for u, v in zip(work[c], work[r])]
+                )
+            try:
+                pivot_inverse = pow(work[c][c], -1, modulus)
+            except ValueError:
+                # det is a unit times the product of the pivots, so it is not invertible either
+                raise ValueError(
+                    f"matrix is not invertible modulo {modulus}"
+                ) from None
+            work[c] = [(elem * pivot_inverse) % modulus for elem in work[c]]
+            for r in range(n):
+                factor = work[r][c]
+                if r != c and factor:
+                    work[r] = [(a - factor * b) % modulus for a, b in zip(work[r], work[c])]
+        return Matrix([row[n:] for row in work])
+
+    def lazy(self) -> 'LazyMatrix':
+        """ Opt into deferred evaluation: operators on the result build an expression
+            tree that is only computed, in the cheapest order, by evaluate() """
+        from lazy import Leaf
+        return Leaf(self)
 
     def ew_add(self, a: Union[list[Number], Number], b: Union[list[Number], Number]) -> Union[list[Number], Number]:
+        if self._vectorized(a, b):
+            a, b = _as_array(a), _as_array(b)
+            if a.ndim and b.ndim and len(a) != len(b):
+                raise TypeError(
+                    "vectors must be the same length"
+                )
+            return np.add(a, b)
         if isinstance(a, Number):
             if isinstance(b, Number):
                 return a + b
@@ -105,6 +485,13 @@ class Matrix:
         return [i + j for i, j in zip(a, b)]
 
     def ew_mul(self, a: Union[list[Number], Number], b: Union[list[Number], Number]) -> Union[list[Number], Number]:
+        if self._vectorized(a, b):
+            a, b = _as_array(a), _as_array(b)
+            if a.ndim and b.ndim and len(a) != len(b):
+                raise TypeError(
+                    "vectors must be the same length"
+                )
+            return np.multiply(a, b)
         if isinstance(a, Number):
             if isinstance(b, Number):
                 return a * b
@@ -122,117 +509,329 @@ class Matrix:
             raise TypeError(
                 "not a square matrix"
             )
-        return Matrix([[int(i == j) for j in range(self.cols)] for i in range(self.rows)])
+        if _is_numpy(self._buf):
+            return Matrix.from_numpy(np.eye(self.rows, dtype=self._buf.dtype))
+        buf = [0] * (self.rows * self.cols)
+        buf[::self.cols + 1] = [1] * self.rows
+        return Matrix._from_buffer(buf, self.rows, self.cols)
     
-    def multiply_matrix(self, m1: 'Matrix', m2: 'Matrix') -> 'Matrix':
+    @timed()
+    def multiply_matrix(self, m1: 'Matrix', m2: 'Matrix', processes: Optional[int] = None) -> 'Matrix':
+        """ Product m1 * m2. Large exact products are spread over a pool of
+            worker processes only when processes > 1 is passed explicitly """
         if m1.cols != m2.rows:
             raise TypeError(
                 f"cannot multiply matrices of sizes {m1.rows}x{m1.cols} and {m2.rows}x{m2.cols}"
             )
-        data = [[0 for j in range(m2.cols)] for i in range(m1.rows)]
-        for i in range(m1.rows):
-            for j in range(m2.cols):
-                data[i][j] = self.dot(m1.row(i), m2.col(j))
-        return Matrix(data) 
+        if _is_numpy(m1._buf) and _is_numpy(m2._buf):
+            return Matrix.from_numpy(m1.to_numpy() @ m2.to_numpy())
+        # Pack both operands once so every dot product walks two contiguous lists
+        packed_rows = [m1.row(i).tolist() for i in range(m1.rows)]
+        packed_cols = [m2.col(j).tolist() for j in range(m2.cols)]
+        if (
+            processes is not None and processes > 1
+            and m1.rows * m1.cols * m2.cols >= PARALLEL_THRESHOLD
+            and _can_start_workers()
+        ):
+            return self._multiply_parallel(packed_rows, packed_cols, processes)
+        buf = []
+        for block in _multiply_tile(packed_rows, 0, m2.cols, packed_cols):
+            buf.extend(block)
+        return Matrix._from_buffer(buf, m1.rows, m2.cols)
+
+    def _multiply_parallel(
+        self, 
+        packed_rows: list[list[Number]], 
+        packed_cols: list[list[Number]], 
+        processes: int
+    ) -> 'Matrix':
+        rows, cols = len(packed_rows), len(packed_cols)
+        buf = [0] * (rows * cols)
+        tiles = [
+            (i0, j0) for i0 in range(0, rows, TILE_SIZE) for j0 in range(0, cols, TILE_SIZE)
+        ]
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(
+            max_workers=min(processes, len(tiles)), 
+            initializer=_init_tile_worker, 
+            initargs=(packed_cols,)
+        ) as pool:
+            futures = [
+                pool.submit(
+                    _multiply_tile, packed_rows[i0:i0 + TILE_SIZE], j0, min(j0 + TILE_SIZE, cols)
+                ) for i0, j0 in tiles
+            ]
+            for (i0, j0), future in zip(tiles, futures):
+                for di, block_row in enumerate(future.result()):
+                    start = (i0 + di) * cols + j0
+                    buf[start:start + len(block_row)] = block_row
+        return Matrix._from_buffer(buf, rows, cols)
 
     def multiply_scalar(self, k: Number) -> 'Matrix':
-        return Matrix([
-            [self.elem(i, j) * k for j in range(self.cols)] for i in range(self.rows)
-        ])
+        if _is_numpy(self._buf):
+            return Matrix.from_numpy(self.to_numpy() * k)
+        return Matrix._from_buffer([elem * k for elem in self._elements()], self.rows, self.cols)
+
+    def lu(self) -> 'LUDecomposition':
+        """ PLU factorization of the matrix, computed once and cached until the matrix is modified """
+        if self._lu is None:
+            from lu import LUDecomposition
+            self._lu = LUDecomposition(self)
+        return self._lu
+
+    def fraction_free(self) -> 'FractionFreeLU':
+        """ Fraction-free (Bareiss) elimination of an exact matrix, computed once and
+            cached until the matrix is modified """
+        if self._fraction_free is None:
+            from bareiss import FractionFreeLU
+            self._fraction_free = FractionFreeLU(self.data)
+        return self._fraction_free
+
+    def det(self) -> Number:
+        if self.is_exact():
+            return self._exact_converter()(self.fraction_free().det())
+        return self.lu().det()
+
+    def rank(self) -> int:
+        """ Exact for rational matrices; otherwise the number of pivots found by
+            Gauss-Jordan elimination with a max(m, n) * eps * ||A|| zero tolerance """
+        if self.is_exact():
+            return self.fraction_free().rank()
+        return len(self._pivots(self.rref()))
+
+    def nullspace(self) -> list[list[Number]]:
+        """ Basis of the kernel {v : Mv = 0}, computed exactly by fraction-free elimination
+            for rational matrices and from the tolerance-based rref otherwise """
+        if self.is_exact():
+            import bareiss
+            convert = self._exact_converter()
+            return [[convert(elem) for elem in v] for v in bareiss.nullspace(self.data)]
+        reduced = self.rref()
+        pivots = self._pivots(reduced)
+        basis = []
+        for f in range(self.cols):
+            if f in pivots:
+                continue
+            v = [0.0] * self.cols
+            v[f] = 1.0
+            for i, p in enumerate(pivots):
+                v[p] = -reduced.elem(i, f)
+            basis.append(v)
+        return basis
+
+    @staticmethod
+    def _pivots(reduced: 'Matrix') -> list[int]:
+        # leading column of every nonzero row of a matrix in rref
+        pivots = []
+        for i in range(reduced.rows):
+            lead = next((j for j, elem in enumerate(reduced.row(i)) if elem != 0), None)
+            if lead is None:
+                break
+            pivots.append(lead)
+        return pivots
 
-    def det(self, M: 'Matrix') -> Number:
-        pass
+    def is_exact(self) -> bool:
+        """ Whether or not every element is an exact rational (int, Fraction, sympy Rational) """
+        if self._exact is None:
+            import bareiss
+            self._exact = not _is_numpy(self._buf) and all(map(bareiss.is_rational, self._elements()))
+        return self._exact
+
+    def _exact_converter(self) -> Callable[[Number], Number]:
+        # Exact results are handed back as ints or Fractions, or as sympy
+        # Rationals for matrices that already hold sympy numbers
+        from fractions import Fraction
+        if any(type(elem).__module__.startswith("sympy") for elem in self._elements()):
+            import sympy
+            return lambda x: sympy.Rational(Fraction(x).numerator, Fraction(x).denominator)
+        return lambda x: x.numerator if Fraction(x).denominator == 1 else Fraction(x)
+
+    def solve(self, b: Union['Matrix', Iterable[Number]]) -> Union['Matrix', list[Number]]:
+        """ Solve Mx = b, where b is a Matrix with one column per right-hand side or a
+            single vector. Exact systems are solved by fraction-free elimination,
+            anything else from the cached PLU factorization """
+        is_matrix = isinstance(b, Matrix)
+        rhs = [b.row(i).tolist() for i in range(b.rows)] if is_matrix else [[elem] for elem in b]
+        import bareiss
+        if not self.is_exact() or not all(bareiss.is_rational(elem) for row in rhs for elem in row):
+            return self.lu().solve(b if is_matrix else [row[0] for row in rhs])
+        if not self.is_square():
+            raise TypeError(
+                "not a square matrix"
+            )
+        if len(rhs) != self.rows:
+            raise TypeError(
+                f"right-hand side must have exactly {self.rows} rows"
+            )
+        convert = self._exact_converter()
+        x = [[convert(elem) for elem in row] for row in self.fraction_free().solve(rhs)]
+        return Matrix(x) if is_matrix else [row[0] for row in x]
+
+    def cond(self) -> float:
+        return self.lu().cond()
     
-    def inverse(self) -> 'Matrix':
-        M = self.copy()
-        print(self is M)
-        augmented = M.augment(M.identity())
-        reduced = M.rref(augmented)
-        inverse_matrix = Matrix([reduced.row(i)[M.rows:] for i in range(reduced.rows)])
-        return inverse_matrix
+    def inverse(self, method: Optional[str] = "lu") -> 'Matrix':
+        """ Inverse from the cached PLU factorization (fraction-free solve of MX = I
+            for exact matrices), or by Gauss-Jordan elimination on a single
+            n x 2n workspace [M | I] """
+        if method == "lu":
+            if self.is_exact():
+                return self.solve(self.identity())
+            return self.lu().inverse()
+        if method != "gauss-jordan":
+            raise ValueError(
+                f"unknown inversion method {method!r}"
+            )
+        if not self.is_square():
+            raise TypeError(
+                "not a square matrix"
+            )
+        n = self.rows
+        if _is_numpy(self._buf):
+            work = np.zeros((n, 2 * n), dtype=np.result_type(self._buf.dtype, np.float64))
+            work[:, :n] = self.to_numpy()
+            work[:, n:] = np.eye(n)
+            workspace = Matrix.from_numpy(work)
+        else:
+            buf = [0] * (2 * n * n)
+            for i in range(n):
+                buf[2 * n * i:2 * n * i + n] = self.row(i)
+                buf[2 * n * i + n + i] = 1
+            workspace = Matrix._from_buffer(buf, n, 2 * n)
+        workspace.rref_()
+        if any(workspace.elem(i, i) != 1 for i in range(n)):
+            raise ValueError(
+                "matrix is singular"
+            )
+        # The inverse is the right half of the workspace, returned as a view
+        return Matrix._from_buffer(workspace._buf, n, n, n, (2 * n, 1))
+
+    def augment_(self, other: 'Matrix') -> 'Matrix':
+        """ In-place variant of augment: this matrix becomes [self | other] """
+        augmented = self.augment(other)
+        self._init_buffer(augmented._buf, augmented.rows, augmented.cols)
+        return self
 
     def augment(self, other: 'Matrix') -> 'Matrix':
         if self.rows != other.rows or self.cols != other.cols:
             raise TypeError(
                 "matrices must be square and have the same size to be augmented"
             ) 
-        data = self.data.copy()
-        for i in range(len(data)):
-            data[i].extend(other.row(i))
-        return Matrix(data)
+        if _is_numpy(self._buf):
+            return Matrix.from_numpy(np.hstack((self.to_numpy(), other.to_numpy())))
+        buf = []
+        for i in range(self.rows):
+            buf.extend(self.row(i))
+            buf.extend(other.row(i))
+        return Matrix._from_buffer(buf, self.rows, self.cols + other.cols)
 
     def dot(self, v1: Iterable[Number], v2: Iterable[Number]) -> Number:
         if len(v1) != len(v2):
             raise TypeError(
                 f"cannot compute the dot product of vectors of length {len(v1)} and {len(v2)}"
             )
-        return sum(self.ew_mul(v1, v2))
+        if self._vectorized(v1, v2):
+            return np.dot(_as_array(v1), _as_array(v2))
+        return sum(map(operator.mul, v1, v2))
+
+    def _vectorized(self, *operands: Any) -> bool:
+        # Batched numpy kernels are used as soon as any operand is numpy-backed
+        return any(
+            _is_numpy(v) or (isinstance(v, VectorView) and v.is_numpy()) for v in operands
+        )
 
     def copy(self) -> 'Matrix':
-        return Matrix(self.data)
-
-    def rref(self, M: 'Matrix') -> 'Matrix':
-        # Let's do forward step first.
-        # at the end of this for loop, the matrix is in Row-Echelon format.
-        for i in range(min(M.rows, M.cols)):
-            # every iteration, ignore one more row and column
-            for r in range(i, M.rows):
-                # find the first row with a nonzero entry in first column
-                zero_row = M.elem(r, i) == 0
-                if zero_row:
-                    continue
-                # swap current row with first row
-                M.data[i], M.data[r] = M.data[r], M.data[i]
-                # add multiples of the new first row to lower rows so lower
-                # entries of first column is zero
-                first_row_first_col = M.elem(i, i)
-                for rr in range(i + 1, M.rows):
-                    this_row_first = M.elem(rr, i)
-                    scalarMultiple = -1 * this_row_first / first_row_first_col
-                    for cc in range(i, M.cols):
-                        M.data[rr][cc] += M.data[i][cc] * scalarMultiple
+        """ O(1) copy-on-write copy: the buffer is only duplicated once either matrix is written to """
+        m = self._share(self.rows, self.cols, self._offset, self._strides)
+        m._lu, m._fraction_free, m._exact = self._lu, self._fraction_free, self._exact
+        return m
+
+    @timed()
+    def rref(self, M: Optional['Matrix'] = None, exact: Optional[bool] = None) -> 'Matrix':
+        """ Reduced row echelon form of M (default: this matrix), leaving M untouched.
+            Exact rational matrices use fraction-free Bareiss elimination unless
+            exact=False, anything else uses floating point Gauss-Jordan elimination """
+        return (self if M is None else M).copy().rref_(exact)
+
+    @timed()
+    def rref_(self, exact: Optional[bool] = None) -> 'Matrix':
+        """ In-place variant of rref for callers that own the matrix buffer """
+        M = self
+        if exact is None:
+            exact = M.is_exact()
+        if exact:
+            import bareiss
+            reduced = bareiss.rref(M.data)
+            convert = M._exact_converter()
+            M._init_buffer([convert(elem) for row in reduced for elem in row], M.rows, M.cols)
+            return M
+        if _is_numpy(M._buf) and M._buf.dtype.kind in "biu":
+            # integer buffers cannot hold the quotients below
+            M._init_buffer(M.to_numpy().astype(np.float64).reshape(-1), M.rows, M.cols)
+        # Gauss-Jordan elimination with partial pivoting. Column entries no larger
+        # than the tolerance are rounding residue and are cleared instead of
+        # being used as pivots
+        tol = M._tolerance()
+        r = 0
+        for c in range(M.cols):
+            if r == M.rows:
                 break
-        # Now reduce
-        for i in range(min(M.rows, M.cols) - 1, -1, -1):
-            # divide last non-zero row by first non-zero entry
-            first_elem_col = -1
-            first_elem = -1
-            for c in range(M.cols):
-                if M.elem(i, c) == 0:
+            p = max(range(r, M.rows), key=lambda i: abs(M.elem(i, c)))
+            if abs(M.elem(p, c)) <= tol:
+                for i in range(r, M.rows):
+                    M.set_elem(i, c, 0)
+                continue
+            M.swap_rows(r, p)
+            # scale the pivot row so that it leads with a 1
+            pivot = M.elem(r, c)
+            M.set_elem(r, c, 1)
+            for cc in range(c + 1, M.cols):
+                M.set_elem(r, cc, M.elem(r, cc) / pivot)
+            # then subtract multiples of it from every other row
+            for i in range(M.rows):
+                factor = M.elem(i, c)
+                if i == r or factor == 0:
                     continue
-                if first_elem_col == -1:
-                    first_elem_col = c
-                    first_elem = M.elem(i, c)
-                M.data[i][c] /= first_elem
-            # add multiples of this row so all numbers above the leading 1 is zero
-            for r in range(i):
-                this_row_above = M.elem(r, first_elem_col)
-                scalarMultiple = -1 * this_row_above
-                for cc in range(M.cols):
-                    M.data[r][cc] += M.elem(i, cc) * scalarMultiple
-            # disregard this row and continue
+                M.set_elem(i, c, 0)
+                for cc in range(c + 1, M.cols):
+                    M.set_elem(i, cc, M.elem(i, cc) - factor * M.elem(r, cc))
+            r += 1
         return M
 
-n = Number
-
-m1 = Matrix([
-    [n(1), n(-1),  n(2), n(13), n(3), n(-4)], 
-    [n(0),  n(0),  n(3), n(8), n(-1),  n(2)],
-    [n(3),  n(1), n(-1), n(67), n(-5),  n(-2)],
-    [n(5),  n(14), n(-51), n(70), n(35),  n(6)],
-    [n(3),  n(21), n(-16), n(17), n(15),  n(31)],
-    [n(6),  n(-11), n(11), n(3), n(-1),  n(-3)]
-])  
-m2 = Matrix([
-    [1, -3], 
-    [4, 5],
-    [3, 0]
-])
-m3 = Matrix([
-    [n(1), n(-1),  n(2), n(13), n(3), n(-4)], 
-    [n(0),  n(0),  n(3), n(8), n(-1),  n(2)],
-    [n(3),  n(1), n(-1), n(67), n(-5),  n(-2)],
-    [n(5),  n(14), n(-51), n(70), n(35),  n(6)],
-    [n(3),  n(21), n(-16), n(17), n(15),  n(31)],
-    [n(6),  n(-11), n(11), n(3), n(-1),  n(-3)]
-])  
+    def _tolerance(self) -> float:
+        # Magnitude below which inexact elimination treats an entry as zero, scaled
+        # by ZERO_TOLERANCE; the Frobenius norm stands in for the largest singular value
+        if _is_numpy(self._buf) and self._buf.dtype.kind in "fc":
+            eps = float(np.finfo(self._buf.dtype).eps)
+        else:
+            eps = sys.float_info.epsilon
+        norm = math.sqrt(sum(abs(elem) ** 2 for elem in self._elements()))
+        return ZERO_TOLERANCE * max(self.rows, self.cols) * eps * float(norm)
+
+if __name__ == "__main__":
+    from sympy import Number as n
+
+    m1 = Matrix([
+        [n(1), n(-1),  n(2), n(13), n(3), n(-4)], 
+        [n(0),  n(0),  n(3), n(8), n(-1),  n(2)],
+        [n(3),  n(1), n(-1), n(67), n(-5),  n(-2)],
+        [n(5),  n(14), n(-51), n(70), n(35),  n(6)],
+        [n(3),  n(21), n(-16), n(17), n(15),  n(31)],
+        [n(6),  n(-11), n(11), n(3), n(-1),  n(-3)]
+    ])  
+    m2 = Matrix([
+        [1, -3], 
+        [4, 5],
+        [3, 0]
+    ])
+    m3 = Matrix([
+        [n(1), n(-1),  n(2), n(13), n(3), n(-4)], 
+        [n(0),  n(0),  n(3), n(8), n(-1),  n(2)],
+        [n(3),  n(1), n(-1), n(67), n(-5),  n(-2)],
+        [n(5),  n(14), n(-51), n(70), n(35),  n(6)],
+        [n(3),  n(21), n(-16), n(17), n(15),  n(31)],
+        [n(6),  n(-11), n(11), n(3), n(-1),  n(-3)]
+    ])
+    print(m1.rref())
+    print(m2.transpose() * m2)
+    print(m3.det())
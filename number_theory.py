@@ -1,36 +1,131 @@
-import time
-from typing import Callable, Any, Iterable, Optional
-
-def timed(verbose: Optional[bool] = False) -> Callable:
-    def wrapper(fn: Callable) -> Callable:
-        def inner(*args, **kwargs) -> Any:
-            start = time.perf_counter()
-            value = fn(*args, **kwargs)
-            end = time.perf_counter()
-            if verbose:
-                print(f"Function {fn.__name__} ran in {(end-start):.10f}s")
-            return value
-        return inner
-    return wrapper
+import math
+import operator
+import random
+from array import array
+from collections import deque
+from itertools import compress
+from typing import Callable, Any, Iterable, Iterator, NamedTuple, Optional, Union
+from utils import timed
+
+# Optional compiled 64-bit kernels (python setup.py build_ext --inplace). Each
+# native call raises OverflowError for arguments wider than 64 bits (and
+# TypeError for non-integers), in which case the pure Python code below takes over
+try:
+    import _number_theory as _native
+except ImportError:
+    _native = None
 
 def gcd(a: int, b: int) -> int:
     """ Find the greatest common divisor of integers a and b """
-    while a % b != 0:
-        temp = a
-        a = b
-        b = temp % b
-    return b
+    return math.gcd(a, b)
 
 def is_coprime(a: int, b: int) -> bool:
     """ Whether or not integers a and b are relatively prime """
     return gcd(a, b) == 1
 
-def is_prime(n: int) -> bool:
-    """ Whether or not integer n is a prime """
-    return len(factors(n)) == 2
+# Primes below 1000, used for trial division before the heavier tests
+_SMALL_PRIMES = [p for p in range(2, 1000) if all(p % q for q in range(2, math.isqrt(p) + 1))]
+# Witnesses that make Miller-Rabin deterministic for every n < 3.3 * 10^24 (covers 64-bit)
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+_MR_LIMIT = 3317044064679887385961981
 
-def euclidean_algorithm(a: int, b: int) -> tuple[int, int]:
-    """ Euclid's algorithm to find integers x and y such that ax + by = gcd(a, b) """
+def _strong_probable_prime(n: int, a: int, d: int, s: int) -> bool:
+    """ Miller-Rabin round: whether n passes the strong probable prime test to base a,
+        where n - 1 = d * 2^s with d odd """
+    if _native is not None and n < 1 << 64:
+        return _native.strong_probable_prime(n, a, d, s)
+    x = pow(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for _ in range(s - 1):
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+def is_prime(n: int, rounds: Optional[int] = 16) -> bool:
+    """ Whether or not integer n is a prime. Exact below 3.3 * 10^24 (all 64-bit
+        inputs); above that n is a strong probable prime to `rounds` extra random bases """
+    if n < 2:
+        return False
+    for p in _SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < _SMALL_PRIMES[-1] ** 2:
+        return True
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    if not all(_strong_probable_prime(n, a, d, s) for a in _MR_BASES):
+        return False
+    if n < _MR_LIMIT:
+        return True
+    return all(_strong_probable_prime(n, random.randrange(2, n - 1), d, s) for _ in range(rounds))
+
+def pollard_rho(n: int) -> int:
+    """ Find a non-trivial factor of composite n with Brent's variant of Pollard's rho """
+    if n % 2 == 0:
+        return 2
+    while True:
+        y, c, m = random.randrange(1, n), random.randrange(1, n), 128
+        g = r = q = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                ys = y
+                # batch the gcds: multiply m differences together first
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = math.gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # the batch overshot; step back one iteration at a time
+            while True:
+                ys = (ys * ys + c) % n
+                g = math.gcd(abs(x - ys), n)
+                if g > 1:
+                    break
+        if g != n:
+            return g
+
+@timed()
+def factorize(n: int) -> dict[int, int]:
+    """ Prime factorization of an integer n > 0 as {prime: exponent} """
+    assert n > 0, "only positive integers can be factorized"
+    factorization = {}
+    for p in _SMALL_PRIMES:
+        if p * p > n:
+            break
+        while n % p == 0:
+            factorization[p] = factorization.get(p, 0) + 1
+            n //= p
+    stack = [n] if n > 1 else []
+    while stack:
+        m = stack.pop()
+        if is_prime(m):
+            factorization[m] = factorization.get(m, 0) + 1
+            continue
+        root = math.isqrt(m)
+        if root * root == m:
+            stack.extend((root, root))
+            continue
+        d = pollard_rho(m)
+        stack.extend((d, m // d))
+    return dict(sorted(factorization.items()))
+
+def extended_gcd(a: int, b: int) -> tuple[int, int, int]:
+    """ Extended Euclidean algorithm: (g, x, y) such that ax + by = g = gcd(a, b) """
+    if _native is not None:
+        try:
+            return _native.extended_gcd(a, b)
+        except (OverflowError, TypeError):
+            pass
     s, old_s = 0, 1
     t, old_t = 1, 0
     r, old_r = b, a
@@ -39,14 +134,28 @@ def euclidean_algorithm(a: int, b: int) -> tuple[int, int]:
         old_r, r = r, old_r - quotient * r
         old_s, s = s, old_s - quotient * s
         old_t, t = t, old_t - quotient * t
-    x, y = old_s, old_t
+    return old_r, old_s, old_t
+
+def pow_mod(base: int, exponent: int, m: int) -> int:
+    """ base^exponent (mod m) for exponent >= 0 and m > 0 """
+    if _native is not None:
+        try:
+            return _native.pow_mod(base, exponent, m)
+        except (OverflowError, TypeError):
+            pass
+    return pow(base, exponent, m)
+
+def euclidean_algorithm(a: int, b: int) -> tuple[int, int]:
+    """ Euclid's algorithm to find integers x and y such that ax + by = gcd(a, b) """
+    _, x, y = extended_gcd(a, b)
     return x, y
 
 def multiplicative_inverse(a: int, m: int, check_coprime: Optional[bool] = True) -> int:
     """ Find integer n such that an ≡ 1 (mod m) """
+    g, x, _ = extended_gcd(a, m)
     if check_coprime:
-        assert is_coprime(a, m), f"no multiplicative inverse exists for {a} (mod {m})"
-    return euclidean_algorithm(a, m)[0] % m
+        assert abs(g) == 1, f"no multiplicative inverse exists for {a} (mod {m})"
+    return x % m
 
 def solve_congruence(a: int, b: int, m: int) -> list[int]:
     """ Solve for integers x such that ax ≡ b (mod m)
@@ -63,15 +172,89 @@ def chinese_remainder(remainders: list[int], moduli: list[int]) -> int:
     """ Use the Chinese Remainder Theorem to solve for x (mod N)
         where x ≡ b1 (mod n1), x ≡ b2 (mod n2), ... """
     assert len(remainders) == len(moduli), "remainders and moduli arrays must be the same length"
-    x = 0
-    N = 1
-    for m in moduli:
-        N *= m
-    for rem, mod in zip(remainders, moduli):
-        N_i = N // mod
-        n = multiplicative_inverse(N_i, mod)
-        x += rem * N_i * n
-    return x % N
+    return CRTBasis(moduli).solve(remainders)
+
+
+"""
+Batched modular arithmetic: amortize the per-call work over many inputs
+that share a modulus or a set of moduli
+"""
+
+class CRTBasis:
+    """ Precomputed Chinese Remainder Theorem constants for a fixed set of
+        pairwise coprime moduli. Each system then costs one dot product:
+        x = Σ b_i * c_i (mod N) where c_i = N_i * (N_i^-1 mod n_i) """
+
+    def __init__(self, moduli: Iterable[int]) -> None:
+        self.moduli = list(moduli)
+        self.N = product(self.moduli)
+        self.coefficients = []
+        for mod in self.moduli:
+            N_i = self.N // mod
+            self.coefficients.append(N_i * multiplicative_inverse(N_i, mod) % self.N)
+
+    def solve(self, remainders: Iterable[int]) -> int:
+        remainders = list(remainders)
+        assert len(remainders) == len(self.moduli), "remainders and moduli arrays must be the same length"
+        return sum(map(operator.mul, remainders, self.coefficients)) % self.N
+
+    def solve_many(self, systems: Iterable[Iterable[int]]) -> list[int]:
+        """ Solve one system per vector of remainders, all against the same moduli """
+        return [self.solve(remainders) for remainders in systems]
+
+def batch_inverse(values: Iterable[int], m: int) -> list[int]:
+    """ Montgomery's trick: the inverses of every value modulo m for the price of
+        a single modular inverse plus 3(n - 1) multiplications """
+    values = [v % m for v in values]
+    if not values:
+        return []
+    prefix = [values[0]]
+    for v in values[1:]:
+        prefix.append(prefix[-1] * v % m)
+    g, inverse, _ = extended_gcd(prefix[-1], m)
+    assert abs(g) == 1, f"some value has no multiplicative inverse (mod {m})"
+    inverse %= m
+    inverses = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        inverses[i] = inverse * prefix[i - 1] % m
+        inverse = inverse * values[i] % m
+    inverses[0] = inverse
+    return inverses
+
+def solve_congruences(coefficients: Iterable[int], rhs: Iterable[int], m: int) -> list[list[int]]:
+    """ solve_congruence for many pairs (a, b) against one modulus m. Every a that
+        is a unit modulo m shares a single batch inversion """
+    coefficients, rhs = list(coefficients), list(rhs)
+    assert len(coefficients) == len(rhs), "coefficients and right-hand sides must be the same length"
+    units = [i for i, a in enumerate(coefficients) if math.gcd(a, m) == 1]
+    solutions = [None] * len(coefficients)
+    for i, n in zip(units, batch_inverse((coefficients[i] for i in units), m)):
+        solutions[i] = [rhs[i] * n % m]
+    for i, a in enumerate(coefficients):
+        if solutions[i] is None:
+            solutions[i] = solve_congruence(a, rhs[i], m)
+    return solutions
+
+def gcd_array(a: Any, b: Any) -> 'np.ndarray':
+    """ Element-wise gcd of int64 arrays (either side may be a scalar) """
+    import numpy as np
+    return np.gcd(np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64))
+
+def inverse_array(a: Any, m: Any) -> 'np.ndarray':
+    """ Element-wise multiplicative inverse of int64 arrays by a vectorized extended
+        Euclidean algorithm. Elements without an inverse come back as 0 """
+    import numpy as np
+    a, m = np.broadcast_arrays(np.asarray(a, dtype=np.int64), np.asarray(m, dtype=np.int64))
+    old_r, r = a % m, m.copy()
+    old_s, s = np.ones_like(old_r), np.zeros_like(old_r)
+    # every lane runs its own Euclid; finished lanes (r == 0) are held fixed
+    while np.any(r):
+        active = r != 0
+        q = np.zeros_like(r)
+        np.floor_divide(old_r, r, out=q, where=active)
+        old_r, r = np.where(active, r, old_r), np.where(active, old_r - q * r, r)
+        old_s, s = np.where(active, s, old_s), np.where(active, old_s - q * s, s)
+    return np.where(old_r == 1, old_s % m, 0)
 
 def product(iterable: Iterable[int]) -> int:
     """ Find the product of all elements in a collection of integers """
@@ -82,28 +265,20 @@ def product(iterable: Iterable[int]) -> int:
 
 def factors(n: int) -> list[int]:
     """ List the factors of an integer """
-    square = (n ** (1/2)) % 1 == 0.0
-    f = [i for i in range(1, int(n ** (1/2)) + 1) if n % i == 0]
-    for i in range(len(f) - (2 if square else 1), -1, -1):
-        f.append(n // f[i])
-    return f
+    f = [1]
+    for p, e in factorize(n).items():
+        f = [d * p ** k for d in f for k in range(e + 1)]
+    return sorted(f)
 
 def prime_factors(n: int) -> list[int]:
     """ Find the unique combination of prime factors that make up an integer n (F.T.O.A.) """
-    f = factors(n)[1:-1]
-    if not f:
-        return [n]
-    for k in f:
-        if not is_prime(k):
-            return prime_factors(k) + prime_factors(n//k)
-    else:
-        return f if len(f) != 1 else [f[0], f[0]]
+    return [p for p, e in factorize(n).items() for _ in range(e)]
 
 def euler_totient(n: int, prime: Optional[bool] = True) -> int:
     """ Euler's totient function φ - counts the number of positive integers
         up to positive integer n that are relatively prime to n.
         φ(p) = p - 1, φ(pq) = φ(p)φ(q) if and only if p and q are distinct primes """
-    distinct_prime_factors = set(prime_factors(n))
+    distinct_prime_factors = factorize(n)
     return n // product(distinct_prime_factors) * product([(p - 1) for p in distinct_prime_factors])
 
 
@@ -112,42 +287,246 @@ Various versions of a general number sieve used to
 find all prime numbers less than an integer n 
 """
 
+@timed()
+def odd_sieve(n: int) -> bytearray:
+    """ Sieve kernel over the odd numbers only: flags[i] == 1 if and only if
+        2i + 1 is a prime less than n. One byte per odd number, crossed off
+        from p^2 upwards with slice assignment """
+    if _native is not None:
+        return _native.odd_sieve(n)
+    size = max(n // 2, 0)
+    flags = bytearray([1]) * size
+    if size:
+        flags[0] = 0
+    for i in range(1, (math.isqrt(n - 1) - 1) // 2 + 1 if n > 1 else 0):
+        if flags[i]:
+            p = 2 * i + 1
+            start = p * p // 2
+            flags[start::p] = bytes(len(range(start, size, p)))
+    return flags
+
+def iter_primes(n: int) -> Iterator[int]:
+    """ Generate the primes less than n in increasing order. Past one segment
+        the flags are sieved segment by segment instead of all n / 2 at once """
+    if n > SEGMENT_SIZE:
+        yield from segmented_primes(0, n)
+        return
+    if n > 2:
+        yield 2
+    yield from compress(range(1, n, 2), odd_sieve(n))
+
+def primes_array(n: int) -> array:
+    """ All primes less than n as a compact array of unsigned 64-bit integers """
+    if n > SEGMENT_SIZE:
+        primes = array("Q")
+        for chunk in segmented_primes(0, n, chunks=True):
+            primes.extend(chunk)
+        return primes
+    return array("Q", iter_primes(n))
+
+@timed()
+def prime_count(n: int) -> int:
+    """ Number of primes less than n, without materializing them """
+    if n > SEGMENT_SIZE:
+        return count_primes(0, n)
+    return odd_sieve(n).count(1) + (n > 2)
+
+@timed()
 def sieve(n: int) -> list[int]:
-    assert n <= 100000000, "n is too large, use the segmented_sieve function instead"
-    nums = list(range(2, n))
-    for i in range(len(nums)):
-        if nums[i] == 0:
-            continue
-        j = 2 * nums[i]
-        while j < n:
-            nums[j - 2] = 0
-            j += nums[i]
-    return list(filter(lambda n: n != 0, nums))
-    
-def _segment(nums: list[int], known_primes: list[int]) -> list[int]:
-    lower, upper = nums[0], nums[-1]
-    if not known_primes:
-        return sieve(upper+1)
-    for p in known_primes:
-        j = lower % p
-        if j != 0:
-            j = p - j
-        while j < upper - lower + 1:
-            nums[j] = 0
-            j += p
-    return list(filter(lambda n: n != 0, nums))
+    return list(iter_primes(n))
     
-def segmented_sieve(n: int, segment_size: Optional[int] = None) -> list[int]:
-    if n < 10:
-        return sieve(n)
-    if segment_size is None:
-        segment_size = min(1000000, max(10, n // 100))
-    primes = []
-    n_segments = n // segment_size + (n % segment_size != 0)
-    for i in range(n_segments):
-        nums = list(range(i * segment_size if i else 2, (i + 1) * segment_size))
-        primes.extend(_segment(nums, primes))
-        print(f"Finished segment {i+1}/{n_segments}: found {len(primes)} primes so far")
+# Default number of integers covered by one segment of the segmented sieve
+SEGMENT_SIZE = 1 << 20
+
+# Odd base primes, shipped once to each segmented sieve worker process
+_base_primes = None
+
+def _init_segment_worker(base_primes: array) -> None:
+    global _base_primes
+    _base_primes = base_primes
+
+def _segment_flags(lo: int, hi: int, base_primes: array) -> tuple[int, bytearray]:
+    """ Odd-only flags for the window [lo, hi): flags[i] == 1 if and only if
+        start + 2i is prime, where start is the first odd number >= lo """
+    start = lo | 1
+    size = len(range(start, hi, 2))
+    flags = bytearray([1]) * size
+    if start == 1 and size:
+        flags[0] = 0
+    for p in base_primes:
+        if p * p >= hi:
+            break
+        m = max(p * p, (start + p - 1) // p * p)
+        if m % 2 == 0:
+            m += p
+        i = (m - start) // 2
+        if i < size:
+            flags[i::p] = bytes(len(range(i, size, p)))
+    return start, flags
+
+def _segment_primes(window: tuple[int, int], base_primes: Optional[array] = None) -> array:
+    lo, hi = window
+    start, flags = _segment_flags(lo, hi, _base_primes if base_primes is None else base_primes)
+    primes = array("Q", [2] if lo <= 2 < hi else [])
+    primes.extend(compress(range(start, hi, 2), flags))
     return primes
 
-print(solve_congruence(36, 18, 21))
\ No newline at end of file
+def _segment_count(window: tuple[int, int], base_primes: Optional[array] = None) -> int:
+    lo, hi = window
+    _, flags = _segment_flags(lo, hi, _base_primes if base_primes is None else base_primes)
+    return flags.count(1) + (lo <= 2 < hi)
+
+def _map_segments(
+    fn: Callable, 
+    lo: int, 
+    hi: int, 
+    segment_size: Optional[int] = None, 
+    processes: Optional[int] = None
+) -> Iterator[Any]:
+    # Apply fn to every window of [lo, hi) in order, in this process or spread
+    # over a pool, with only a bounded number of segments in flight at once
+    segment_size = segment_size or SEGMENT_SIZE
+    base_primes = array("Q", iter_primes(math.isqrt(max(hi - 1, 0)) + 1))[1:]
+    windows = ((a, min(a + segment_size, hi)) for a in range(max(lo, 0), hi, segment_size))
+    if processes is None or processes <= 1:
+        for window in windows:
+            yield fn(window, base_primes)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(
+        max_workers=processes, 
+        initializer=_init_segment_worker, 
+        initargs=(base_primes,)
+    ) as pool:
+        pending = deque()
+        for window in windows:
+            pending.append(pool.submit(fn, window))
+            if len(pending) >= 2 * processes:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def segmented_primes(
+    lo: int, 
+    hi: int, 
+    segment_size: Optional[int] = None, 
+    processes: Optional[int] = None, 
+    chunks: Optional[bool] = False
+) -> Iterator[Union[int, array]]:
+    """ Generate the primes in [lo, hi) in increasing order using O(sqrt(hi) + segment)
+        memory. Segments are sieved only by the base primes up to sqrt(hi) and can be
+        spread over a process pool. With chunks=True one array is yielded per segment """
+    segments = _map_segments(_segment_primes, lo, hi, segment_size, processes)
+    if chunks:
+        yield from segments
+        return
+    for segment in segments:
+        yield from segment
+
+@timed()
+def count_primes(
+    lo: int, 
+    hi: int, 
+    segment_size: Optional[int] = None, 
+    processes: Optional[int] = None
+) -> int:
+    """ Number of primes in [lo, hi), sieved segment by segment """
+    return sum(_map_segments(_segment_count, lo, hi, segment_size, processes))
+
+@timed()
+def segmented_sieve(n: int, segment_size: Optional[int] = None, processes: Optional[int] = None) -> list[int]:
+    return list(segmented_primes(0, n, segment_size, processes))
+
+
+""" 
+Linear (Euler) sieve: every composite is visited exactly once, via its
+smallest prime factor, which lets multiplicative functions be filled in
+for all n <= N in a single O(N) pass
+"""
+
+class MultiplicativeTables(NamedTuple):
+    spf: array      # smallest prime factor of n (0 for n < 2)
+    phi: array      # Euler's totient φ(n)
+    mu: array       # Möbius function μ(n)
+    sigma0: array   # number of divisors σ₀(n)
+    sigma1: array   # sum of divisors σ₁(n)
+    primes: array   # every prime <= N
+
+@timed()
+def multiplicative_tables(n: int) -> MultiplicativeTables:
+    """ Compute spf, φ, μ, σ₀ and σ₁ for every integer 0 <= k <= n in one linear sieve pass """
+    size = n + 1
+    spf = array("I", bytes(4 * size))
+    phi = array("Q", bytes(8 * size))
+    mu = array("b", bytes(size))
+    sigma0 = array("I", bytes(4 * size))
+    sigma1 = array("Q", bytes(8 * size))
+    # exponent of the smallest prime in k and the matching prime power p^e
+    exponent = array("B", bytes(size))
+    prime_power = array("Q", bytes(8 * size))
+    primes = array("Q")
+    if n >= 1:
+        phi[1] = mu[1] = sigma0[1] = sigma1[1] = 1
+    for i in range(2, size):
+        if not spf[i]:
+            spf[i] = prime_power[i] = i
+            phi[i] = i - 1
+            mu[i] = -1
+            exponent[i] = 1
+            sigma0[i] = 2
+            sigma1[i] = i + 1
+            primes.append(i)
+        p_i = spf[i]
+        limit = n // i
+        for p in primes:
+            if p > p_i or p > limit:
+                break
+            j = i * p
+            spf[j] = p
+            if p == p_i:
+                # p already divides i: only the p-part of j changes
+                e = exponent[j] = exponent[i] + 1
+                pk = prime_power[j] = prime_power[i] * p
+                rest = i // prime_power[i]
+                phi[j] = phi[i] * p
+                sigma0[j] = sigma0[rest] * (e + 1)
+                sigma1[j] = sigma1[rest] * ((pk * p - 1) // (p - 1))
+            else:
+                exponent[j] = 1
+                prime_power[j] = p
+                phi[j] = phi[i] * (p - 1)
+                mu[j] = -mu[i]
+                sigma0[j] = sigma0[i] * 2
+                sigma1[j] = sigma1[i] * (p + 1)
+    return MultiplicativeTables(spf, phi, mu, sigma0, sigma1, primes)
+
+def smallest_prime_factors(n: int) -> array:
+    """ Smallest prime factor of every integer 0 <= k <= n (0 for k < 2) """
+    size = n + 1
+    spf = array("I", bytes(4 * size))
+    primes = []
+    for i in range(2, size):
+        if not spf[i]:
+            spf[i] = i
+            primes.append(i)
+        p_i = spf[i]
+        limit = n // i
+        for p in primes:
+            if p > p_i or p > limit:
+                break
+            spf[i * p] = p
+    return spf
+
+def factorize_spf(n: int, spf: array) -> dict[int, int]:
+    """ Prime factorization of 0 < n < len(spf) in O(log n) steps using a smallest prime factor table """
+    assert 0 < n < len(spf), "n must be positive and covered by the smallest prime factor table"
+    factorization = {}
+    while n > 1:
+        p = spf[n]
+        n //= p
+        factorization[p] = factorization.get(p, 0) + 1
+    return factorization
+
+
+if __name__ == "__main__":
+    print(solve_congruence(36, 18, 21))
@@ -1,5 +1,11 @@
 from utils import *
 
+# numpy is only imported once the array-backed sets are used
+np = lazy_module("numpy")
+
+# Relative tolerance for the parallel / intersecting / coincident tests
+EPSILON = 1e-9
+
 class Point:
     
     def __init__(
@@ -47,7 +53,7 @@ class Plane:
         return Vector3D(
             x=(v1.y * v2.z - v1.z * v2.y),
             y=-(v1.x * v2.z - v1.z * v2.x),
-            z=(v1.y * v2.x - v1.x * v2.y),
+            z=(v1.x * v2.y - v1.y * v2.x),
             vector=True
         )
 
@@ -70,19 +76,241 @@ class Line:
         return f"Line(({self.p1.x}, {self.p1.y}, {self.p1.z}) + k({self.direction.x}, {self.direction.y}, {self.direction.z}))"
     
     
-def is_parallel(l1: Line, l2: Line) -> None:
-    k1 = l1.direction.x / l2.direction.x
-    k2 = l1.direction.y / l2.direction.y
-    k3 = l1.direction.z / l2.direction.z
-    return k1 == k2 == k3
+"""
+Array-backed geometry: each set holds N objects as (N, 3) arrays and every
+query is one vectorized kernel over all of them. Binary operations pair the
+sets row by row (a set of length 1 broadcasts against any length); results
+that do not exist (parallel lines, a line in a plane...) come back as NaN
+together with a boolean mask of the valid rows
+"""
 
-def intersection_point(l1: Line, l2: Line) -> Point:
-    pass
+def _as_array(points: Any) -> 'np.ndarray':
+    if isinstance(points, PointSet):
+        return points.coords
+    if isinstance(points, Point):
+        return np.array([[points.x, points.y, points.z]], dtype=np.float64)
+    a = np.asarray(points, dtype=np.float64)
+    a = a.reshape(1, 3) if a.shape == (3,) else a
+    if a.ndim != 2 or a.shape[1] != 3:
+        raise TypeError(
+            f"expected an (N, 3) array of points, not {a.shape}"
+        )
+    return a
 
-def shortest_distance(l1: Line, l2: Line) -> Number:
-    pass
+def dot(a: 'np.ndarray', b: 'np.ndarray') -> 'np.ndarray':
+    """ Row-wise dot product of (N, 3) arrays """
+    return np.einsum("...i,...i->...", a, b)
 
-    
-l1 = Line(Point(2, 5, -3), Point(-1, 4, 7))
-l2 = Line(Point(0, 0, 0), Point(-6, -2, 20))
-pi = Plane(Point(3, 0, 2, "A"), Point(1, 3, -4, "B"), Point(7, 6, -5, "C"))
+def cross(a: 'np.ndarray', b: 'np.ndarray') -> 'np.ndarray':
+    """ Row-wise cross product of (N, 3) arrays """
+    return np.cross(a, b)
+
+def _norm2(a: 'np.ndarray') -> 'np.ndarray':
+    return dot(a, a)
+
+def _parallel(a: 'np.ndarray', b: 'np.ndarray', epsilon: float) -> 'np.ndarray':
+    # |a x b| <= eps |a||b|, i.e. sin of the angle between them is below eps
+    return _norm2(cross(a, b)) <= epsilon ** 2 * _norm2(a) * _norm2(b)
+
+def _scale(*arrays: 'np.ndarray') -> 'np.ndarray':
+    # magnitude of the coordinates involved, so tolerances scale with the scene
+    return np.maximum(1.0, np.max([np.abs(a).max(axis=-1) for a in arrays], axis=0))
+
+
+class PointSet:
+
+    def __init__(self, coords: Any) -> None:
+        self.coords = _as_array(coords)
+
+    @classmethod
+    def from_points(cls, points: Iterable[Point]) -> 'PointSet':
+        return cls([[p.x, p.y, p.z] for p in points])
+
+    def __len__(self) -> int:
+        return len(self.coords)
+
+    def __getitem__(self, index: Union[int, slice, 'np.ndarray']) -> Union[Point, 'PointSet']:
+        if isinstance(index, (int, np.integer)):
+            return Point(*self.coords[index].tolist())
+        return PointSet(self.coords[index])
+
+    def to_points(self) -> list[Point]:
+        return [Point(*xyz) for xyz in self.coords.tolist()]
+
+    def __repr__(self) -> str:
+        return f"PointSet({len(self)} points)"
+
+
+class LineSet:
+    """ Lines origin + k * direction """
+
+    def __init__(self, origins: Any, directions: Any) -> None:
+        self.origins, self.directions = np.broadcast_arrays(_as_array(origins), _as_array(directions))
+        if np.any(_norm2(self.directions) == 0):
+            raise ValueError(
+                "line direction must be non-zero"
+            )
+
+    @classmethod
+    def from_lines(cls, lines: Iterable[Line]) -> 'LineSet':
+        lines = list(lines)
+        return cls(PointSet.from_points(l.p1 for l in lines), PointSet.from_points(l.direction for l in lines))
+
+    @classmethod
+    def through(cls, p1: Any, p2: Any) -> 'LineSet':
+        """ The lines through each pair of points (direction p1 - p2, as in Line) """
+        p1 = _as_array(p1)
+        return cls(p1, p1 - _as_array(p2))
+
+    def __len__(self) -> int:
+        return len(self.origins)
+
+    def __getitem__(self, index: Union[int, slice, 'np.ndarray']) -> Union[Line, 'LineSet']:
+        if isinstance(index, (int, np.integer)):
+            origin = self.origins[index]
+            return Line(Point(*origin.tolist()), Point(*(origin - self.directions[index]).tolist()))
+        return LineSet(self.origins[index], self.directions[index])
+
+    def __repr__(self) -> str:
+        return f"LineSet({len(self)} lines)"
+
+    def points_at(self, k: Any) -> 'np.ndarray':
+        return self.origins + np.asarray(k, dtype=np.float64)[..., None] * self.directions
+
+    def is_parallel(self, other: 'LineSet', epsilon: Optional[float] = EPSILON) -> 'np.ndarray':
+        return _parallel(self.directions, other.directions, epsilon)
+
+    def closest_points(self, other: 'LineSet', epsilon: Optional[float] = EPSILON) -> tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+        """ The closest pair of points between each pair of lines and a mask
+            that is False for parallel lines, whose closest points are not unique """
+        d1, d2 = self.directions, other.directions
+        w = other.origins - self.origins
+        n = cross(d1, d2)
+        nn = _norm2(n)
+        valid = ~_parallel(d1, d2, epsilon)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k1 = np.where(valid, dot(cross(w, d2), n) / nn, np.nan)
+            k2 = np.where(valid, dot(cross(w, d1), n) / nn, np.nan)
+        return self.points_at(k1), other.points_at(k2), valid
+
+    def intersection(self, other: 'LineSet', epsilon: Optional[float] = EPSILON) -> tuple['np.ndarray', 'np.ndarray']:
+        """ The point where each pair of lines meets and a mask of the pairs that
+            do meet in exactly one point (skew, parallel and coincident lines do not) """
+        a, b, valid = self.closest_points(other, epsilon)
+        with np.errstate(invalid="ignore"):
+            gap = np.sqrt(_norm2(a - b))
+            meets = valid & (gap <= epsilon * _scale(self.origins, other.origins, a))
+        return np.where(meets[..., None], (a + b) / 2, np.nan), meets
+
+    def distance(self, other: 'LineSet', epsilon: Optional[float] = EPSILON) -> 'np.ndarray':
+        """ Shortest distance between each pair of lines (skew or parallel) """
+        d1, d2 = self.directions, other.directions
+        w = other.origins - self.origins
+        n = cross(d1, d2)
+        parallel = _parallel(d1, d2, epsilon)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            skew = np.abs(dot(w, n)) / np.sqrt(_norm2(n))
+            # parallel lines: distance from one origin to the other line
+            apart = np.sqrt(_norm2(cross(w, d1)) / _norm2(d1))
+        return np.where(parallel, apart, skew)
+
+    def distance_to_points(self, points: Any) -> 'np.ndarray':
+        w = _as_array(points) - self.origins
+        return np.sqrt(_norm2(cross(w, self.directions)) / _norm2(self.directions))
+
+
+class PlaneSet:
+    """ Planes normal . r = d """
+
+    def __init__(self, normals: Any, d: Any) -> None:
+        self.normals = _as_array(normals)
+        self.d = np.broadcast_to(np.asarray(d, dtype=np.float64), self.normals.shape[:1])
+        if np.any(_norm2(self.normals) == 0):
+            raise ValueError(
+                "plane normal must be non-zero"
+            )
+
+    @classmethod
+    def from_planes(cls, planes: Iterable[Plane]) -> 'PlaneSet':
+        planes = list(planes)
+        return cls([[p.x, p.y, p.z] for p in planes], [p.d for p in planes])
+
+    @classmethod
+    def through(cls, p1: Any, p2: Any, p3: Any) -> 'PlaneSet':
+        """ The planes through each triple of points """
+        p1 = _as_array(p1)
+        normals = cross(p1 - _as_array(p2), p1 - _as_array(p3))
+        return cls(normals, dot(normals, p1))
+
+    def __len__(self) -> int:
+        return len(self.normals)
+
+    def __getitem__(self, index: Union[int, slice, 'np.ndarray']) -> Union[Plane, 'PlaneSet']:
+        if isinstance(index, (int, np.integer)):
+            return Plane(*self.normals[index].tolist(), float(self.d[index]))
+        return PlaneSet(self.normals[index], self.d[index])
+
+    def __repr__(self) -> str:
+        return f"PlaneSet({len(self)} planes)"
+
+    def distance(self, points: Any) -> 'np.ndarray':
+        """ Signed distance from each point to its plane, positive on the side the normal points to """
+        return (dot(self.normals, _as_array(points)) - self.d) / np.sqrt(_norm2(self.normals))
+
+    def intersect_lines(self, lines: LineSet, epsilon: Optional[float] = EPSILON) -> tuple['np.ndarray', 'np.ndarray']:
+        """ The point where each line crosses its plane and a mask that is False
+            for lines parallel to (or lying in) the plane """
+        denominator = dot(self.normals, lines.directions)
+        valid = np.abs(denominator) > epsilon * np.sqrt(_norm2(self.normals) * _norm2(lines.directions))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            k = np.where(valid, (self.d - dot(self.normals, lines.origins)) / denominator, np.nan)
+        return lines.points_at(k), valid
+
+    def intersect_planes(self, other: 'PlaneSet', epsilon: Optional[float] = EPSILON) -> tuple[LineSet, 'np.ndarray']:
+        """ The line where each pair of planes meets and a mask that is False for
+            parallel planes. Invalid rows hold a placeholder line """
+        n1, n2 = self.normals, other.normals
+        direction = cross(n1, n2)
+        valid = ~_parallel(n1, n2, epsilon)
+        dd = np.where(valid, _norm2(direction), 1.0)
+        # the point of the line closest to the origin
+        origin = (self.d[..., None] * cross(n2, direction) + other.d[..., None] * cross(direction, n1)) / dd[..., None]
+        origin[~valid] = np.nan
+        direction = np.where(valid[..., None], direction, np.array([1.0, 0.0, 0.0]))
+        return LineSet(origin, direction), valid
+
+
+"""
+Scalar wrappers around the same kernels
+"""
+
+def is_parallel(l1: Line, l2: Line, epsilon: Optional[float] = EPSILON) -> bool:
+    return bool(LineSet.from_lines([l1]).is_parallel(LineSet.from_lines([l2]), epsilon)[0])
+
+def intersection_point(l1: Line, l2: Line, epsilon: Optional[float] = EPSILON) -> Optional[Point]:
+    """ The point where two lines meet, or None if they are skew, parallel or coincident """
+    points, meets = LineSet.from_lines([l1]).intersection(LineSet.from_lines([l2]), epsilon)
+    return Point(*points[0].tolist()) if meets[0] else None
+
+def shortest_distance(l1: Line, l2: Line, epsilon: Optional[float] = EPSILON) -> Number:
+    return float(LineSet.from_lines([l1]).distance(LineSet.from_lines([l2]), epsilon)[0])
+
+def distance_to_plane(p: Point, plane: Plane) -> Number:
+    """ Signed distance from p to plane """
+    return float(PlaneSet.from_planes([plane]).distance(p)[0])
+
+def line_plane_intersection(l: Line, plane: Plane, epsilon: Optional[float] = EPSILON) -> Optional[Point]:
+    points, valid = PlaneSet.from_planes([plane]).intersect_lines(LineSet.from_lines([l]), epsilon)
+    return Point(*points[0].tolist()) if valid[0] else None
+
+def plane_intersection(pi1: Plane, pi2: Plane, epsilon: Optional[float] = EPSILON) -> Optional[Line]:
+    lines, valid = PlaneSet.from_planes([pi1]).intersect_planes(PlaneSet.from_planes([pi2]), epsilon)
+    return lines[0] if valid[0] else None
+
+
+if __name__ == "__main__":
+    l1 = Line(Point(2, 5, -3), Point(-1, 4, 7))
+    l2 = Line(Point(0, 0, 0), Point(-6, -2, 20))
+    pi = Plane(Point(3, 0, 2, "A"), Point(1, 3, -4, "B"), Point(7, 6, -5, "C"))
+    print(pi, l1, l2)
+    print(is_parallel(l1, l2), shortest_distance(l1, l2))
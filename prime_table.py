@@ -0,0 +1,222 @@
+import bisect
+import math
+import mmap
+import os
+import struct
+from array import array
+from typing import Callable, Any, Iterable, Iterator, Optional, Union
+import number_theory
+
+"""
+On-disk prime table: a bitmap of the odd numbers below a limit (bit i set if
+and only if 2i + 1 is prime) followed by cumulative prime counts for every
+block of BLOCK_BITS bits. The file is memory-mapped read-only, so every
+process that opens it shares the same pages of the OS page cache
+"""
+
+MAGIC = b"PRIMETBL"
+VERSION = 1
+# Bits per block of the cumulative count index (64 bytes of bitmap)
+BLOCK_BITS = 512
+_HEADER = struct.Struct("<8sQQQQ")
+# Segments are a multiple of 16 integers so each one fills whole bitmap bytes
+_SEGMENT = (number_theory.SEGMENT_SIZE // 16) * 16
+_TO_ASCII = bytes.maketrans(b"\x00\x01", b"01")
+
+def default_path(limit: int) -> str:
+    directory = os.environ.get("MATHS_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "maths"))
+    return os.path.join(directory, f"primes_{limit}.bin")
+
+def _pack_bits(flags: bytearray) -> bytes:
+    # One 0/1 byte per odd number -> one bit per odd number, least significant
+    # bit first; int(..., 2) does the packing at C speed
+    if not flags:
+        return b""
+    bits = int(flags.translate(_TO_ASCII)[::-1], 2)
+    return bits.to_bytes((len(flags) + 7) // 8, "little")
+
+
+class PrimeTable:
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.limit, block_bits, nbytes = _HEADER.unpack_from(self._mmap)
+        if magic != MAGIC or version != VERSION or block_bits != BLOCK_BITS:
+            self._mmap.close()
+            raise ValueError(
+                f"{path} is not a compatible prime table"
+            )
+        self._bitmap = memoryview(self._mmap)[_HEADER.size:_HEADER.size + nbytes]
+        counts_offset = _HEADER.size + nbytes + (-nbytes % 8)
+        self._counts = memoryview(self._mmap)[counts_offset:].cast("Q")
+
+    @classmethod
+    def build(cls, limit: int, path: Optional[str] = None) -> 'PrimeTable':
+        """ Sieve every prime below limit segment by segment and write the table to path """
+        path = path or default_path(limit)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        nbits = limit // 2
+        nbytes = (nbits + 7) // 8
+        base_primes = array("Q", number_theory.iter_primes(math.isqrt(max(limit - 1, 0)) + 1))[1:]
+        counts = array("Q", [0])
+        block_bytes = BLOCK_BITS // 8
+        total, carry = 0, b""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, limit, BLOCK_BITS, nbytes))
+            for lo in range(0, limit, _SEGMENT):
+                _, flags = number_theory._segment_flags(lo, min(lo + _SEGMENT, limit), base_primes)
+                packed = _pack_bits(flags)
+                f.write(packed)
+                # running popcount per block; blocks may straddle segments
+                data = carry + packed
+                whole = len(data) - len(data) % block_bytes
+                for i in range(0, whole, block_bytes):
+                    total += int.from_bytes(data[i:i + block_bytes], "little").bit_count()
+                    counts.append(total)
+                carry = data[whole:]
+            f.write(bytes(-nbytes % 8))
+            f.write(counts.tobytes())
+        os.replace(tmp, path)
+        return cls(path)
+
+    @classmethod
+    def cached(cls, limit: int, path: Optional[str] = None) -> 'PrimeTable':
+        """ Open the table at path if it covers limit, otherwise (re)build it """
+        path = path or default_path(limit)
+        if os.path.exists(path):
+            try:
+                table = cls(path)
+            except ValueError:
+                pass
+            else:
+                if table.limit >= limit:
+                    return table
+                table.close()
+        return cls.build(limit, path)
+
+    def close(self) -> None:
+        self._bitmap.release()
+        self._counts.release()
+        self._mmap.close()
+
+    def __enter__(self) -> 'PrimeTable':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __reduce__(self) -> tuple[Callable, tuple[str]]:
+        # worker processes re-map the same file instead of receiving a copy
+        return PrimeTable, (self.path,)
+
+    def __repr__(self) -> str:
+        return f"PrimeTable(limit={self.limit}, path={self.path!r})"
+
+    def _bit(self, i: int) -> int:
+        return self._bitmap[i >> 3] >> (i & 7) & 1
+
+    def _check(self, n: int) -> None:
+        if n >= self.limit:
+            raise ValueError(
+                f"{n} is outside of the prime table (limit {self.limit})"
+            )
+
+    def is_prime(self, n: int) -> bool:
+        """ O(1) lookup below the limit, Miller-Rabin above it """
+        if n >= self.limit:
+            return number_theory.is_prime(n)
+        if n < 3:
+            return n == 2
+        return n % 2 == 1 and self._bit(n >> 1) == 1
+
+    def pi(self, x: int) -> int:
+        """ Number of primes <= x: one block count plus one popcount """
+        if x < 2:
+            return 0
+        self._check(x)
+        i = (x - 1) // 2 if x % 2 == 0 else x // 2
+        block = (i + 1) // BLOCK_BITS
+        start = block * (BLOCK_BITS // 8)
+        stop = (i + 1) // 8
+        count = self._counts[block]
+        count += int.from_bytes(self._bitmap[start:stop], "little").bit_count()
+        rest = (i + 1) % 8
+        if rest:
+            count += (self._bitmap[stop] & ((1 << rest) - 1)).bit_count()
+        # bit 0 is the number 1, which is never set; 2 is not in the bitmap
+        return count + 1
+
+    def nth_prime(self, k: int) -> int:
+        """ The k-th prime (nth_prime(1) == 2), found by binary search over the block counts """
+        if k < 1:
+            raise ValueError(
+                "k must be a positive integer"
+            )
+        if k == 1:
+            return 2
+        # k-th odd prime; the last block whose count is still below k holds it
+        k -= 1
+        block = bisect.bisect_left(self._counts, k) - 1
+        seen = self._counts[block]
+        i = block * BLOCK_BITS
+        nbits = self.limit // 2
+        while i < nbits:
+            if self._bit(i):
+                seen += 1
+                if seen == k:
+                    return 2 * i + 1
+            i += 1
+        raise ValueError(
+            f"the table holds fewer than {k + 1} primes"
+        )
+
+    def next_prime(self, n: int) -> int:
+        """ Smallest prime strictly greater than n """
+        if n < 2:
+            return 2
+        i = (n + 1) // 2
+        nbits = self.limit // 2
+        while i < nbits:
+            byte = self._bitmap[i >> 3] >> (i & 7)
+            if byte:
+                return 2 * (i + (byte & -byte).bit_length() - 1) + 1
+            i = (i | 7) + 1
+        n = max(n, self.limit - 1) + 1
+        while not number_theory.is_prime(n):
+            n += 1
+        return n
+
+    def prev_prime(self, n: int) -> int:
+        """ Largest prime strictly less than n """
+        if n <= 2:
+            raise ValueError(
+                "there is no prime less than 2"
+            )
+        if n == 3:
+            return 2
+        if n > self.limit:
+            m = n - 1
+            while m >= self.limit:
+                if number_theory.is_prime(m):
+                    return m
+                m -= 1
+            n = self.limit
+        i = (n - 2) // 2
+        while i > 0:
+            byte = self._bitmap[i >> 3] & ((2 << (i & 7)) - 1)
+            if byte:
+                return 2 * ((i & ~7) + byte.bit_length() - 1) + 1
+            i = (i & ~7) - 1
+        return 2
+
+    def primes(self, lo: Optional[int] = 0, hi: Optional[int] = None) -> Iterator[int]:
+        """ Iterate over the primes in [lo, hi) straight from the bitmap """
+        hi = self.limit if hi is None else min(hi, self.limit)
+        if lo <= 2 < hi:
+            yield 2
+        for i in range(max(lo, 0) // 2, hi // 2):
+            if self._bit(i) and 2 * i + 1 >= lo and 2 * i + 1 < hi:
+                yield 2 * i + 1
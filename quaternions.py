@@ -1,49 +1,331 @@
-import sympy
-import numpy as np
+import math
+from typing import Any, Iterable, Iterator, Optional, Union
+from utils import lazy_module
 
+# numpy is needed for the array APIs and sympy for the symbolic mode only;
+# neither is imported until then
+np = lazy_module("numpy")
+sympy = lazy_module("sympy")
 
-class ComplexSymbol(sympy.Symbol):
 
-    def __mul__(self, x):
-        if isinstance(x, ComplexSymbol):
-            return _table[self.name][x.name]
-        return super(ComplexSymbol, self).__mul__(x)
+class Quaternion:
+    """ Numeric quaternion w + xi + yj + zk with closed-form Hamilton products.
+        Rotations use unit quaternions and angles in radians """
 
-    def __rmul__(self, x):
-        if isinstance(x, ComplexSymbol):
-            return _table[x.name][self.name]
-        return super(ComplexSymbol, self).__rmul__(x)
+    __slots__ = ("w", "x", "y", "z")
 
+    def __init__(self, w: float = 0.0, x: float = 0.0, y: float = 0.0, z: float = 0.0) -> None:
+        self.w = w
+        self.x = x
+        self.y = y
+        self.z = z
 
-_table = {
-    "i": {"i": -1, "j": ComplexSymbol("k"), "k": -ComplexSymbol("j")},
-    "j": {"i": -ComplexSymbol("k"), "j": -1, "k": ComplexSymbol("i")},
-    "k": {"i": ComplexSymbol("j"), "j": -ComplexSymbol("i"), "k": -1}
-}
+    @classmethod
+    def from_vector(cls, v: Iterable[float]) -> 'Quaternion':
+        """ Pure quaternion xi + yj + zk for a 3D point or direction """
+        x, y, z = v
+        return cls(0.0, x, y, z)
 
-i = ComplexSymbol("i")
-j = ComplexSymbol("j")
-k = ComplexSymbol("k")
+    @classmethod
+    def from_axis_angle(cls, axis: Iterable[float], angle: float) -> 'Quaternion':
+        """ Unit quaternion for a rotation of angle radians about axis """
+        x, y, z = axis
+        norm = math.sqrt(x * x + y * y + z * z)
+        if norm == 0:
+            raise ValueError(
+                "rotation axis must be non-zero"
+            )
+        s = math.sin(angle / 2) / norm
+        return cls(math.cos(angle / 2), x * s, y * s, z * s)
+
+    @classmethod
+    def from_rotation_matrix(cls, m: Any) -> 'Quaternion':
+        """ Unit quaternion for a 3x3 rotation matrix (Shepperd's method: branch on
+            the largest diagonal term so the square root is never of a tiny number) """
+        m = [[float(m[r][c]) for c in range(3)] for r in range(3)]
+        trace = m[0][0] + m[1][1] + m[2][2]
+        if trace > 0:
+            s = 2 * math.sqrt(1 + trace)
+            q = cls(s / 4, (m[2][1] - m[1][2]) / s, (m[0][2] - m[2][0]) / s, (m[1][0] - m[0][1]) / s)
+        elif m[0][0] > m[1][1] and m[0][0] > m[2][2]:
+            s = 2 * math.sqrt(1 + m[0][0] - m[1][1] - m[2][2])
+            q = cls((m[2][1] - m[1][2]) / s, s / 4, (m[0][1] + m[1][0]) / s, (m[0][2] + m[2][0]) / s)
+        elif m[1][1] > m[2][2]:
+            s = 2 * math.sqrt(1 + m[1][1] - m[0][0] - m[2][2])
+            q = cls((m[0][2] - m[2][0]) / s, (m[0][1] + m[1][0]) / s, s / 4, (m[1][2] + m[2][1]) / s)
+        else:
+            s = 2 * math.sqrt(1 + m[2][2] - m[0][0] - m[1][1])
+            q = cls((m[1][0] - m[0][1]) / s, (m[0][2] + m[2][0]) / s, (m[1][2] + m[2][1]) / s, s / 4)
+        return q.normalized()
+
+    def to_rotation_matrix(self) -> 'np.ndarray':
+        """ 3x3 rotation matrix of the (normalized) quaternion """
+        w, x, y, z = self.normalized()
+        return np.array([
+            [1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)],
+            [2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)],
+            [2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)]
+        ])
+
+    def to_axis_angle(self) -> tuple[tuple[float, float, float], float]:
+        """ (unit axis, angle in radians in [0, 2pi)) of the rotation; the identity
+            rotation reports the x axis """
+        w, x, y, z = self.normalized()
+        s = math.sqrt(x * x + y * y + z * z)
+        angle = 2 * math.atan2(s, w)
+        if s < 1e-12:
+            return (1.0, 0.0, 0.0), 0.0
+        return (x / s, y / s, z / s), angle
+
+    def __iter__(self) -> Iterator[float]:
+        yield self.w
+        yield self.x
+        yield self.y
+        yield self.z
+
+    def __repr__(self) -> str:
+        return f"Quaternion({self.w!r}, {self.x!r}, {self.y!r}, {self.z!r})"
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Quaternion):
+            return NotImplemented
+        return self.w == other.w and self.x == other.x and self.y == other.y and self.z == other.z
+
+    def isclose(self, other: 'Quaternion', tolerance: Optional[float] = 1e-9) -> bool:
+        return all(abs(a - b) <= tolerance for a, b in zip(self, other))
+
+    def __add__(self, other: 'Quaternion') -> 'Quaternion':
+        return Quaternion(self.w + other.w, self.x + other.x, self.y + other.y, self.z + other.z)
+
+    def __sub__(self, other: 'Quaternion') -> 'Quaternion':
+        return Quaternion(self.w - other.w, self.x - other.x, self.y - other.y, self.z - other.z)
+
+    def __neg__(self) -> 'Quaternion':
+        return Quaternion(-self.w, -self.x, -self.y, -self.z)
+
+    def __mul__(self, other: Union['Quaternion', float]) -> 'Quaternion':
+        if isinstance(other, Quaternion):
+            # Hamilton product
+            a1, b1, c1, d1 = self.w, self.x, self.y, self.z
+            a2, b2, c2, d2 = other.w, other.x, other.y, other.z
+            return Quaternion(
+                a1 * a2 - b1 * b2 - c1 * c2 - d1 * d2,
+                a1 * b2 + b1 * a2 + c1 * d2 - d1 * c2,
+                a1 * c2 - b1 * d2 + c1 * a2 + d1 * b2,
+                a1 * d2 + b1 * c2 - c1 * b2 + d1 * a2
+            )
+        return Quaternion(self.w * other, self.x * other, self.y * other, self.z * other)
+
+    def __rmul__(self, other: float) -> 'Quaternion':
+        return Quaternion(other * self.w, other * self.x, other * self.y, other * self.z)
+
+    def __truediv__(self, other: float) -> 'Quaternion':
+        return Quaternion(self.w / other, self.x / other, self.y / other, self.z / other)
+
+    def dot(self, other: 'Quaternion') -> float:
+        return self.w * other.w + self.x * other.x + self.y * other.y + self.z * other.z
+
+    def norm(self) -> float:
+        return math.sqrt(self.dot(self))
+
+    __abs__ = norm
+
+    def conjugate(self) -> 'Quaternion':
+        return Quaternion(self.w, -self.x, -self.y, -self.z)
+
+    def normalized(self) -> 'Quaternion':
+        norm = self.norm()
+        if norm == 0:
+            raise ZeroDivisionError(
+                "cannot normalize the zero quaternion"
+            )
+        return self / norm
+
+    def inverse(self) -> 'Quaternion':
+        return self.conjugate() / self.dot(self)
+
+    def rotate(self, point: Iterable[float]) -> tuple[float, float, float]:
+        """ Rotate a 3D point by this unit quaternion. Equivalent to q * p * q^-1
+            but expanded to v + 2w(u x v) + 2u x (u x v), about half the multiplications """
+        px, py, pz = point
+        w, x, y, z = self.w, self.x, self.y, self.z
+        tx = 2 * (y * pz - z * py)
+        ty = 2 * (z * px - x * pz)
+        tz = 2 * (x * py - y * px)
+        return (
+            px + w * tx + y * tz - z * ty,
+            py + w * ty + z * tx - x * tz,
+            pz + w * tz + x * ty - y * tx
+        )
+
+    def slerp(self, other: 'Quaternion', t: float) -> 'Quaternion':
+        """ Spherical linear interpolation between unit quaternions, t in [0, 1],
+            along the shorter arc """
+        cos_theta = self.dot(other)
+        if cos_theta < 0:
+            other, cos_theta = -other, -cos_theta
+        if cos_theta > 0.9995:
+            # nearly parallel: sin(theta) -> 0, lerp is accurate and stable
+            return (self + (other - self) * t).normalized()
+        theta = math.acos(cos_theta)
+        sin_theta = math.sin(theta)
+        return (self * (math.sin((1 - t) * theta) / sin_theta) + other * (math.sin(t * theta) / sin_theta))
+
+    def to_symbolic(self) -> 'sympy.Expr':
+        """ The quaternion as a sympy expression in i, j, k for the symbolic mode """
+        _load_symbols()
+        return self.w + self.x * i + self.y * j + self.z * k
+
+
+"""
+Batch rotation of point clouds. Rotations are (4,) or (M, 4) arrays of
+quaternions in (w, x, y, z) order; each one is turned into a 3x3 matrix
+once and the points go through a single matrix product per chunk
+"""
+
+# Points rotated per chunk by the streaming API (24 MB of float64 per chunk)
+CHUNK_SIZE = 1 << 20
+
+def _as_quaternion_array(rotations: Any) -> 'np.ndarray':
+    if isinstance(rotations, Quaternion):
+        rotations = tuple(rotations)
+    elif not isinstance(rotations, np.ndarray) and rotations and isinstance(rotations[0], Quaternion):
+        rotations = [tuple(q) for q in rotations]
+    q = np.asarray(rotations, dtype=np.float64)
+    if q.shape[-1:] != (4,) or q.ndim > 2:
+        raise TypeError(
+            f"rotations must be a (4,) or (M, 4) quaternion array, not {q.shape}"
+        )
+    return q
+
+def axis_angle_array(axes: Any, angles: Any) -> 'np.ndarray':
+    """ (M, 4) unit quaternions from (M, 3) axes and M angles in radians """
+    axes = np.atleast_2d(np.asarray(axes, dtype=np.float64))
+    half = np.asarray(angles, dtype=np.float64).reshape(-1, 1) / 2
+    norms = np.linalg.norm(axes, axis=-1, keepdims=True)
+    if np.any(norms == 0):
+        raise ValueError(
+            "rotation axis must be non-zero"
+        )
+    return np.concatenate([np.cos(half), axes / norms * np.sin(half)], axis=-1)
+
+def rotation_matrices(rotations: Any) -> 'np.ndarray':
+    """ (..., 3, 3) rotation matrices for a (4,) or (M, 4) quaternion array,
+        normalizing each quaternion first """
+    q = _as_quaternion_array(rotations)
+    q = q / np.linalg.norm(q, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+    return np.stack([
+        np.stack([1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)], axis=-1),
+        np.stack([2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)], axis=-1),
+        np.stack([2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)], axis=-1)
+    ], axis=-2)
+
+def _apply(points: 'np.ndarray', matrices: 'np.ndarray') -> 'np.ndarray':
+    # p' = R p for every row p: one (n, 3) @ (3, 3) product per rotation,
+    # broadcast to (M, n, 3) for a stack of rotations
+    points = np.asarray(points)
+    if points.ndim != 2 or points.shape[1] != 3:
+        raise TypeError(
+            f"points must be an (N, 3) array, not {points.shape}"
+        )
+    dtype = np.result_type(points.dtype, np.float32)
+    return points.astype(dtype, copy=False) @ np.swapaxes(matrices, -1, -2).astype(dtype, copy=False)
+
+def rotate_points(points: Any, rotations: Any, out: Optional['np.ndarray'] = None, chunk_size: Optional[int] = None) -> 'np.ndarray':
+    """ Rotate an (N, 3) array of points by one rotation (result (N, 3)) or by
+        each of M rotations (result (M, N, 3)). Works through the points
+        chunk_size rows at a time, so points and out may be np.memmap arrays
+        larger than memory """
+    matrices = rotation_matrices(rotations)
+    points = points if isinstance(points, np.ndarray) else np.asarray(points)
+    chunk_size = chunk_size or CHUNK_SIZE
+    if out is None and len(points) <= chunk_size:
+        return _apply(points, matrices)
+    if out is None:
+        shape = matrices.shape[:-2] + points.shape
+        out = np.empty(shape, dtype=np.result_type(points.dtype, np.float32))
+    for start in range(0, len(points), chunk_size):
+        stop = start + chunk_size
+        out[..., start:stop, :] = _apply(points[start:stop], matrices)
+    return out
+
+def iter_rotate_points(chunks: Iterable[Any], rotations: Any, chunk_size: Optional[int] = None) -> Iterator['np.ndarray']:
+    """ Streaming rotation: chunks is an (N, 3) array or any iterable of (n, 3)
+        arrays (e.g. blocks read from a scan file); yields each rotated block.
+        The rotation matrices are built once for the whole stream """
+    matrices = rotation_matrices(rotations)
+    if isinstance(chunks, np.ndarray):
+        points, chunk_size = chunks, chunk_size or CHUNK_SIZE
+        chunks = (points[start:start + chunk_size] for start in range(0, len(points), chunk_size))
+    for chunk in chunks:
+        yield _apply(chunk, matrices)
+
+
+"""
+Symbolic mode: quaternions as sympy expressions in the ComplexSymbols i, j, k
+"""
+
+# Multiplication table of the units, filled in by _load_symbols()
+_table = None
+
+def _load_symbols() -> None:
+    """ Define ComplexSymbol and the units i, j, k (importing sympy) on first use """
+    global ComplexSymbol, _table, i, j, k
+    if _table is not None:
+        return
+
+    class ComplexSymbol(sympy.Symbol):
+
+        def __mul__(self, x):
+            if isinstance(x, ComplexSymbol):
+                return _table[self.name][x.name]
+            return super(ComplexSymbol, self).__mul__(x)
+
+        def __rmul__(self, x):
+            if isinstance(x, ComplexSymbol):
+                return _table[x.name][self.name]
+            return super(ComplexSymbol, self).__rmul__(x)
+
+    _table = {
+        "i": {"i": -1, "j": ComplexSymbol("k"), "k": -ComplexSymbol("j")},
+        "j": {"i": -ComplexSymbol("k"), "j": -1, "k": ComplexSymbol("i")},
+        "k": {"i": ComplexSymbol("j"), "j": -ComplexSymbol("i"), "k": -1}
+    }
+
+    i = ComplexSymbol("i")
+    j = ComplexSymbol("j")
+    k = ComplexSymbol("k")
+
+def __getattr__(name: str) -> Any:
+    # quaternions.i and friends exist as soon as anyone asks for them
+    if name in ("ComplexSymbol", "i", "j", "k"):
+        _load_symbols()
+        return globals()[name]
+    raise AttributeError(
+        f"module {__name__!r} has no attribute {name!r}"
+    )
+
+def _components(p: 'sympy.Expr') -> tuple['sympy.Expr', 'sympy.Expr', 'sympy.Expr', 'sympy.Expr']:
+    _load_symbols()
+    p = sympy.expand(p)
+    real = p.as_independent(i, j, k, as_Add=True)[0]
+    return real, p.coeff(i), p.coeff(j), p.coeff(k)
 
 def multiply(p, q):
-    n = sympy.expand(p * q)
-    parts = []
-    for key, val in n.as_coefficients_dict().items():
-        if str(key).replace(" ", "") in ("i**2", "j**2", "k**2"):
-            parts.append((-1, val))
-        elif isinstance(key, sympy.core.mul.Mul):
-            operands = str(key).split("*")
-            parts.append((_table[operands[0]][operands[1]], val))
-    result = 0
-    for part in parts:
-        result += (part[0] * part[1])
-    return result
-
-def transform(point, angle, axis):
+    """ Symbolic Hamilton product of two sympy expressions in i, j, k """
+    return sympy.expand((Quaternion(*_components(p)) * Quaternion(*_components(q))).to_symbolic())
+
+def transform(point, angle, axis, symbolic=False):
+    """ Rotate point by angle degrees about axis. Numeric by default; with
+        symbolic=True the result is a sympy expression in i, j, k """
+    if not symbolic:
+        return Quaternion.from_axis_angle(axis, math.radians(angle)).rotate(point)
+    _load_symbols()
+    half_angle = np.radians(angle / 2)
     div = np.sqrt(sum([x ** 2 for x in axis]))
-    axis = axis / div * np.sin(angle)
-    angle = np.radians(angle / 2)
-    a = np.cos(angle)
+    axis = np.asarray(axis) / div * np.sin(half_angle)
+    a = np.cos(half_angle)
     b, c, d = axis.tolist()
     q = a + b * i + c * j + d * k
     inverse = a - b * i - c * j - d * k
@@ -51,10 +333,12 @@ def transform(point, angle, axis):
     p = point[0] * i + point[1] * j + point[2] * k
     return multiply(multiply(q, p), inverse)
 
-angle = 120
-axis_vector = np.array([1, 1, 1])
-point = np.array([1, 1, 1])
-n = transform(point, angle, axis_vector)
-original = transform(point, 360, axis_vector)
-print(n)
-print(original)
\ No newline at end of file
+
+if __name__ == "__main__":
+    angle = 120
+    axis_vector = np.array([1, 1, 1])
+    point = np.array([1, 1, 1])
+    n = transform(point, angle, axis_vector)
+    original = transform(point, 360, axis_vector)
+    print(n)
+    print(original)
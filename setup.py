@@ -0,0 +1,27 @@
+import os
+from setuptools import setup, Extension
+
+"""
+Installs the modules (flat, top-level) and builds the optional native
+kernels used by number_theory.py; for a source checkout:
+
+    python setup.py build_ext --inplace
+
+Without the compiled module everything falls back to pure Python
+"""
+
+setup(
+    name="maths",
+    py_modules=[
+        "utils", "matrices", "determinant", "lu", "bareiss", "sparse", "batch", "lazy",
+        "number_theory", "prime_table", "planes", "quaternions", "symbols"
+    ],
+    ext_modules=[
+        Extension(
+            "_number_theory",
+            sources=["src/number_theory_module.cpp"],
+            language="c++",
+            extra_compile_args=["/O2"] if os.name == "nt" else ["-O3", "-std=c++11"],
+        )
+    ],
+)
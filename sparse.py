@@ -0,0 +1,386 @@
+import heapq
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from bareiss import is_rational
+from matrices import Matrix, ZERO_TOLERANCE, _is_numpy, np
+from utils import *
+
+
+class SparseMatrix(ABC):
+    """ Common interface of the sparse formats. Only non-zero elements are stored,
+        so shapes far beyond what a dense Matrix can materialize are fine """
+
+    _matrix_rmul = True
+
+    def __init__(self, shape: tuple[int, int]) -> None:
+        rows, cols = shape
+        if rows <= 0 or cols <= 0:
+            raise TypeError(
+                "matrix cannot be 0x0"
+            )
+        self.rows, self.cols = rows, cols
+
+    @property
+    def shape(self) -> tuple[int, int]:
+        return self.rows, self.cols
+
+    @property
+    def nnz(self) -> int:
+        return len(self.data)
+
+    @abstractmethod
+    def to_csr(self) -> 'CSRMatrix':
+        ...
+
+    @abstractmethod
+    def to_coo(self) -> 'COOMatrix':
+        ...
+
+    def to_matrix(self) -> Matrix:
+        csr = self.to_csr()
+        buf = [0] * (self.rows * self.cols)
+        for i in range(self.rows):
+            for p in range(csr.indptr[i], csr.indptr[i + 1]):
+                buf[i * self.cols + csr.indices[p]] = csr.data[p]
+        return Matrix._from_buffer(buf, self.rows, self.cols)
+
+    def elem(self, i: int, j: int) -> Number:
+        return self.to_csr().elem(i, j)
+
+    def transpose(self) -> 'SparseMatrix':
+        coo = self.to_coo()
+        return COOMatrix((self.cols, self.rows), coo.col, coo.row, coo.data)
+
+    def __mul__(self, other: Union['SparseMatrix', Matrix, Number]) -> Union['SparseMatrix', Matrix]:
+        csr = self.to_csr()
+        if isinstance(other, SparseMatrix):
+            return csr.multiply_sparse(other.to_csr())
+        if isinstance(other, Matrix):
+            return csr.multiply_dense(other)
+        return CSRMatrix(self.shape, csr.indptr, csr.indices, [elem * other for elem in csr.data])
+
+    def __rmul__(self, other: Union[Matrix, Number]) -> Union['SparseMatrix', Matrix]:
+        if isinstance(other, Matrix):
+            # A * S = (S^T * A^T)^T
+            return (self.transpose() * other.transpose()).transpose()
+        return self * other
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.rows}x{self.cols}, nnz={self.nnz})"
+
+    def _row_dicts(self) -> list[dict[int, Number]]:
+        csr = self.to_csr()
+        return [
+            {csr.indices[p]: csr.data[p] for p in range(csr.indptr[i], csr.indptr[i + 1])}
+            for i in range(self.rows)
+        ]
+
+    def eliminate(self, rhs: Optional[list[Number]] = None) -> 'SparseElimination':
+        return SparseElimination(self._row_dicts(), self.cols, rhs)
+
+    def rank(self) -> int:
+        return len(self.eliminate().pivots)
+
+    def det(self) -> Number:
+        if self.rows != self.cols:
+            raise TypeError(
+                "not a square matrix"
+            )
+        return self.eliminate().det()
+
+    def solve(self, b: Iterable[Number]) -> list[Number]:
+        """ Solve Sx = b by sparse Gaussian elimination """
+        b = list(b)
+        if len(b) != self.rows:
+            raise TypeError(
+                f"right-hand side must have exactly {self.rows} elements"
+            )
+        return self.eliminate(b).solution()
+
+
+class COOMatrix(SparseMatrix):
+    """ Coordinate format: parallel arrays of row indices, column indices and values.
+        Cheap to build incrementally; duplicate entries are summed on conversion """
+
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        row: Iterable[int] = (),
+        col: Iterable[int] = (),
+        data: Iterable[Number] = ()
+    ) -> None:
+        super().__init__(shape)
+        self.row = array("q", row)
+        self.col = array("q", col)
+        self.data = list(data)
+        if not len(self.row) == len(self.col) == len(self.data):
+            raise TypeError(
+                "row, col and data must be the same length"
+            )
+
+    @classmethod
+    def from_matrix(cls, m: Matrix) -> 'COOMatrix':
+        return CSRMatrix.from_matrix(m).to_coo()
+
+    def append(self, i: int, j: int, value: Number) -> None:
+        if not (0 <= i < self.rows and 0 <= j < self.cols):
+            raise IndexError(
+                f"index ({i}, {j}) out of range for a {self.rows}x{self.cols} matrix"
+            )
+        self.row.append(i)
+        self.col.append(j)
+        self.data.append(value)
+
+    def to_coo(self) -> 'COOMatrix':
+        return self
+
+    def to_csr(self) -> 'CSRMatrix':
+        order = sorted(range(len(self.data)), key=lambda p: (self.row[p], self.col[p]))
+        counts = [0] * (self.rows + 1)
+        indices, data = array("q"), []
+        last = None
+        for p in order:
+            key = (self.row[p], self.col[p])
+            if key == last:
+                data[-1] += self.data[p]
+                continue
+            last = key
+            counts[key[0] + 1] += 1
+            indices.append(key[1])
+            data.append(self.data[p])
+        for i in range(self.rows):
+            counts[i + 1] += counts[i]
+        return CSRMatrix(self.shape, counts, indices, data).prune()
+
+
+class CSRMatrix(SparseMatrix):
+    """ Compressed sparse row format: the values and column indices of row i
+        are data[indptr[i]:indptr[i+1]] and indices[indptr[i]:indptr[i+1]] """
+
+    def __init__(
+        self,
+        shape: tuple[int, int],
+        indptr: Iterable[int],
+        indices: Iterable[int],
+        data: Iterable[Number]
+    ) -> None:
+        super().__init__(shape)
+        self.indptr = array("q", indptr)
+        self.indices = array("q", indices)
+        self.data = list(data)
+        if len(self.indptr) != self.rows + 1 or len(self.indices) != len(self.data):
+            raise TypeError(
+                "invalid CSR structure"
+            )
+
+    @classmethod
+    def from_matrix(cls, m: Matrix) -> 'CSRMatrix':
+        indptr, indices, data = array("q", [0]), array("q"), []
+        for i in range(m.rows):
+            for j, elem in enumerate(m.row(i)):
+                if elem != 0:
+                    indices.append(j)
+                    data.append(elem)
+            indptr.append(len(data))
+        return cls(m.shape, indptr, indices, data)
+
+    @classmethod
+    def from_rows(cls, shape: tuple[int, int], rows: Iterable[dict[int, Number]]) -> 'CSRMatrix':
+        indptr, indices, data = array("q", [0]), array("q"), []
+        for row in rows:
+            for j in sorted(row):
+                if row[j] != 0:
+                    indices.append(j)
+                    data.append(row[j])
+            indptr.append(len(data))
+        return cls(shape, indptr, indices, data)
+
+    def to_csr(self) -> 'CSRMatrix':
+        return self
+
+    def to_coo(self) -> COOMatrix:
+        row = array("q")
+        for i in range(self.rows):
+            row.extend([i] * (self.indptr[i + 1] - self.indptr[i]))
+        return COOMatrix(self.shape, row, self.indices, self.data)
+
+    def prune(self) -> 'CSRMatrix':
+        """ Drop explicitly stored zeros """
+        if all(elem != 0 for elem in self.data):
+            return self
+        return CSRMatrix.from_rows(self.shape, self._row_dicts())
+
+    def elem(self, i: int, j: int) -> Number:
+        for p in range(self.indptr[i], self.indptr[i + 1]):
+            if self.indices[p] == j:
+                return self.data[p]
+        return 0
+
+    def row_items(self, i: int) -> Iterable[tuple[int, Number]]:
+        start, stop = self.indptr[i], self.indptr[i + 1]
+        return zip(self.indices[start:stop], self.data[start:stop])
+
+    def multiply_dense(self, m: Matrix) -> Matrix:
+        if self.cols != m.rows:
+            raise TypeError(
+                f"cannot multiply matrices of sizes {self.rows}x{self.cols} and {m.rows}x{m.cols}"
+            )
+        if _is_numpy(m._buf):
+            dense = m.to_numpy()
+            out = np.zeros((self.rows, m.cols), dtype=np.result_type(dense, *self.data[:1]))
+            for i in range(self.rows):
+                start, stop = self.indptr[i], self.indptr[i + 1]
+                if start != stop:
+                    out[i] = np.asarray(self.data[start:stop]) @ dense[self.indices[start:stop]]
+            return Matrix.from_numpy(out)
+        buf = []
+        for i in range(self.rows):
+            acc = [0] * m.cols
+            for k, value in self.row_items(i):
+                acc = [a + value * b for a, b in zip(acc, m.row(k))]
+            buf.extend(acc)
+        return Matrix._from_buffer(buf, self.rows, m.cols)
+
+    def multiply_sparse(self, other: 'CSRMatrix') -> 'CSRMatrix':
+        """ Gustavson's row-by-row product: only touches structurally non-zero pairs """
+        if self.cols != other.rows:
+            raise TypeError(
+                f"cannot multiply matrices of sizes {self.rows}x{self.cols} and {other.rows}x{other.cols}"
+            )
+        rows = []
+        for i in range(self.rows):
+            acc = {}
+            for k, value in self.row_items(i):
+                for j, elem in other.row_items(k):
+                    acc[j] = acc.get(j, 0) + value * elem
+            rows.append(acc)
+        return CSRMatrix.from_rows((self.rows, other.cols), rows)
+
+
+class SparseElimination:
+    """ Gaussian elimination on dict-of-rows storage with Markowitz pivoting:
+        each step eliminates the sparsest remaining column and, within it, the
+        sparsest acceptable row, which keeps fill-in low. Inexact values also
+        have to pass a threshold test (|a| >= threshold * column maximum), and
+        inexact fill no larger than drop_tolerance times the largest magnitude
+        seen in its row is cancellation residue: it is dropped, never pivoted on.
+        The default drop_tolerance follows Matrix.rank """
+
+    def __init__(
+        self,
+        rows: list[dict[int, Number]],
+        ncols: int,
+        rhs: Optional[list[Number]] = None,
+        threshold: Optional[float] = 0.1,
+        drop_tolerance: Optional[float] = None
+    ) -> None:
+        self.rows, self.ncols, self.rhs = rows, ncols, rhs
+        if drop_tolerance is None:
+            drop_tolerance = ZERO_TOLERANCE * max(len(rows), ncols) * sys.float_info.epsilon
+        scale = [max(map(abs, row.values()), default=0) for row in rows]
+        rhs_scale = max(map(abs, rhs), default=0) if rhs is not None else 0
+        # (row, column) of every pivot in elimination order
+        self.pivots = []
+        col_rows = [set() for _ in range(ncols)]
+        for i, row in enumerate(rows):
+            for j in row:
+                col_rows[j].add(i)
+        heap = [(len(r), j) for j, r in enumerate(col_rows) if r]
+        heapq.heapify(heap)
+        done_cols = set()
+        while heap:
+            count, c = heapq.heappop(heap)
+            if c in done_cols or count != len(col_rows[c]) or not count:
+                continue
+            candidates = col_rows[c]
+            exact = all(is_rational(rows[i][c]) for i in candidates)
+            limit = 0 if exact else threshold * max(abs(rows[i][c]) for i in candidates)
+            r = min(
+                (i for i in candidates if abs(rows[i][c]) >= limit),
+                key=lambda i: len(rows[i])
+            )
+            pivot_row, pivot = rows[r], rows[r][c]
+            for j in pivot_row:
+                col_rows[j].discard(r)
+                if j != c:
+                    heapq.heappush(heap, (len(col_rows[j]), j))
+            for i in candidates:
+                if i == r:
+                    continue
+                row = rows[i]
+                f = exact_div(row.pop(c), pivot)
+                for j, value in pivot_row.items():
+                    if j == c:
+                        continue
+                    new = row.get(j, 0) - f * value
+                    if new == 0 or not is_rational(new) and abs(new) <= drop_tolerance * scale[i]:
+                        if j in row:
+                            del row[j]
+                            col_rows[j].discard(i)
+                    else:
+                        if j not in row:
+                            col_rows[j].add(i)
+                        row[j] = new
+                        scale[i] = max(scale[i], abs(new))
+                    heapq.heappush(heap, (len(col_rows[j]), j))
+                if rhs is not None:
+                    # the right-hand side is measured against its own largest magnitude
+                    b = rhs[i] - f * rhs[r]
+                    if not is_rational(b) and abs(b) <= drop_tolerance * rhs_scale:
+                        b = 0
+                    rhs_scale = max(rhs_scale, abs(b))
+                    rhs[i] = b
+            col_rows[c] = set()
+            done_cols.add(c)
+            self.pivots.append((r, c))
+
+    @property
+    def fill_in(self) -> int:
+        """ Number of non-zeros left in the factorized rows """
+        return sum(len(row) for row in self.rows)
+
+    def det(self) -> Number:
+        n = len(self.rows)
+        if len(self.pivots) < n:
+            return 0
+        d = 1
+        perm = [0] * n
+        for r, c in self.pivots:
+            d *= self.rows[r][c]
+            perm[r] = c
+        # sign of the permutation taking pivot rows to pivot columns
+        seen = [False] * n
+        for i in range(n):
+            if seen[i]:
+                continue
+            j, length = i, 0
+            while not seen[j]:
+                seen[j] = True
+                j = perm[j]
+                length += 1
+            if length % 2 == 0:
+                d = -d
+        return normalize_fraction(d)
+
+    def solution(self) -> list[Number]:
+        if self.rhs is None:
+            raise TypeError(
+                "elimination was run without a right-hand side"
+            )
+        pivot_rows = {r for r, _ in self.pivots}
+        if any(self.rhs[i] != 0 for i in range(len(self.rows)) if i not in pivot_rows):
+            raise ValueError(
+                "system is inconsistent"
+            )
+        if len(self.pivots) < self.ncols:
+            raise ValueError(
+                "matrix is singular"
+            )
+        x = [0] * self.ncols
+        for r, c in reversed(self.pivots):
+            row = self.rows[r]
+            total = self.rhs[r] - sum(value * x[j] for j, value in row.items() if j != c)
+            x[c] = normalize_fraction(exact_div(total, row[c]))
+        return x
+
@@ -0,0 +1,265 @@
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <cstdint>
+#include <cstring>
+#ifdef _MSC_VER
+#include <intrin.h>
+#endif
+
+/*
+   Optional native kernels for number_theory.py, built with
+       python setup.py build_ext --inplace
+   The algorithms mirror gcd, euclideanAlgorithm and isCoprime from
+   number_theory.cpp, but on 64-bit machine words instead of bigint:
+   every function raises OverflowError for arguments that do not fit,
+   and number_theory.py then falls back to Python's own integers
+*/
+
+
+static int64_t floorDiv(int64_t a, int64_t b) {
+    /* Python's // rather than C++'s truncating division, so that the
+       Bezout coefficients agree with the pure Python implementation */
+    int64_t q = a / b;
+    if (a % b != 0 && ((a < 0) != (b < 0))) {
+        --q;
+    }
+    return q;
+}
+
+static uint64_t gcd(uint64_t a, uint64_t b) {
+    /* Find the greatest common divisor of integers a and b */
+    while (b != 0) {
+        uint64_t temp = a % b;
+        a = b;
+        b = temp;
+    }
+    return a;
+}
+
+static uint64_t absolute(int64_t a) {
+    return a < 0 ? (uint64_t)0 - (uint64_t)a : (uint64_t)a;
+}
+
+static int euclideanAlgorithm(int64_t a, int64_t b, int64_t* g, int64_t* x, int64_t* y) {
+    /* Euclid's algorithm to find integers x and y that satisfy
+       Bezout's identity: ax + by = g = gcd(a, b). Returns -1 if an
+       intermediate value would overflow */
+    if (a == INT64_MIN || b == INT64_MIN) {
+        return -1;
+    }
+    int64_t s0 = 0, s1 = 1, t0 = 1, t1 = 0, r0 = b, r1 = a, q, temp;
+    while (r0 != 0) {
+        q = floorDiv(r1, r0);
+        temp = r0;
+        r0 = r1 - q * r0;
+        r1 = temp;
+        temp = s0;
+        s0 = s1 - q * s0;
+        s1 = temp;
+        temp = t0;
+        t0 = t1 - q * t0;
+        t1 = temp;
+    }
+    *g = r1;
+    *x = s1;
+    *y = t1;
+    return 0;
+}
+
+static uint64_t mulMod(uint64_t a, uint64_t b, uint64_t m) {
+#ifdef _MSC_VER
+    uint64_t high, low = _umul128(a, b, &high), remainder;
+    _udiv128(high, low, m, &remainder);
+    return remainder;
+#else
+    return (uint64_t)((unsigned __int128)a * b % m);
+#endif
+}
+
+static uint64_t powMod(uint64_t base, uint64_t exponent, uint64_t m) {
+    /* Right-to-left binary exponentiation with 128-bit intermediates */
+    uint64_t result = 1 % m;
+    base %= m;
+    while (exponent) {
+        if (exponent & 1) {
+            result = mulMod(result, base, m);
+        }
+        base = mulMod(base, base, m);
+        exponent >>= 1;
+    }
+    return result;
+}
+
+static bool strongProbablePrime(uint64_t n, uint64_t a, uint64_t d, uint64_t s) {
+    /* Miller-Rabin round for n - 1 = d * 2^s with d odd */
+    uint64_t x = powMod(a, d, n);
+    if (x == 1 || x == n - 1) {
+        return true;
+    }
+    for (uint64_t i = 1; i < s; ++i) {
+        x = mulMod(x, x, n);
+        if (x == n - 1) {
+            return true;
+        }
+    }
+    return false;
+}
+
+
+/* Argument conversion: PyLong_As* already raises OverflowError for
+   values that do not fit, and TypeError for non-integers */
+
+static int asInt64(PyObject* obj, int64_t* out) {
+    long long value = PyLong_AsLongLong(obj);
+    if (value == -1 && PyErr_Occurred()) {
+        return -1;
+    }
+    *out = (int64_t)value;
+    return 0;
+}
+
+static int asUInt64(PyObject* obj, uint64_t* out) {
+    if (!PyLong_Check(obj)) {
+        PyErr_SetString(PyExc_TypeError, "an integer is required");
+        return -1;
+    }
+    unsigned long long value = PyLong_AsUnsignedLongLong(obj);
+    if (value == (unsigned long long)-1 && PyErr_Occurred()) {
+        // negative values raise OverflowError as well
+        return -1;
+    }
+    *out = (uint64_t)value;
+    return 0;
+}
+
+
+static PyObject* py_gcd(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    int64_t a, b;
+    if (nargs != 2) {
+        PyErr_SetString(PyExc_TypeError, "gcd expects 2 arguments");
+        return NULL;
+    }
+    if (asInt64(args[0], &a) < 0 || asInt64(args[1], &b) < 0) {
+        return NULL;
+    }
+    return PyLong_FromUnsignedLongLong(gcd(absolute(a), absolute(b)));
+}
+
+static PyObject* py_is_coprime(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    int64_t a, b;
+    if (nargs != 2) {
+        PyErr_SetString(PyExc_TypeError, "is_coprime expects 2 arguments");
+        return NULL;
+    }
+    if (asInt64(args[0], &a) < 0 || asInt64(args[1], &b) < 0) {
+        return NULL;
+    }
+    return PyBool_FromLong(gcd(absolute(a), absolute(b)) == 1);
+}
+
+static PyObject* py_extended_gcd(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    int64_t a, b, g, x, y;
+    if (nargs != 2) {
+        PyErr_SetString(PyExc_TypeError, "extended_gcd expects 2 arguments");
+        return NULL;
+    }
+    if (asInt64(args[0], &a) < 0 || asInt64(args[1], &b) < 0) {
+        return NULL;
+    }
+    if (euclideanAlgorithm(a, b, &g, &x, &y) < 0) {
+        PyErr_SetString(PyExc_OverflowError, "extended_gcd arguments out of range");
+        return NULL;
+    }
+    return Py_BuildValue("(LLL)", (long long)g, (long long)x, (long long)y);
+}
+
+static PyObject* py_pow_mod(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    int64_t base;
+    uint64_t exponent, m;
+    if (nargs != 3) {
+        PyErr_SetString(PyExc_TypeError, "pow_mod expects 3 arguments");
+        return NULL;
+    }
+    if (asInt64(args[0], &base) < 0 || asUInt64(args[1], &exponent) < 0 || asUInt64(args[2], &m) < 0) {
+        return NULL;
+    }
+    if (m == 0) {
+        PyErr_SetString(PyExc_ValueError, "pow_mod modulus must be positive");
+        return NULL;
+    }
+    // reduce a negative base to its least residue, as pow() does
+    uint64_t residue = base < 0 ? (m - absolute(base) % m) % m : (uint64_t)base % m;
+    return PyLong_FromUnsignedLongLong(powMod(residue, exponent, m));
+}
+
+static PyObject* py_strong_probable_prime(PyObject* self, PyObject* const* args, Py_ssize_t nargs) {
+    uint64_t n, a, d, s;
+    if (nargs != 4) {
+        PyErr_SetString(PyExc_TypeError, "strong_probable_prime expects 4 arguments");
+        return NULL;
+    }
+    if (asUInt64(args[0], &n) < 0 || asUInt64(args[1], &a) < 0
+        || asUInt64(args[2], &d) < 0 || asUInt64(args[3], &s) < 0) {
+        return NULL;
+    }
+    if (n < 3) {
+        PyErr_SetString(PyExc_ValueError, "strong_probable_prime needs an odd n > 2");
+        return NULL;
+    }
+    return PyBool_FromLong(strongProbablePrime(n, a, d, s));
+}
+
+static PyObject* py_odd_sieve(PyObject* self, PyObject* arg) {
+    /* Same layout as number_theory.odd_sieve: flags[i] == 1 if and only if
+       2i + 1 is a prime less than n */
+    Py_ssize_t n = PyLong_AsSsize_t(arg);
+    if (n == -1 && PyErr_Occurred()) {
+        return NULL;
+    }
+    Py_ssize_t size = n > 0 ? n / 2 : 0;
+    PyObject* result = PyByteArray_FromStringAndSize(NULL, size);
+    if (result == NULL) {
+        return NULL;
+    }
+    char* flags = PyByteArray_AS_STRING(result);
+    std::memset(flags, 1, (size_t)size);
+    if (size) {
+        flags[0] = 0;
+    }
+    Py_BEGIN_ALLOW_THREADS
+    for (Py_ssize_t i = 1; (2 * i + 1) * (2 * i + 1) < n; ++i) {
+        if (flags[i]) {
+            Py_ssize_t p = 2 * i + 1;
+            for (Py_ssize_t j = p * p / 2; j < size; j += p) {
+                flags[j] = 0;
+            }
+        }
+    }
+    Py_END_ALLOW_THREADS
+    return result;
+}
+
+
+static PyMethodDef methods[] = {
+    {"gcd", (PyCFunction)(void (*)(void))py_gcd, METH_FASTCALL,
+     "gcd(a, b) -> greatest common divisor of 64-bit integers a and b"},
+    {"is_coprime", (PyCFunction)(void (*)(void))py_is_coprime, METH_FASTCALL,
+     "is_coprime(a, b) -> whether or not a and b are relatively prime"},
+    {"extended_gcd", (PyCFunction)(void (*)(void))py_extended_gcd, METH_FASTCALL,
+     "extended_gcd(a, b) -> (g, x, y) such that ax + by = g = gcd(a, b)"},
+    {"pow_mod", (PyCFunction)(void (*)(void))py_pow_mod, METH_FASTCALL,
+     "pow_mod(base, exponent, m) -> base^exponent mod m for a 64-bit modulus"},
+    {"strong_probable_prime", (PyCFunction)(void (*)(void))py_strong_probable_prime, METH_FASTCALL,
+     "strong_probable_prime(n, a, d, s) -> one Miller-Rabin round, n - 1 = d * 2^s"},
+    {"odd_sieve", py_odd_sieve, METH_O,
+     "odd_sieve(n) -> bytearray with flags[i] == 1 iff 2i + 1 is a prime less than n"},
+    {NULL, NULL, 0, NULL}
+};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_number_theory", "Native 64-bit kernels for number_theory.py", -1, methods
+};
+
+PyMODINIT_FUNC PyInit__number_theory(void) {
+    return PyModule_Create(&module);
+}
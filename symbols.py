@@ -54,6 +54,7 @@ class ComplexSymbol:
         return repr(self.expr)
 
 
-i = ComplexSymbol("i")
-i = 2 * i
-print(i)
+if __name__ == "__main__":
+    i = ComplexSymbol("i")
+    i = 2 * i
+    print(i)
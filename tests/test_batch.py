@@ -0,0 +1,71 @@
+import pytest
+from batch import MatrixBatch
+from matrices import Matrix
+
+np = pytest.importorskip("numpy")
+
+
+def random_stack(rng: 'np.random.Generator', n: int, rows: int, cols: int) -> 'np.ndarray':
+    return rng.standard_normal((n, rows, cols))
+
+
+def test_products_match_matrix():
+    rng = np.random.default_rng(1)
+    stack, other = random_stack(rng, 6, 3, 4), random_stack(rng, 6, 4, 2)
+    batch, matrices = MatrixBatch(stack), [Matrix.from_numpy(a) for a in stack]
+    for got, a, b in zip(batch * MatrixBatch(other), matrices, other):
+        np.testing.assert_allclose(got.to_numpy(), (a * Matrix.from_numpy(b)).to_numpy())
+    m = Matrix(rng.standard_normal((4, 4)).tolist())
+    left = Matrix(rng.standard_normal((2, 3)).tolist())
+    for got, a in zip(batch * m, matrices):
+        np.testing.assert_allclose(got.to_numpy(), (a * m).to_numpy())
+    for got, a in zip(left * batch, matrices):
+        np.testing.assert_allclose(got.to_numpy(), (left * a).to_numpy())
+    np.testing.assert_allclose((batch * 2 + batch).to_numpy(), 3 * stack)
+
+
+def test_det_inverse_solve_match_matrix():
+    rng = np.random.default_rng(2)
+    stack = random_stack(rng, 8, 4, 4)
+    vectors, rhs = rng.standard_normal((8, 4)), rng.standard_normal((8, 4, 2))
+    batch = MatrixBatch(stack)
+    det, inverse = batch.det(), batch.inverse()
+    shared = batch.solve(vectors[0].tolist())
+    stacked, matrices = batch.solve(vectors), batch.solve(rhs)
+    for i, a in enumerate(stack):
+        m = Matrix(a.tolist())
+        np.testing.assert_allclose(det[i], m.det(), rtol=1e-9)
+        np.testing.assert_allclose(inverse[i].to_numpy(), m.inverse().to_numpy(), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(shared[i], m.solve(vectors[0].tolist()), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(stacked[i], m.solve(vectors[i].tolist()), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(matrices[i], m.solve(Matrix(rhs[i].tolist())).to_numpy(), rtol=1e-8, atol=1e-10)
+
+
+def test_indexing_and_round_trip():
+    stack = np.arange(24.0).reshape(2, 3, 4)
+    batch = MatrixBatch(stack)
+    assert len(batch) == 2 and batch.shape == (2, 3, 4)
+    assert [m.data for m in batch.to_matrices()] == [Matrix.from_numpy(a).data for a in stack]
+    assert MatrixBatch.from_matrices(batch).shape == batch.shape
+    batch[1] = Matrix([[0.0] * 4] * 3)
+    assert not stack[1].any()
+    assert MatrixBatch(np.eye(2)).shape == (1, 2, 2)
+
+
+def test_shape_mismatch():
+    batch = MatrixBatch(np.ones((3, 2, 4)))
+    with pytest.raises(TypeError):
+        batch * MatrixBatch(np.ones((3, 2, 4)))
+    with pytest.raises(TypeError):
+        batch * Matrix([[1.0, 2.0]])
+    with pytest.raises(TypeError):
+        Matrix([[1.0, 2.0, 3.0]]) * batch
+    for method in (batch.det, batch.inverse):
+        with pytest.raises(TypeError):
+            method()
+    with pytest.raises(TypeError):
+        batch.solve([1.0, 2.0])
+    with pytest.raises(TypeError):
+        MatrixBatch(np.ones(5))
+    with pytest.raises(TypeError):
+        MatrixBatch(np.ones((0, 2, 2)))
@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+import pytest
+import utils
+from import_check import HEAVY, MODULES
+
+# Runs in a fresh interpreter: numpy and sympy can still be found (so the
+# lazy loaders treat them as installed) but actually loading either fails
+_PROBE = """
+import importlib.abc, importlib.machinery, sys
+
+class Blocked(importlib.abc.Loader):
+    def create_module(self, spec):
+        return None
+
+    def exec_module(self, module):
+        raise ImportError(f"{{module.__name__}} is blocked")
+
+class Blocker(importlib.abc.MetaPathFinder):
+    def find_spec(self, name, path=None, target=None):
+        if name.partition(".")[0] in {heavy!r}:
+            return importlib.machinery.ModuleSpec(name, Blocked())
+        return None
+
+sys.meta_path.insert(0, Blocker())
+import {module}
+print(",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+@pytest.mark.parametrize("module", MODULES)
+def test_import_without_heavy_dependencies(module):
+    result = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, heavy=HEAVY)],
+        capture_output=True, text=True, cwd=os.path.dirname(utils.__file__)
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == ""
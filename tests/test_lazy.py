@@ -0,0 +1,53 @@
+import random
+import pytest
+from lazy import LazyMatrix, MatMul, Scale
+from matrices import Matrix
+
+np = pytest.importorskip("numpy")
+
+
+def random_matrix(rng: random.Random, m: int, n: int) -> Matrix:
+    return Matrix([[rng.randint(-5, 5) for _ in range(n)] for _ in range(m)])
+
+
+def test_lazy_matches_eager():
+    rng = random.Random(1)
+    a, b, c = random_matrix(rng, 3, 8), random_matrix(rng, 8, 2), random_matrix(rng, 2, 6)
+    d = random_matrix(rng, 3, 6)
+    expression = a.lazy() * b * c * 2 + d - d.lazy() * 3
+    eager = (a * b * c).data
+    assert expression.evaluate().data == [
+        [2 * x - 2 * y for x, y in zip(row, d_row)] for row, d_row in zip(eager, d.data)
+    ]
+
+
+def test_chain_order():
+    rng = random.Random(2)
+    a, b, c = random_matrix(rng, 10, 100), random_matrix(rng, 100, 5), random_matrix(rng, 5, 50)
+    chain = MatMul([a.lazy(), b.lazy(), c.lazy()])
+    cost, split = chain.order()
+    assert cost == 10 * 100 * 5 + 10 * 5 * 50
+    assert chain.evaluate().data == (a * b * c).data
+
+
+def test_evaluate_returns_a_new_matrix():
+    a = Matrix([[1, 2], [3, 4]])
+    result = a.lazy().evaluate()
+    assert result is not a
+    result.set_elem(0, 0, 9)
+    assert a.elem(0, 0) == 1
+
+
+
+def test_evaluate_copies_a_bare_operand():
+    a = Matrix([[1, 2], [3, 4]])
+    for expression in (a.lazy(), Scale(a.lazy(), 1), a.lazy() * 1):
+        result = expression.evaluate()
+        assert result is not a and result.data == a.data
+        result.set_elem(1, 1, 0)
+        assert a.elem(1, 1) == 4
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        LazyMatrix()
@@ -0,0 +1,139 @@
+import random
+import pytest
+from fractions import Fraction
+import bareiss
+import determinant
+from lu import LUDecomposition
+from matrices import Matrix
+
+np = pytest.importorskip("numpy")
+sympy = pytest.importorskip("sympy")
+
+
+def random_rows(rng: random.Random, m: int, n: int) -> list[list[int]]:
+    return [[rng.randint(-20, 20) for _ in range(n)] for _ in range(m)]
+
+
+def to_sympy(x):
+    x = Fraction(x)
+    return sympy.Rational(x.numerator, x.denominator)
+
+
+def test_exact_det_against_sympy():
+    rng = random.Random(1)
+    for n in range(1, 8):
+        rows = random_rows(rng, n, n)
+        assert determinant.det(rows) == sympy.Matrix(rows).det()
+        fractions = [[Fraction(x, rng.randint(1, 5)) for x in row] for row in rows]
+        assert to_sympy(Matrix(fractions).det()) == sympy.Matrix([[to_sympy(x) for x in row] for row in fractions]).det()
+
+
+def test_exact_solve_and_inverse_against_sympy():
+    rng = random.Random(2)
+    for n in range(1, 7):
+        rows = random_rows(rng, n, n)
+        if sympy.Matrix(rows).det() == 0:
+            continue
+        b = [rng.randint(-9, 9) for _ in range(n)]
+        expected = sympy.Matrix(rows).LUsolve(sympy.Matrix(b))
+        assert [to_sympy(x) for x in Matrix(rows).solve(b)] == list(expected)
+        inverse = Matrix(rows).inverse()
+        assert [[to_sympy(x) for x in row] for row in inverse.data] == sympy.Matrix(rows).inv().tolist()
+        assert (Matrix(rows) * inverse).data == Matrix(rows).identity().data
+
+
+def test_singular_exact():
+    rows = [[1, 2, 3], [2, 4, 6], [1, 0, 1]]
+    assert Matrix(rows).det() == 0
+    with pytest.raises(ValueError):
+        Matrix(rows).inverse()
+    with pytest.raises(ValueError):
+        Matrix(rows).solve([1, 2, 3])
+    assert bareiss.rank(rows) == 2
+    for v in bareiss.nullspace(rows):
+        assert all(sum(a * x for a, x in zip(row, v)) == 0 for row in rows)
+
+
+def test_fraction_free_factorization_against_sympy():
+    rng = random.Random(4)
+    for n in range(1, 8):
+        rows = [[Fraction(rng.randint(-9, 9), rng.randint(1, 4)) for _ in range(n)] for _ in range(n)]
+        # zero leading entries force row swaps
+        rows[0][0] = 0
+        expected = sympy.Matrix([[to_sympy(x) for x in row] for row in rows])
+        lu = bareiss.FractionFreeLU(rows)
+        assert to_sympy(lu.det()) == expected.det() and lu.rank() == expected.rank()
+        if expected.det() == 0:
+            with pytest.raises(ValueError):
+                lu.solve([[1]] * n)
+            continue
+        for _ in range(3):
+            b = [[Fraction(rng.randint(-9, 9), rng.randint(1, 6)), rng.randint(-9, 9)] for _ in range(n)]
+            x = lu.solve(b)
+            assert [[to_sympy(v) for v in row] for row in x] == expected.LUsolve(sympy.Matrix(b).applyfunc(to_sympy)).tolist()
+    assert bareiss.FractionFreeLU([[1, 2, 3], [2, 4, 6]]).rank() == 1
+    with pytest.raises(TypeError):
+        bareiss.FractionFreeLU([[1, 2, 3], [2, 4, 6]]).det()
+
+
+def test_exact_caches_are_dropped_on_write():
+    m = Matrix([[2, 1], [1, 3]])
+    assert m.is_exact() and m.fraction_free() is m.fraction_free()
+    assert m.det() == 5 and m.solve([1, 0]) == [Fraction(3, 5), Fraction(-1, 5)]
+    c = m.copy()
+    m.set_elem(0, 0, 4)
+    assert m.det() == 11 and c.det() == 5
+    m.set_elem(0, 0, 4.5)
+    assert not m.is_exact() and m.det() == pytest.approx(12.5)
+    m.set_elem(0, 0, Fraction(9, 2))
+    assert m.is_exact() and m.det() == Fraction(25, 2)
+
+
+@pytest.mark.parametrize("backend", ["exact", "numpy"])
+def test_float_lu_against_numpy(backend):
+    rng = np.random.default_rng(3)
+    for n in range(1, 9):
+        a = rng.standard_normal((n, n))
+        b = rng.standard_normal((n, 2))
+        m = Matrix(a.tolist()) if backend == "exact" else Matrix.from_numpy(a)
+        np.testing.assert_allclose(m.det(), np.linalg.det(a), rtol=1e-9)
+        np.testing.assert_allclose(m.inverse().to_numpy(), np.linalg.inv(a), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(m.solve(Matrix(b.tolist())).to_numpy(), np.linalg.solve(a, b), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(m.lu().solve(b[:, 0].tolist(), transpose=True), np.linalg.solve(a.T, b[:, 0]), rtol=1e-8, atol=1e-10)
+
+
+@pytest.mark.parametrize("complex_", [False, True])
+@pytest.mark.parametrize("n", [3, 10])
+def test_condition_estimate(complex_, n):
+    rng = np.random.default_rng(n)
+    ratios = []
+    for _ in range(50):
+        a = rng.standard_normal((n, n))
+        if complex_:
+            a = a + 1j * rng.standard_normal((n, n))
+        exact = np.linalg.cond(a, 1)
+        for m in (Matrix(a.tolist()), Matrix.from_numpy(a)):
+            estimate = LUDecomposition(m).cond()
+            # Hager's method gives a lower bound, and usually the exact value
+            assert estimate <= exact * (1 + 1e-9)
+            ratios.append(estimate / exact)
+    # sign(real(y)) in place of y / |y| underestimates a quarter or more of complex cases
+    assert np.mean(np.array(ratios) < 0.9) < 0.15
+
+
+@pytest.mark.parametrize("backend", ["exact", "numpy"])
+def test_cached_factorization_is_dropped_on_write(backend):
+    a = np.array([[2.0, 1.0], [1.0, 3.0]])
+    m = Matrix(a.tolist()) if backend == "exact" else Matrix.from_numpy(a.copy())
+    assert m.lu() is m.lu()
+    np.testing.assert_allclose(m.det(), 5.0)
+    # ndarray views cannot write behind the cached factorization's back
+    if backend == "numpy":
+        with pytest.raises(ValueError):
+            m.to_numpy()[0, 0] = 4.0
+        with pytest.raises(ValueError):
+            m.row(0).to_numpy()[0] = 4.0
+    m.to_numpy(copy=True)[0, 0] = 4.0
+    np.testing.assert_allclose(m.det(), 5.0)
+    m.set_elem(0, 0, 4.0)
+    np.testing.assert_allclose(m.det(), 11.0)
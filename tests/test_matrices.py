@@ -0,0 +1,158 @@
+import random
+import pytest
+from fractions import Fraction
+from matrices import Matrix
+
+np = pytest.importorskip("numpy")
+
+
+def random_rows(rng: random.Random, m: int, n: int, lo: int = -9, hi: int = 9) -> list[list[int]]:
+    return [[rng.randint(lo, hi) for _ in range(n)] for _ in range(m)]
+
+
+def rank_deficient(rng: 'np.random.Generator', m: int, n: int, k: int) -> 'np.ndarray':
+    scale = 10.0 ** rng.integers(-6, 7)
+    return scale * rng.standard_normal((m, k)) @ rng.standard_normal((k, n))
+
+
+def test_views_share_the_buffer():
+    m = Matrix([[1, 2, 3], [4, 5, 6]])
+    t = m.transpose()
+    assert t.data == [[1, 4], [2, 5], [3, 6]]
+    assert m.row(1).tolist() == [4, 5, 6]
+    assert m.col(2).tolist() == [3, 6]
+    assert Matrix.from_numpy(m.to_numpy()).data == m.data
+
+
+def test_copy_on_write_exact():
+    m = Matrix([[1, 2], [3, 4]])
+    c = m.copy()
+    c.set_elem(0, 1, 99)
+    t = m.transpose()
+    t.set_elem(0, 0, -1)
+    assert m.data == [[1, 2], [3, 4]]
+    assert c.data == [[1, 99], [3, 4]]
+
+
+@pytest.mark.parametrize("dtype", [None, np.float64])
+def test_views_survive_copy_on_write(dtype):
+    m = Matrix([[1, 2, 3], [4, 5, 6]], dtype=dtype)
+    t = m.transpose()
+    row, col = t.row(0), t.col(1)[1:]
+    row[1] = 99
+    col[0] = -7
+    assert t.data == [[1, 99], [2, -7], [3, 6]]
+    assert row.tolist() == [1, 99] and col.tolist() == [-7, 6]
+    assert m.data == [[1, 2, 3], [4, 5, 6]]
+
+
+def test_copy_on_write_numpy_views():
+    m = Matrix.from_numpy(np.arange(6.0).reshape(2, 3))
+    c = m.copy()
+    with pytest.raises(ValueError):
+        c.to_numpy()[0, 1] = 99
+    with pytest.raises(ValueError):
+        c.row(0).to_numpy()[1] = 99
+    # a matrix wrapped around a read-only view copies on its first write
+    w = Matrix.from_numpy(c.to_numpy())
+    w.set_elem(0, 1, 5)
+    same = m.astype(np.float64)
+    same.set_elem(0, 2, 7)
+    assert m.elem(0, 1) == 1 and m.elem(0, 2) == 2
+    # views stay read-only once the copy owns its buffer; copy=True is writable
+    c.set_elem(0, 0, 3)
+    with pytest.raises(ValueError):
+        c.to_numpy()[1, 1] = 42
+    array = c.to_numpy(copy=True)
+    array[1, 1] = 42
+    assert c.elem(1, 1) == 4 and m.elem(1, 1) == 4
+    assert c.row(1).to_numpy(copy=True).flags.writeable
+
+
+def test_power():
+    rng = random.Random(1)
+    a = Matrix(random_rows(rng, 4, 4))
+    expected = a.identity()
+    for e in range(6):
+        assert (a ** e).data == expected.data
+        expected = expected * a
+    assert (a ** 1) is not a
+    assert pow(a, 5, 7).data == [[x % 7 for x in row] for row in (a ** 5).data]
+
+
+def test_inverse_mod_composite_modulus():
+    a = Matrix([[2, 3], [3, 2]])
+    assert pow(a, -1, 6).data == [[2, 3], [3, 2]]
+    with pytest.raises(ValueError):
+        Matrix([[2, 0], [0, 1]]).inverse_mod(6)
+
+
+@pytest.mark.parametrize("modulus", [6, 12, 30, 36, 97, 1000])
+def test_inverse_mod_against_sympy(modulus):
+    sympy = pytest.importorskip("sympy")
+    rng = random.Random(modulus)
+    for _ in range(40):
+        n = rng.randint(1, 5)
+        rows = random_rows(rng, n, n, -50, 50)
+        try:
+            expected = sympy.Matrix(rows).inv_mod(modulus)
+        except ValueError:
+            with pytest.raises(ValueError):
+                Matrix(rows).inverse_mod(modulus)
+            continue
+        assert Matrix(rows).inverse_mod(modulus).data == expected.tolist()
+
+
+def test_exact_rref_against_sympy():
+    sympy = pytest.importorskip("sympy")
+    rng = random.Random(2)
+    for _ in range(20):
+        m, n = rng.randint(1, 6), rng.randint(1, 6)
+        rows = random_rows(rng, m, n, -3, 3)
+        expected = sympy.Matrix(rows).rref()[0]
+        got = Matrix(rows).rref()
+        assert [[sympy.Rational(Fraction(x).numerator, Fraction(x).denominator) for x in row] for row in got.data] == expected.tolist()
+        assert Matrix(rows).rank() == sympy.Matrix(rows).rank()
+
+
+@pytest.mark.parametrize("backend", ["exact", "numpy"])
+def test_float_rank_deficient(backend):
+    rng = np.random.default_rng(3)
+    for _ in range(100):
+        m, n = rng.integers(2, 10, 2)
+        k = rng.integers(1, min(m, n) + 1)
+        a = rank_deficient(rng, m, n, k)
+        matrix = Matrix(a.tolist()) if backend == "exact" else Matrix.from_numpy(a)
+        assert matrix.rank() == k
+        kernel = matrix.nullspace()
+        assert len(kernel) == n - k
+        if kernel:
+            assert np.abs(a @ np.array(kernel).T).max() <= 1e-9 * np.abs(a).max() * np.abs(kernel).max()
+
+
+def test_float_full_rank():
+    rng = np.random.default_rng(4)
+    for _ in range(50):
+        m, n = rng.integers(1, 10, 2)
+        a = rng.standard_normal((m, n))
+        assert Matrix(a.tolist()).rank() == min(m, n)
+        np.testing.assert_allclose(
+            Matrix(a.tolist()).rref().to_numpy()[:min(m, n), :min(m, n)], np.eye(min(m, n)), atol=1e-12
+        )
+
+
+def test_parallel_product_is_opt_in():
+    rng = random.Random(5)
+    a = Matrix(random_rows(rng, 70, 70))
+    b = Matrix(random_rows(rng, 70, 70))
+    expected = (np.array(a.data, dtype=object) @ np.array(b.data, dtype=object)).tolist()
+    assert (a * b).data == expected
+    assert a.multiply_matrix(a, b, processes=2).data == expected
+
+
+def test_numpy_backend_matches_exact():
+    rng = random.Random(6)
+    rows = random_rows(rng, 5, 5)
+    exact, fast = Matrix(rows), Matrix(rows, dtype=np.float64)
+    np.testing.assert_allclose((fast * fast).to_numpy(), np.array((exact * exact).data, dtype=float))
+    assert fast.backend == "numpy" and exact.backend == "exact"
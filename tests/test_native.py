@@ -0,0 +1,83 @@
+import math
+import random
+import pytest
+import number_theory
+
+if number_theory._native is None:
+    pytest.skip("the _number_theory extension is not built", allow_module_level=True)
+
+native = number_theory._native
+
+EDGES = [0, 1, 2, -1, -2, 2**31 - 1, 2**32, 2**62, 2**63 - 1, -(2**63 - 1), -2**63, 2**63, 2**64 - 1, 2**64, 2**100]
+
+
+def random_operands(trials: int) -> list[tuple[int, int]]:
+    rng = random.Random(0)
+    operands = []
+    for _ in range(trials):
+        bits = rng.choice((8, 32, 63, 64, 80))
+        operands.append((rng.randrange(-2**bits, 2**bits), rng.randrange(-2**bits, 2**bits)))
+    return operands
+
+
+OPERANDS = [(a, b) for a in EDGES for b in EDGES] + random_operands(2000)
+
+
+def outcome(fn, *args):
+    try:
+        return fn(*args)
+    except Exception as e:
+        return type(e)
+
+
+def pure_python(fn, *args):
+    """ Call fn with the native kernels switched off """
+    saved, number_theory._native = number_theory._native, None
+    try:
+        return outcome(fn, *args)
+    finally:
+        number_theory._native = saved
+
+
+def fits(*args: int) -> bool:
+    return all(-2**63 < x < 2**63 for x in args)
+
+
+@pytest.mark.parametrize("native_fn, python_fn", [
+    (native.gcd, math.gcd),
+    (native.is_coprime, number_theory.is_coprime),
+])
+def test_word_sized_kernels(native_fn, python_fn):
+    for a, b in OPERANDS:
+        if fits(a, b):
+            assert outcome(native_fn, a, b) == pure_python(python_fn, a, b), (a, b)
+
+
+def test_extended_gcd():
+    for a, b in OPERANDS:
+        assert outcome(number_theory.extended_gcd, a, b) == pure_python(number_theory.extended_gcd, a, b), (a, b)
+
+
+def test_pow_mod():
+    for a, b in OPERANDS:
+        args = (a, abs(a) % 1000, abs(b) or 1)
+        assert outcome(number_theory.pow_mod, *args) == pure_python(pow, *args), args
+
+
+def test_multiplicative_inverse():
+    for a, b in OPERANDS:
+        args = (a, abs(b) or 1, False)
+        fn = number_theory.multiplicative_inverse
+        assert outcome(fn, *args) == pure_python(fn, *args), args
+
+
+@pytest.mark.parametrize("n", [
+    *range(-3, 200), *(random.Random(1).getrandbits(64) | 1 for _ in range(200)), 2**61 - 1, 2**64 - 59, 3215031751
+])
+def test_is_prime(n):
+    assert outcome(number_theory.is_prime, n) == pure_python(number_theory.is_prime, n)
+
+
+@pytest.mark.parametrize("n", [-1, 0, 1, 2, 3, 4, 9, 10, 11, 100, 101, 65536, 10**6, 10**6 + 3])
+def test_odd_sieve(n):
+    assert outcome(number_theory.odd_sieve, n) == pure_python(number_theory.odd_sieve, n)
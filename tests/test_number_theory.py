@@ -0,0 +1,119 @@
+import math
+import random
+import pytest
+import number_theory
+
+sympy = pytest.importorskip("sympy")
+
+
+def test_is_prime_against_sympy():
+    for n in range(-5, 5000):
+        assert number_theory.is_prime(n) == sympy.isprime(n)
+    rng = random.Random(1)
+    for bits in (32, 63, 64, 65, 128):
+        for _ in range(50):
+            n = rng.getrandbits(bits) | 1
+            assert number_theory.is_prime(n) == sympy.isprime(n)
+    # strong pseudoprimes to several small bases
+    for n in (3215031751, 3825123056546413051, 318665857834031151167461):
+        assert not number_theory.is_prime(n)
+
+
+def test_factorize_against_sympy():
+    rng = random.Random(2)
+    numbers = [1, 2, 4, 97, 2 ** 10 * 3 ** 5, 600851475143, (2 ** 31 - 1) * (2 ** 61 - 1)]
+    numbers += [rng.randrange(2, 10 ** 15) for _ in range(40)]
+    for n in numbers:
+        assert number_theory.factorize(n) == sympy.factorint(n)
+        assert number_theory.product(number_theory.prime_factors(n)) == n
+
+
+SIZES = [0, 1, 2, 3, 10, 100, 1000, 65536, 10 ** 5 + 1]
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_sieves_agree(n):
+    expected = list(sympy.primerange(0, n))
+    assert number_theory.sieve(n) == expected
+    assert number_theory.prime_count(n) == len(expected)
+    assert list(number_theory.iter_primes(n)) == expected
+    assert list(number_theory.primes_array(n)) == expected
+
+
+def test_large_limits_are_sieved_in_segments(monkeypatch):
+    n = 10 ** 5 + 1
+    expected = list(sympy.primerange(0, n))
+    odd_sieve = number_theory.odd_sieve
+    monkeypatch.setattr(number_theory, "SEGMENT_SIZE", 4096)
+
+    def small_only(limit: int) -> bytearray:
+        # only the base primes up to sqrt(n) may come from one whole sieve
+        assert limit <= 4096, "sieved all n / 2 flags at once"
+        return odd_sieve(limit)
+
+    monkeypatch.setattr(number_theory, "odd_sieve", small_only)
+    assert list(number_theory.iter_primes(n)) == expected
+    assert list(number_theory.primes_array(n)) == expected
+    assert number_theory.prime_count(n) == len(expected)
+
+
+@pytest.mark.parametrize("n", SIZES)
+def test_segmented_sieve(n):
+    expected = list(sympy.primerange(0, n))
+    assert number_theory.segmented_sieve(n, segment_size=1000) == expected
+    assert number_theory.count_primes(0, n, segment_size=777) == len(expected)
+
+
+def test_segmented_windows_and_processes():
+    lo, hi = 10 ** 6, 10 ** 6 + 50000
+    expected = list(sympy.primerange(lo, hi))
+    assert list(number_theory.segmented_primes(lo, hi, segment_size=4096)) == expected
+    assert list(number_theory.segmented_primes(lo, hi, segment_size=4096, processes=2)) == expected
+
+
+def test_modular_helpers():
+    rng = random.Random(3)
+    for _ in range(200):
+        a, b = rng.randrange(-10 ** 12, 10 ** 12), rng.randrange(-10 ** 12, 10 ** 12)
+        g, x, y = number_theory.extended_gcd(a, b)
+        assert a * x + b * y == g and abs(g) == math.gcd(a, b)
+    for m in (2, 6, 97, 1000, 2 ** 61 - 1):
+        values = [v for v in (rng.randrange(1, m) for _ in range(50)) if math.gcd(v, m) == 1]
+        assert number_theory.batch_inverse(values, m) == [pow(v, -1, m) for v in values]
+    with pytest.raises(AssertionError):
+        number_theory.multiplicative_inverse(4, 6)
+    # composite moduli: non-units get every solution of ax = b (mod m)
+    solutions = number_theory.solve_congruences([3, 4, 5], [6, 8, 1], 12)
+    assert solutions == [[x for x in range(12) if (a * x - b) % 12 == 0] for a, b in ((3, 6), (4, 8), (5, 1))]
+
+
+def test_chinese_remainder():
+    moduli = [3, 5, 7, 11, 13]
+    basis = number_theory.CRTBasis(moduli)
+    systems = [[x % m for m in moduli] for x in range(0, basis.N, 97)]
+    assert basis.solve_many(systems) == list(range(0, basis.N, 97))
+    assert number_theory.chinese_remainder([2, 3, 2], [3, 5, 7]) == 23
+
+
+def test_array_helpers():
+    np = pytest.importorskip("numpy")
+    a = np.array([3, 4, 10, 7, 0])
+    m = np.array([7, 6, 12, 1000003, 5])
+    assert number_theory.gcd_array(a, m).tolist() == [math.gcd(x, y) for x, y in zip(a.tolist(), m.tolist())]
+    expected = [pow(x, -1, y) if math.gcd(x, y) == 1 else 0 for x, y in zip(a.tolist(), m.tolist())]
+    assert number_theory.inverse_array(a, m).tolist() == expected
+
+
+def test_multiplicative_tables_against_sympy():
+    n = 2000
+    tables = number_theory.multiplicative_tables(n)
+    for k in range(1, n + 1):
+        assert tables.phi[k] == sympy.totient(k)
+        assert tables.mu[k] == sympy.mobius(k)
+        assert tables.sigma0[k] == sympy.divisor_count(k)
+        assert tables.sigma1[k] == sympy.divisor_sigma(k)
+        if k > 1:
+            assert tables.spf[k] == min(sympy.factorint(k))
+            assert number_theory.factorize_spf(k, tables.spf) == sympy.factorint(k)
+    assert list(tables.primes) == list(sympy.primerange(0, n + 1))
+    assert list(number_theory.smallest_prime_factors(n)) == list(tables.spf)
@@ -0,0 +1,72 @@
+import math
+import pytest
+from planes import Line, LineSet, Plane, PlaneSet, Point
+import planes
+
+np = pytest.importorskip("numpy")
+
+
+def test_plane_construction():
+    by_points = Plane(Point(3, 0, 2), Point(1, 3, -4), Point(7, 6, -5))
+    by_equation = Plane(by_points.x, by_points.y, by_points.z, by_points.d)
+    for p in (Point(3, 0, 2), Point(1, 3, -4), Point(7, 6, -5)):
+        assert by_equation.x * p.x + by_equation.y * p.y + by_equation.z * p.z == by_equation.d
+    with pytest.raises(TypeError):
+        Plane("a", "b")
+
+
+def test_line_scalar_wrappers():
+    x_axis = Line(Point(0, 0, 0), Point(1, 0, 0))
+    y_axis = Line(Point(0, 0, 0), Point(0, 1, 0))
+    lifted = Line(Point(0, 0, 2), Point(0, 1, 2))
+    shifted = Line(Point(0, 3, 0), Point(1, 3, 0))
+    assert planes.intersection_point(x_axis, y_axis) == Point(0, 0, 0)
+    assert planes.intersection_point(x_axis, lifted) is None
+    assert math.isclose(planes.shortest_distance(x_axis, lifted), 2)
+    assert planes.is_parallel(x_axis, shifted) and not planes.is_parallel(x_axis, y_axis)
+    assert math.isclose(planes.shortest_distance(x_axis, shifted), 3)
+
+
+def test_plane_scalar_wrappers():
+    floor = Plane(0, 0, 1, 0)
+    wall = Plane(1, 0, 0, 2)
+    assert planes.distance_to_plane(Point(5, 5, -3), floor) == -3
+    assert planes.line_plane_intersection(Line(Point(1, 1, 1), Point(1, 1, 2)), floor) == Point(1, 1, 0)
+    assert planes.line_plane_intersection(Line(Point(0, 0, 1), Point(1, 0, 1)), floor) is None
+    meet = planes.plane_intersection(floor, wall)
+    assert planes.distance_to_plane(meet.p1, floor) == 0 and planes.distance_to_plane(meet.p1, wall) == 0
+    assert planes.plane_intersection(floor, Plane(0, 0, 2, 7)) is None
+
+
+def test_sets_match_scalar_wrappers():
+    rng = np.random.default_rng(1)
+    origins, directions = rng.standard_normal((200, 3)), rng.standard_normal((200, 3))
+    first = LineSet(origins[:100], directions[:100])
+    second = LineSet(origins[100:], directions[100:])
+    distances = first.distance(second)
+    for i in range(0, 100, 10):
+        assert math.isclose(distances[i], planes.shortest_distance(first[i], second[i]), rel_tol=1e-9)
+    # lines built to cross at known points
+    targets = rng.standard_normal((100, 3))
+    crossing = LineSet.through(targets, targets + directions[100:])
+    points, meets = LineSet.through(targets, targets + directions[:100]).intersection(crossing)
+    assert meets.all()
+    np.testing.assert_allclose(points, targets, atol=1e-9)
+
+
+def test_plane_sets():
+    rng = np.random.default_rng(2)
+    p1, p2, p3 = (rng.standard_normal((50, 3)) for _ in range(3))
+    sheets = PlaneSet.through(p1, p2, p3)
+    for p in (p1, p2, p3):
+        np.testing.assert_allclose(sheets.distance(p), 0, atol=1e-9)
+    lines = LineSet(rng.standard_normal((50, 3)), rng.standard_normal((50, 3)))
+    hits, valid = sheets.intersect_lines(lines)
+    assert valid.all()
+    np.testing.assert_allclose(sheets.distance(hits), 0, atol=1e-8)
+    other = PlaneSet(rng.standard_normal((50, 3)), rng.standard_normal(50))
+    meet, valid = sheets.intersect_planes(other)
+    assert valid.all()
+    for t in (-1.0, 0.5, 3.0):
+        np.testing.assert_allclose(sheets.distance(meet.points_at(np.full(50, t))), 0, atol=1e-8)
+        np.testing.assert_allclose(other.distance(meet.points_at(np.full(50, t))), 0, atol=1e-8)
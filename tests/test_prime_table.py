@@ -0,0 +1,50 @@
+import pickle
+import pytest
+from prime_table import PrimeTable
+
+sympy = pytest.importorskip("sympy")
+
+LIMIT = 200003
+
+
+@pytest.fixture(scope="module")
+def table(tmp_path_factory):
+    path = tmp_path_factory.mktemp("primes") / "primes.bin"
+    with PrimeTable.build(LIMIT, str(path)) as table:
+        yield table
+
+
+def test_lookups_against_sympy(table):
+    primes = list(sympy.primerange(0, LIMIT))
+    assert list(table.primes()) == primes
+    assert list(table.primes(1000, 2000)) == list(sympy.primerange(1000, 2000))
+    for n in list(range(0, 3000)) + list(range(LIMIT - 3000, LIMIT)):
+        assert table.is_prime(n) == sympy.isprime(n)
+    for x in (0, 1, 2, 3, 100, 4096, 65537, LIMIT - 1):
+        assert table.pi(x) == sympy.primepi(x)
+    for k in (1, 2, 100, 1000, len(primes)):
+        assert table.nth_prime(k) == primes[k - 1]
+    for n in (0, 2, 90, 1000, 65536):
+        assert table.next_prime(n) == sympy.nextprime(n)
+        if n > 2:
+            assert table.prev_prime(n) == sympy.prevprime(n)
+    # above the table Miller-Rabin takes over
+    assert table.is_prime(LIMIT + 2) == sympy.isprime(LIMIT + 2)
+
+
+def test_cached_reopens_and_pickles(table):
+    again = PrimeTable.cached(LIMIT, table.path)
+    try:
+        assert again.limit == table.limit and again.pi(LIMIT - 1) == table.pi(LIMIT - 1)
+        copy = pickle.loads(pickle.dumps(again))
+        assert copy.path == table.path and copy.nth_prime(10) == 29
+        copy.close()
+    finally:
+        again.close()
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / "not_a_table.bin"
+    path.write_bytes(b"\0" * 64)
+    with pytest.raises(ValueError):
+        PrimeTable(str(path))
@@ -0,0 +1,73 @@
+import math
+import random
+import pytest
+from quaternions import Quaternion
+import quaternions
+
+np = pytest.importorskip("numpy")
+
+
+def random_rotation(rng: random.Random) -> Quaternion:
+    axis = [rng.uniform(-1, 1) for _ in range(3)]
+    return Quaternion.from_axis_angle(axis, rng.uniform(-math.pi, math.pi))
+
+
+def test_hamilton_units():
+    i, j, k = Quaternion(0, 1, 0, 0), Quaternion(0, 0, 1, 0), Quaternion(0, 0, 0, 1)
+    minus_one = Quaternion(-1, 0, 0, 0)
+    assert i * i == j * j == k * k == i * j * k == minus_one
+    assert i * j == k and j * i == -k
+
+
+def test_rotation_matches_matrix():
+    rng = random.Random(1)
+    for _ in range(50):
+        q = random_rotation(rng)
+        p = [rng.uniform(-5, 5) for _ in range(3)]
+        r = q.to_rotation_matrix()
+        np.testing.assert_allclose(q.rotate(p), r @ p, atol=1e-12)
+        np.testing.assert_allclose(r @ r.T, np.eye(3), atol=1e-12)
+        conjugated = q * Quaternion.from_vector(p) * q.inverse()
+        np.testing.assert_allclose(q.rotate(p), (conjugated.x, conjugated.y, conjugated.z), atol=1e-12)
+        back = Quaternion.from_rotation_matrix(r)
+        # q and -q are the same rotation
+        assert back.isclose(q) or back.isclose(-q)
+        axis, angle = q.to_axis_angle()
+        assert Quaternion.from_axis_angle(axis, angle).isclose(q) or Quaternion.from_axis_angle(axis, angle).isclose(-q)
+
+
+def test_slerp_endpoints_and_midpoint():
+    a = Quaternion.from_axis_angle((0, 0, 1), 0.0)
+    b = Quaternion.from_axis_angle((0, 0, 1), math.pi / 2)
+    assert a.slerp(b, 0).isclose(a) and a.slerp(b, 1).isclose(b)
+    assert a.slerp(b, 0.5).isclose(Quaternion.from_axis_angle((0, 0, 1), math.pi / 4))
+
+
+def test_batch_rotation_matches_scalar():
+    rng = random.Random(2)
+    qs = [random_rotation(rng) for _ in range(5)]
+    points = np.random.default_rng(3).standard_normal((1000, 3))
+    single = quaternions.rotate_points(points, qs[0])
+    np.testing.assert_allclose(single, [qs[0].rotate(p) for p in points], atol=1e-12)
+    stacked = quaternions.rotate_points(points, qs)
+    assert stacked.shape == (5, 1000, 3)
+    for q, rotated in zip(qs, stacked):
+        np.testing.assert_allclose(rotated, quaternions.rotate_points(points, q), atol=1e-12)
+    chunked = quaternions.rotate_points(points, qs[0], chunk_size=64)
+    np.testing.assert_allclose(chunked, single, atol=1e-12)
+    streamed = np.concatenate(list(quaternions.iter_rotate_points(points, qs[0], chunk_size=100)))
+    np.testing.assert_allclose(streamed, single, atol=1e-12)
+    axes, angles = [[0, 0, 1]], [math.pi]
+    np.testing.assert_allclose(quaternions.axis_angle_array(axes, angles)[0], tuple(Quaternion.from_axis_angle((0, 0, 1), math.pi)))
+
+
+def test_symbolic_transform_matches_numeric():
+    sympy = pytest.importorskip("sympy")
+    numeric = quaternions.transform((1, 2, 3), 120, (1, 1, 1))
+    np.testing.assert_allclose(numeric, (3, 1, 2), atol=1e-12)
+    symbolic = quaternions.transform((1, 2, 3), 75, (1, -2, 0.5), symbolic=True)
+    w, x, y, z = quaternions._components(symbolic)
+    np.testing.assert_allclose(
+        [float(c) for c in (x, y, z)], quaternions.transform((1, 2, 3), 75, (1, -2, 0.5)), atol=1e-9
+    )
+    assert abs(float(w)) < 1e-9
@@ -0,0 +1,97 @@
+import random
+import pytest
+from fractions import Fraction
+from matrices import Matrix
+from sparse import COOMatrix, CSRMatrix, SparseMatrix
+
+np = pytest.importorskip("numpy")
+
+
+def sparse_rows(rng: random.Random, m: int, n: int, density: float = 0.3) -> list[list[int]]:
+    return [[rng.randint(-9, 9) if rng.random() < density else 0 for _ in range(n)] for _ in range(m)]
+
+
+def test_formats_round_trip():
+    coo = COOMatrix((3, 4))
+    coo.append(0, 1, 2)
+    coo.append(2, 3, 5)
+    coo.append(0, 1, 1)
+    coo.append(1, 0, 0)
+    csr = coo.to_csr()
+    assert csr.nnz == 2
+    assert csr.to_matrix().data == [[0, 3, 0, 0], [0, 0, 0, 0], [0, 0, 0, 5]]
+    assert CSRMatrix.from_matrix(csr.to_matrix()).to_coo().to_csr().to_matrix().data == csr.to_matrix().data
+    assert csr.transpose().to_matrix().data == csr.to_matrix().transpose().data
+
+
+def test_products_match_dense():
+    rng = random.Random(1)
+    a, b = Matrix(sparse_rows(rng, 6, 5)), Matrix(sparse_rows(rng, 5, 7))
+    sa, sb = CSRMatrix.from_matrix(a), CSRMatrix.from_matrix(b)
+    expected = (a * b).data
+    assert (sa * sb).to_matrix().data == expected
+    assert (sa * b).data == expected
+    assert (a * sb).data == expected
+
+
+def test_exact_elimination_against_dense():
+    rng = random.Random(2)
+    for _ in range(30):
+        n = rng.randint(1, 7)
+        rows = sparse_rows(rng, n, n, 0.5)
+        dense = Matrix(rows)
+        sparse = CSRMatrix.from_matrix(dense)
+        assert sparse.rank() == dense.rank()
+        assert sparse.det() == dense.det()
+        if dense.det():
+            b = [rng.randint(-5, 5) for _ in range(n)]
+            assert sparse.solve(b) == dense.solve(b)
+
+
+@pytest.mark.parametrize("density", [1.0, 0.5])
+def test_float_rank_deficient(density):
+    rng = np.random.default_rng(3)
+    for _ in range(100):
+        m, n = rng.integers(2, 12, 2)
+        k = rng.integers(1, min(m, n) + 1)
+        a = 10.0 ** rng.integers(-6, 7) * rng.standard_normal((m, k)) @ rng.standard_normal((k, n))
+        # zero whole columns so the structure is sparse without changing the rank much
+        a[:, rng.random(n) > density] = 0
+        k = np.linalg.matrix_rank(a)
+        if not k:
+            continue
+        s = CSRMatrix.from_matrix(Matrix(a.tolist()))
+        assert s.rank() == k
+        if m == n and k < n:
+            with pytest.raises(ValueError, match="singular"):
+                s.solve((a @ rng.standard_normal(n)).tolist())
+
+
+def test_float_solve_against_numpy():
+    rng = np.random.default_rng(4)
+    for n in range(1, 10):
+        a = rng.standard_normal((n, n)) * (rng.random((n, n)) < 0.4) + np.eye(n)
+        b = rng.standard_normal(n)
+        s = CSRMatrix.from_matrix(Matrix(a.tolist()))
+        np.testing.assert_allclose(s.solve(b.tolist()), np.linalg.solve(a, b), rtol=1e-8, atol=1e-10)
+        np.testing.assert_allclose(s.det(), np.linalg.det(a), rtol=1e-9)
+
+
+def test_inconsistent_system():
+    s = CSRMatrix.from_matrix(Matrix([[1, 2], [2, 4]]))
+    with pytest.raises(ValueError, match="inconsistent"):
+        s.solve([1, 3])
+    with pytest.raises(ValueError, match="singular"):
+        s.solve([Fraction(1), 2])
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        SparseMatrix((2, 2))
+
+    class RowsOnly(SparseMatrix):
+        def to_csr(self) -> CSRMatrix:
+            return CSRMatrix.from_matrix(Matrix([[1, 0], [0, 1]]))
+
+    with pytest.raises(TypeError):
+        RowsOnly((2, 2))
@@ -0,0 +1,104 @@
+import json
+import os
+import subprocess
+import sys
+import pytest
+from fractions import Fraction
+from numbers import Number
+import utils
+from utils import exact_div, lazy_module, normalize_fraction, overload, profiler
+
+
+def test_exact_division_helpers():
+    assert exact_div(1, 3) == Fraction(1, 3) and isinstance(exact_div(1, 3), Fraction)
+    assert exact_div(1.0, 4) == 0.25
+    assert normalize_fraction(Fraction(6, 3)) == 2 and type(normalize_fraction(Fraction(6, 3))) is int
+    assert normalize_fraction(Fraction(1, 2)) == Fraction(1, 2)
+
+
+def test_overload_picks_the_closest_annotation():
+    def real(x: float) -> str:
+        return "real"
+
+    def integral(x: int) -> str:
+        return "integral"
+
+    def boolean(x: bool) -> str:
+        return "bool"
+
+    def anything(x) -> str:
+        return "anything"
+
+    def number(x: Number) -> str:
+        return "number"
+
+    dispatch = overload(real, integral, boolean, anything, number)
+    assert dispatch(1.5) == "real"
+    assert dispatch(3) == "integral"
+    assert dispatch(True) == "bool"
+    assert dispatch("text") == "anything"
+    assert dispatch(1j) == "number"
+    # cached per argument type
+    assert dispatch(4) == "integral" and (int,) in dispatch._cache
+
+
+def test_overload_errors():
+    def a(x: int, y: Number) -> None:
+        pass
+
+    def b(x: Number, y: int) -> None:
+        pass
+
+    dispatch = overload(a, b)
+    with pytest.raises(TypeError, match="ambiguous"):
+        dispatch(1, 2)
+    with pytest.raises(TypeError, match="no overloaded function"):
+        dispatch("x", "y")
+
+
+def test_overload_as_method():
+    class Shape:
+        def square(self, side: int) -> str:
+            return f"square {side}"
+
+        def rectangle(self, width: int, height: int) -> str:
+            return f"rectangle {width}x{height}"
+
+        describe = overload(square, rectangle)
+
+    assert Shape().describe(2) == "square 2"
+    assert Shape().describe(2, 3) == "rectangle 2x3"
+
+
+def test_lazy_module_defers_the_import():
+    code = (
+        "import sys\n"
+        "from utils import lazy_module\n"
+        "m = lazy_module('colorsys')\n"
+        "before = 'colorsys' in sys.modules\n"
+        "m.rgb_to_hsv(1, 0, 0)\n"
+        "print(before, 'colorsys' in sys.modules, lazy_module('no_such_module_here'))\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True,
+        cwd=os.path.dirname(utils.__file__)
+    )
+    assert result.stdout.split() == ["False", "True", "None"]
+
+
+def test_profiler_swaps_wrappers_in_and_out():
+    import number_theory
+    original = number_theory.sieve
+    profiler.reset()
+    profiler.enable("number_theory")
+    try:
+        assert number_theory.sieve is not original
+        number_theory.sieve(1000)
+        number_theory.sieve(1000)
+        stats = profiler.results()["number_theory.sieve"]
+        assert stats["count"] == 2
+        assert "number_theory.sieve" in json.loads(profiler.report(format="json"))
+    finally:
+        profiler.disable("number_theory")
+        profiler.reset()
+    assert number_theory.sieve is original
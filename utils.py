@@ -1,27 +1,386 @@
-from typing import Iterable, Callable, Any, Optional, Union
-from sympy import Number
+import functools
+import importlib
+import importlib.util
+import os
+import random
+import sys
+import time
+import types
+from numbers import Number
+from typing import Iterable, Callable, Any, Optional, Union, get_args, get_origin, get_type_hints
 
 #Number = Union[int, float, complex]
 
-def overload(*functions: Iterable[Callable]) -> Callable:
-    def wrapper(*args: Iterable[Any], **kwargs: dict[Any, Any]) -> Callable:
-        # Match correct overload from functions list
-        arg_values = list(args) + list(kwargs.values())
-        arg_types = [type(arg) for arg in arg_values]
-        copy = list(functions)
-        copy = list(filter(lambda fn: len(fn.__annotations__) - 1 == len(arg_values), copy))
-        for fn in copy:
-            annotations = fn.__annotations__
-            if annotations.get("return"):
-                annotations.pop("return")
-            is_match = True
-            for expected_type, actual_type in zip(annotations.values(), arg_types):
-                if isinstance(expected_type, actual_type):
-                    is_match = False
-                    break
-            if is_match:
-                return fn(*args, **kwargs)    
-        raise TypeError(
-            "no overloaded function matched the given arguments"
+
+class LazyModule(types.ModuleType):
+    """ Stand-in for a heavy optional dependency (numpy, sympy): the real module
+        is imported on first attribute access, after which its namespace is
+        copied in so later lookups cost the same as on the module itself """
+
+    def __init__(self, name: str) -> None:
+        super().__init__(name)
+
+    def __getattr__(self, attr: str) -> Any:
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(vars(module))
+        return getattr(module, attr)
+
+
+def lazy_module(name: str) -> Optional[LazyModule]:
+    """ A LazyModule for name, or None if it is not installed. Until it is used,
+        only "name in sys.modules" tells whether it has really been imported """
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name) if importlib.util.find_spec(name) is not None else None
+
+
+# Only the exact arithmetic below needs Fraction
+_fractions = lazy_module("fractions")
+
+
+def exact_div(a: Number, b: Number) -> Number:
+    """ a / b, kept exact (as a Fraction) when both operands are integers instead
+        of silently falling back to floats """
+    if isinstance(a, int) and isinstance(b, int):
+        return _fractions.Fraction(a, b)
+    return a / b
+
+
+def normalize_fraction(x: Number) -> Number:
+    """ A Fraction with denominator 1 as an int; anything else unchanged """
+    if isinstance(x, _fractions.Fraction) and x.denominator == 1:
+        return x.numerator
+    return x
+
+# Distance given to parameters without an annotation (or annotated Any/object),
+# so that any typed match beats them
+_UNTYPED = 1 << 16
+# Annotation of a parameter that has none
+_MISSING = object()
+
+
+def _type_distance(annotation: Any, tp: type) -> Optional[int]:
+    """ How far tp is from annotation along its MRO, or None if a value of type
+        tp does not satisfy the annotation """
+    if annotation is _MISSING or annotation is Any or annotation is object:
+        return _UNTYPED
+    if annotation is None:
+        annotation = type(None)
+    if get_origin(annotation) in (Union, types.UnionType):
+        distances = [d for d in (_type_distance(arg, tp) for arg in get_args(annotation)) if d is not None]
+        return min(distances, default=None)
+    # generic aliases (list[int], Iterable[Number]...) only check the container
+    annotation = get_origin(annotation) or annotation
+    if not isinstance(annotation, type):
+        return _UNTYPED
+    if not issubclass(tp, annotation):
+        return None
+    mro = tp.__mro__
+    # virtual subclasses (ABCs such as numbers.Number) are not on the MRO
+    return mro.index(annotation) if annotation in mro else len(mro)
+
+
+class overload:
+    """ Multiple dispatch over a fixed list of annotated functions. The winner
+        for each tuple of argument types is resolved once and cached, so a
+        repeat call costs one dict lookup. Among the matching candidates the one
+        whose annotations are closest to the argument types (by MRO distance)
+        wins; a tie is an error """
+
+    def __init__(self, *functions: Iterable[Callable]) -> None:
+        self.functions = functions
+        self._signatures = None
+        self._cache = {}
+        self.__doc__ = functions[0].__doc__ if functions else None
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Callable:
+        # behave like a plain function when used as a method
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    def _candidates(self) -> list[tuple[Callable, 'inspect.Signature', dict[str, Any]]]:
+        # annotations are resolved on first use, once forward references such
+        # as 'Plane' exist; the functions' own __annotations__ are left alone
+        if self._signatures is None:
+            import inspect
+            self._signatures = []
+            for fn in self.functions:
+                try:
+                    hints = get_type_hints(fn)
+                except (NameError, TypeError):
+                    hints = dict(fn.__annotations__)
+                hints.pop("return", None)
+                self._signatures.append((fn, inspect.signature(fn), hints))
+        return self._signatures
+
+    @staticmethod
+    def _score(signature: 'inspect.Signature', hints: dict[str, Any], args: tuple[Any, ...], kwargs: dict[str, Any]) -> Optional[list[int]]:
+        # one distance per actual argument (positional first, then keywords in
+        # call order), or None if some argument does not fit its annotation
+        parameters = list(signature.parameters.values())
+        positional = [p for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD)]
+        var_positional = next((p for p in parameters if p.kind is p.VAR_POSITIONAL), None)
+        var_keyword = next((p for p in parameters if p.kind is p.VAR_KEYWORD), None)
+        score = []
+        for i, value in enumerate(args):
+            parameter = positional[i] if i < len(positional) else var_positional
+            score.append(_type_distance(hints.get(parameter.name, _MISSING), type(value)))
+        for name, value in kwargs.items():
+            parameter = signature.parameters.get(name)
+            if parameter is None or parameter.kind is parameter.POSITIONAL_ONLY:
+                parameter = var_keyword
+            score.append(_type_distance(hints.get(parameter.name, _MISSING), type(value)))
+        return None if None in score else score
+
+    def _resolve(self, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Callable:
+        matches = []
+        for fn, signature, hints in self._candidates():
+            try:
+                signature.bind(*args, **kwargs)
+            except TypeError:
+                continue
+            score = self._score(signature, hints, args, kwargs)
+            if score is not None:
+                matches.append((fn, score))
+        types_ = ", ".join(type(a).__name__ for a in (*args, *kwargs.values()))
+        if not matches:
+            raise TypeError(
+                f"no overloaded function matched the argument types ({types_})"
+            )
+        # the winner must be at least as specific as every other match for
+        # every argument; otherwise the call is ambiguous
+        best = [
+            fn for fn, score in matches
+            if all(all(a <= b for a, b in zip(score, other)) for _, other in matches)
+        ]
+        if len(best) != 1:
+            candidates = best or [fn for fn, _ in matches]
+            raise TypeError(
+                f"ambiguous overload for argument types ({types_}): "
+                + ", ".join(fn.__qualname__ for fn in candidates)
+            )
+        return best[0]
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        key = tuple(map(type, args))
+        if kwargs:
+            key += tuple((name, type(value)) for name, value in kwargs.items())
+        try:
+            fn = self._cache[key]
+        except KeyError:
+            fn = self._cache[key] = self._resolve(args, kwargs)
+        return fn(*args, **kwargs)
+
+
+"""
+Profiling registry. Functions decorated with timed() are recorded here by
+"module.qualname". While profiling is off for a function's module the
+decorator hands back the function itself, so it costs nothing; enable()
+swaps the timing wrappers into their modules and classes, and disable()
+puts the originals back. References taken earlier with "from module import
+fn" keep whichever version they were bound to
+"""
+
+# Profile every module ("1", "all" or "*") or a comma separated list of modules
+PROFILE_ENV = "MATHS_PROFILE"
+# Latency samples kept per function for the percentiles (reservoir sampling)
+RESERVOIR_SIZE = 10000
+
+
+def _tracing() -> bool:
+    # tracemalloc drags in pickle, linecache and fnmatch; only touch it once imported
+    return "tracemalloc" in sys.modules and sys.modules["tracemalloc"].is_tracing()
+
+
+class FunctionStats:
+
+    __slots__ = ("count", "total", "min", "max", "allocated", "samples")
+
+    def __init__(self) -> None:
+        self.clear()
+
+    def clear(self) -> None:
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.allocated = None
+        self.samples = []
+
+    def record(self, elapsed: float, allocated: Optional[int] = None) -> None:
+        self.count += 1
+        self.total += elapsed
+        self.min = min(self.min, elapsed)
+        self.max = max(self.max, elapsed)
+        if allocated is not None:
+            self.allocated = (self.allocated or 0) + allocated
+        if len(self.samples) < RESERVOIR_SIZE:
+            self.samples.append(elapsed)
+        else:
+            i = random.randrange(self.count)
+            if i < RESERVOIR_SIZE:
+                self.samples[i] = elapsed
+
+    def percentile(self, q: float) -> float:
+        """ Nearest-rank q-th percentile of the sampled latencies, q in [0, 100] """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p90": self.percentile(90),
+            "p99": self.percentile(99),
+            "allocated": self.allocated
+        }
+
+
+class Profiler:
+
+    def __init__(self) -> None:
+        # "module.qualname" -> (original function, timing wrapper)
+        self.functions = {}
+        self.stats = {}
+        self.everything = False
+        self.modules = set()
+        self.memory = False
+        setting = os.environ.get(PROFILE_ENV, "").strip()
+        if setting in ("1", "all", "*"):
+            self.everything = True
+        elif setting and setting != "0":
+            self.modules.update(m.strip() for m in setting.split(","))
+
+    def is_enabled(self, module: str) -> bool:
+        return self.everything or module in self.modules
+
+    def register(self, fn: Callable, verbose: Optional[bool] = False) -> Callable:
+        key = f"{fn.__module__}.{fn.__qualname__}"
+        stats = self.stats.setdefault(key, FunctionStats())
+        profiler = self
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs) -> Any:
+            tracing = profiler.memory and _tracing()
+            if tracing:
+                import tracemalloc
+                # nested profiled calls reset the peak too, so this is approximate for them
+                before = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            value = fn(*args, **kwargs)
+            end = time.perf_counter()
+            stats.record(end - start, tracemalloc.get_traced_memory()[1] - before if tracing else None)
+            if verbose:
+                print(f"Function {fn.__name__} ran in {(end-start):.10f}s")
+            return value
+
+        self.functions[key] = (fn, inner)
+        # verbose timing was always on, before the registry existed
+        return inner if verbose or self.is_enabled(fn.__module__) else fn
+
+    def _owner(self, fn: Callable) -> Optional[tuple[Any, str]]:
+        # the module or class attribute that holds fn, found through its qualname
+        owner = sys.modules.get(fn.__module__)
+        *path, name = fn.__qualname__.split(".")
+        for part in path:
+            if owner is None or part == "<locals>":
+                return None
+            owner = getattr(owner, part, None)
+        return (owner, name) if owner is not None else None
+
+    def _swap(self, modules: Optional[Iterable[str]], enable: bool) -> None:
+        for key, (fn, inner) in self.functions.items():
+            if modules is not None and fn.__module__ not in modules:
+                continue
+            found = self._owner(fn)
+            if found is None:
+                continue
+            owner, name = found
+            current = vars(owner).get(name)
+            if enable and current is fn:
+                setattr(owner, name, inner)
+            elif not enable and current is inner:
+                setattr(owner, name, fn)
+
+    def enable(self, *modules: str, memory: Optional[bool] = False) -> None:
+        """ Profile the given modules (every module if none are given). With
+            memory=True the bytes allocated per call are traced as well """
+        if modules:
+            self.modules.update(modules)
+        else:
+            self.everything = True
+        if memory:
+            import tracemalloc
+            self.memory = True
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+        self._swap(modules or None, enable=True)
+
+    def disable(self, *modules: str) -> None:
+        """ Stop profiling the given modules (every module if none are given) """
+        if modules:
+            self.modules.difference_update(modules)
+            if self.everything:
+                self.everything = False
+                self.modules.update(fn.__module__ for fn, _ in self.functions.values())
+                self.modules.difference_update(modules)
+            self._swap(modules, enable=False)
+            return
+        self.everything = False
+        self.modules.clear()
+        if self.memory and _tracing():
+            sys.modules["tracemalloc"].stop()
+        self.memory = False
+        self._swap(None, enable=False)
+
+    def reset(self) -> None:
+        # cleared in place: every wrapper holds on to its FunctionStats
+        for stats in self.stats.values():
+            stats.clear()
+
+    def results(self) -> dict[str, dict[str, Any]]:
+        """ Statistics of every profiled function that has been called, slowest total first """
+        called = [(key, stats.as_dict()) for key, stats in self.stats.items() if stats.count]
+        return dict(sorted(called, key=lambda item: -item[1]["total"]))
+
+    def report(self, format: Optional[str] = "table") -> str:
+        """ The results as a text table or as JSON """
+        results = self.results()
+        if format == "json":
+            import json
+            return json.dumps(results, indent=2)
+        if format != "table":
+            raise ValueError(
+                f"unknown report format {format!r}"
+            )
+        columns = ("count", "total", "mean", "min", "p50", "p90", "p99", "max")
+        header = ["function", *columns, "allocated"]
+        rows = [header]
+        for key, stats in results.items():
+            allocated = "-" if stats["allocated"] is None else str(stats["allocated"])
+            rows.append([key, str(stats["count"]), *(f"{stats[c]:.6f}" for c in columns[1:]), allocated])
+        widths = [max(len(row[i]) for row in rows) for i in range(len(header))]
+        return "\n".join(
+            "  ".join(cell.ljust(w) if i == 0 else cell.rjust(w) for i, (cell, w) in enumerate(zip(row, widths)))
+            for row in rows
         )
+
+
+profiler = Profiler()
+
+
+def timed(verbose: Optional[bool] = False) -> Callable:
+    """ Register a function with the profiler. A no-op unless profiling is
+        enabled for the function's module (or verbose is set, which also
+        prints the wall-clock time of every call) """
+    def wrapper(fn: Callable) -> Callable:
+        return profiler.register(fn, verbose)
     return wrapper